@@ -0,0 +1,117 @@
+"""Alarm output
+
+The alarm WAV is decoded once at startup and played from one long-lived
+worker thread fed by a small bounded command queue. Alerts from a source
+that is already sounding are deduplicated; repeated alerts within a time
+window escalate to a looping alarm that only stops when the eyes reopen.
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+import simpleaudio as sa
+
+
+class AlarmPlayer:
+    """Plays the alarm sound with a bounded detection-to-audio latency"""
+
+    def __init__(self, wav_path: str, queue_size: int = 8, escalate_after: int = 3,
+                 repeat_window: float = 60.0, stop_on_clear: bool = True):
+        # Decode once; every alert reuses the same audio buffer
+        self.wave = sa.WaveObject.from_wave_file(wav_path)
+        self.escalate_after = escalate_after
+        self.repeat_window = repeat_window
+        self.stop_on_clear = stop_on_clear
+
+        self.commands = queue.Queue(queue_size)
+        self.active = set()
+        self.recent = deque()
+        self.play_obj = None
+        self.latencies = deque(maxlen=100)
+
+        self.thread = threading.Thread(target=self._run, name="alarm", daemon=True)
+        self.thread.start()
+
+    @property
+    def escalated(self):
+        return len(self.recent) >= self.escalate_after
+
+    @property
+    def last_latency(self):
+        """Seconds from the last alert() call to its playback starting"""
+        return self.latencies[-1] if self.latencies else None
+
+    def alert(self, source=None):
+        """Sound the alarm for source (deduplicated while it is already sounding)"""
+        self._send(("alert", source, time.monotonic()))
+
+    def clear(self, source=None):
+        """The eyes of source reopened"""
+        self._send(("clear", source, None))
+
+    def stop(self):
+        """Silence the alarm and forget all active sources"""
+        self._send(("stop", None, None))
+
+    def close(self, timeout: float = 1.0):
+        self._send(("close", None, None), block=True)
+        self.thread.join(timeout)
+
+    def _send(self, command, block=False):
+        try:
+            self.commands.put(command, block=block, timeout=0.5 if block else None)
+        except queue.Full:
+            print("Alarm queue full, dropping", command[0])
+
+    def _playing(self):
+        return self.play_obj is not None and self.play_obj.is_playing()
+
+    def _play(self):
+        try:
+            self.play_obj = self.wave.play()
+        except Exception as e:
+            print("Alarm error:", e)
+            self.play_obj = None
+
+    def _silence(self):
+        if self._playing():
+            self.play_obj.stop()
+        self.play_obj = None
+
+    def _run(self):
+        while True:
+            try:
+                kind, source, requested_at = self.commands.get(timeout=0.05)
+            except queue.Empty:
+                kind = None
+
+            if kind == "close":
+                self._silence()
+                return
+            elif kind == "alert":
+                self._on_alert(source, requested_at)
+            elif kind == "clear":
+                self.active.discard(source)
+                if not self.active and self.stop_on_clear:
+                    self._silence()
+            elif kind == "stop":
+                self.active.clear()
+                self._silence()
+
+            # Escalated alarms keep repeating until every source has cleared
+            if self.escalated and self.active and not self._playing():
+                self._play()
+
+    def _on_alert(self, source, requested_at):
+        now = time.monotonic()
+        self.recent.append(now)
+        while self.recent and now - self.recent[0] > self.repeat_window:
+            self.recent.popleft()
+
+        sounding = self.active and self._playing()
+        self.active.add(source)
+        if sounding:
+            return
+        self._play()
+        self.latencies.append(time.monotonic() - requested_at)
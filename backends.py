@@ -0,0 +1,210 @@
+"""Face detector and landmark model backends
+
+A face detector is called like dlib's frontal face detector,
+``detector(gray, upsample)``, and returns dlib rectangles; a landmark model
+is called like ``dlib.shape_predictor``, ``model(gray, rect)``, and has a
+``layout`` (see ear.LandmarkLayout) saying where the eyes are in its output.
+FaceTracker accepts either the dlib objects themselves or these backends.
+
+Detectors:
+    hog    dlib HOG + linear SVM (default, no model file)
+    dnn    OpenCV DNN ResNet-10 SSD (deploy.prototxt + res10 caffemodel)
+
+Landmark models:
+    68     dlib 68-point model (~100 MB, default; also gives the mouth)
+    eyes   dlib model trained on the 12 eye points only (~1-5 MB, see
+           train_eye_model); no mouth, so MAR is not available
+
+dlib's 5-point model only marks the eye corners, not the eyelids, so no
+eye aspect ratio can be computed from it and it is not offered here.
+
+Backends are created by name (create_detector / create_landmarks) and load
+their model files on first use, or when load() is called.
+
+    python backends.py train-eyes ibug_300W_large_face_landmark_dataset/labels_ibug_300W_train.xml
+"""
+import argparse
+import os
+import threading
+import xml.etree.ElementTree as ET
+
+import cv2
+import dlib
+
+from ear import EYES_12, FACE_68
+
+DEFAULT_DETECTOR = "hog"
+DEFAULT_LANDMARKS = "68"
+DEFAULT_MODEL_PATH = "shape_predictor_68_face_landmarks.dat"
+EYE_MODEL_PATH = "shape_predictor_12_eye_landmarks.dat"
+DNN_CONFIG_PATH = "deploy.prototxt"
+DNN_MODEL_PATH = "res10_300x300_ssd_iter_140000.caffemodel"
+
+
+def _require(path):
+    if not os.path.exists(path):
+        raise RuntimeError(f"Model file not found: {path}")
+
+
+class LazyModel:
+    """Backend whose model is created on first use (thread-safe)"""
+    name = ""
+
+    def __init__(self):
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def load(self):
+        """Load the model now if it is not loaded yet; returns it"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._create()
+        return self._model
+
+    def _create(self):
+        raise NotImplementedError
+
+
+class HogDetector(LazyModel):
+    """dlib's HOG + linear SVM frontal face detector"""
+    name = "hog"
+
+    def _create(self):
+        return dlib.get_frontal_face_detector()
+
+    def __call__(self, gray, upsample=0):
+        return self.load()(gray, upsample)
+
+
+class DnnDetector(LazyModel):
+    """OpenCV DNN ResNet-10 SSD face detector
+
+    The SSD box reaches higher up the forehead than the HOG box the dlib
+    landmark models were trained on, so ``trim_top`` of it is cut off.
+    One network is shared by all callers; inference on it is serialised.
+    """
+    name = "dnn"
+
+    def __init__(self, config: str = DNN_CONFIG_PATH, model: str = DNN_MODEL_PATH,
+                 confidence: float = 0.5, size: int = 300, trim_top: float = 0.15):
+        super().__init__()
+        self.config = config
+        self.model = model
+        self.confidence = confidence
+        self.size = size
+        self.trim_top = trim_top
+        self._forward = threading.Lock()
+
+    def _create(self):
+        _require(self.config)
+        _require(self.model)
+        return cv2.dnn.readNetFromCaffe(self.config, self.model)
+
+    def __call__(self, gray, upsample=0):
+        net = self.load()
+        height, width = gray.shape[:2]
+        image = cv2.resize(gray, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        blob = cv2.dnn.blobFromImage(image, 1.0, (self.size, self.size), (104.0, 177.0, 123.0))
+        with self._forward:
+            net.setInput(blob)
+            detections = net.forward()
+
+        faces = []
+        for detection in detections[0, 0]:
+            if detection[2] < self.confidence:
+                continue
+            x0, x1 = (detection[[3, 5]].clip(0.0, 1.0) * width).astype(int)
+            y0, y1 = (detection[[4, 6]].clip(0.0, 1.0) * height).astype(int)
+            if x1 <= x0 or y1 <= y0:
+                continue
+            y0 += int((y1 - y0) * self.trim_top)
+            faces.append(dlib.rectangle(int(x0), int(y0), int(x1), int(y1)))
+        return faces
+
+
+class ShapePredictor(LazyModel):
+    """A dlib shape predictor with the layout of its landmarks"""
+
+    def __init__(self, name, path, layout):
+        super().__init__()
+        self.name = name
+        self.path = path
+        self.layout = layout
+
+    def _create(self):
+        _require(self.path)
+        return dlib.shape_predictor(self.path)
+
+    def __call__(self, gray, rect):
+        return self.load()(gray, rect)
+
+
+DETECTORS = {
+    "hog": HogDetector,
+    "dnn": DnnDetector,
+}
+LANDMARK_MODELS = {
+    "68": (DEFAULT_MODEL_PATH, FACE_68),
+    "eyes": (EYE_MODEL_PATH, EYES_12),
+}
+
+
+def create_detector(name: str = DEFAULT_DETECTOR):
+    """Face detector backend by name (model loaded on first use)"""
+    if name not in DETECTORS:
+        raise ValueError(f"Unknown face detector: {name}")
+    return DETECTORS[name]()
+
+
+def create_landmarks(name: str = DEFAULT_LANDMARKS, path: str = None):
+    """Landmark model backend by name; path overrides the default model file"""
+    if name not in LANDMARK_MODELS:
+        raise ValueError(f"Unknown landmark model: {name}")
+    default_path, layout = LANDMARK_MODELS[name]
+    return ShapePredictor(name, path or default_path, layout)
+
+
+def train_eye_model(xml_path, output: str = EYE_MODEL_PATH, threads: int = 0):
+    """Train the eye-only model from a 68-point dlib/iBUG training XML (e.g. 300-W)
+
+    The eye points (36-47) are kept and renumbered 0-11; the reduced XML is
+    written next to the original so its relative image paths still resolve.
+    """
+    tree = ET.parse(xml_path)
+    for box in tree.iter('box'):
+        for part in box.findall('part'):
+            index = int(part.get('name'))
+            if FACE_68.eyes.start <= index < FACE_68.eyes.stop:
+                part.set('name', f"{index - FACE_68.eyes.start:02d}")
+            else:
+                box.remove(part)
+    eyes_xml = os.path.join(os.path.dirname(xml_path), "eyes_" + os.path.basename(xml_path))
+    tree.write(eyes_xml)
+
+    options = dlib.shape_predictor_training_options()
+    options.oversampling_amount = 5
+    options.tree_depth = 4
+    options.nu = 0.1
+    options.num_threads = threads or os.cpu_count() or 1
+    options.be_verbose = True
+    dlib.train_shape_predictor(eyes_xml, output, options)
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    train = commands.add_parser('train-eyes', help='train the eye-only landmark model')
+    train.add_argument('xml', help='68-point training annotations (dlib imglab XML)')
+    train.add_argument('--out', default=EYE_MODEL_PATH)
+    train.add_argument('--threads', type=int, default=0)
+    args = parser.parse_args()
+
+    print("Wrote", train_eye_model(args.xml, args.out, args.threads))
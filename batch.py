@@ -0,0 +1,203 @@
+"""Offline fatigue analysis of recorded video files
+
+Videos are split into chunks that are scored in parallel by a process pool.
+Every worker loads the face models once and reuses its engine for all of
+its chunks. Each chunk replays a warm-up before its first frame, by default
+the whole statistics window (see warmup_frames), so the closure counter,
+PERCLOS and the fatigue score are already primed when its own frames begin
+and the timelines match an unchunked run.
+
+For every input video two files are written to the output directory:
+
+    <name>.frames.csv    frame, time, faces, ear, mar, counter, alarm, perclos, fatigue
+    <name>.events.jsonl  one JSON object per blink/alert/fatigue/face event
+
+    python batch.py dashcam/*.mp4 --out results --workers 8
+"""
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from backends import DEFAULT_DETECTOR, DEFAULT_LANDMARKS, DETECTORS, LANDMARK_MODELS
+from driver import DEFAULT_DRIVER_POLICY, DEFAULT_SEAT_REGION, DRIVER_POLICIES
+from engine import (FatigueEngine, DEFAULT_EAR_THRESHOLD, DEFAULT_ALERT_SECONDS,
+                    DEFAULT_DETECT_INTERVAL, DEFAULT_REDETECT_POLICY, DEFAULT_PROCESS_WIDTH,
+                    DEFAULT_STATS_WINDOW)
+from fatigue import MAX_FRAME_GAP
+
+# Each chunk replays about a statistics window (~60 s) first: ~10% extra work at 600 s
+DEFAULT_CHUNK_SECONDS = 600.0
+
+FRAME_COLUMNS = ("frame", "time", "faces", "ear", "mar", "counter", "alarm", "perclos", "fatigue")
+
+# One engine per worker process, created by the pool initializer
+_engine = None
+
+
+def _init_worker(model_path, settings):
+    global _engine
+    # Parallelism comes from the pool; keep OpenCV from oversubscribing cores
+    cv2.setNumThreads(1)
+    _engine = FatigueEngine(model_path, **settings)
+    _engine.load()
+
+
+def video_info(path):
+    """Return (frame count, fps) of a video file"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video {path}")
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    return frames, fps
+
+
+def warmup_frames(fps, stats_window=DEFAULT_STATS_WINDOW):
+    """Frames to replay before a chunk so its rolling statistics match an unchunked run
+
+    Covers the statistics window plus the longest frame duration it counts,
+    so every frame inside the window at the chunk's first frame has been seen.
+    """
+    return int(math.ceil((stats_window + MAX_FRAME_GAP) * fps)) + 1
+
+
+def split_chunks(path, chunk_seconds, warmup=None, stats_window=DEFAULT_STATS_WINDOW):
+    """Split a video into (path, start, end, warmup) tasks (warmup None: warmup_frames)"""
+    frames, fps = video_info(path)
+    if frames <= 0 or chunk_seconds <= 0:
+        return [(path, 0, math.inf, 0)]
+    if warmup is None:
+        warmup = warmup_frames(fps, stats_window)
+    size = max(int(chunk_seconds * fps), 1)
+    return [(path, start, min(start + size, frames), warmup) for start in range(0, frames, size)]
+
+
+def analyse_chunk(task):
+    """Score frames [start, end) of a video; runs inside a worker process"""
+    path, start, end, warmup = task
+    _engine.reset()
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    index = max(start - warmup, 0)
+    # Start on the unchunked run's re-detect schedule (exact while the face stays in view)
+    index -= index % max(_engine.detect_interval, 1)
+    if index:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+
+    rows = []
+    events = []
+    while index < end:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        t = index / fps
+        result = _engine.process(frame, t)
+        if index >= start:
+            rows.append((index, t, len(result.faces),
+                         result.ear if result.ear is not None else np.nan,
+                         result.mar if result.mar is not None else np.nan,
+                         result.counter, int(result.alarm_on), result.perclos, result.fatigue))
+            events.extend({'kind': e.kind, 'frame': index, 'time': round(t, 3), **e.data}
+                          for e in result.events)
+        index += 1
+    cap.release()
+    return path, start, np.array(rows, dtype=np.float64).reshape(-1, len(FRAME_COLUMNS)), events
+
+
+def write_outputs(path, chunks, out_dir):
+    """Merge a video's chunk results (in frame order) and write them to disk"""
+    chunks.sort(key=lambda chunk: chunk[0])
+    rows = np.concatenate([chunk[1] for chunk in chunks])
+    events = [event for chunk in chunks for event in chunk[2]]
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    np.savetxt(os.path.join(out_dir, f"{name}.frames.csv"), rows, delimiter=",",
+               header=",".join(FRAME_COLUMNS), comments="",
+               fmt=["%d", "%.3f", "%d", "%.4f", "%.4f", "%d", "%d", "%.4f", "%.1f"])
+    with open(os.path.join(out_dir, f"{name}.events.jsonl"), "w") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+    return rows, events
+
+
+def analyse(paths, out_dir, workers=None, chunk_seconds=DEFAULT_CHUNK_SECONDS, warmup=None,
+            model_path=None, **settings):
+    """Score all videos with a process pool and write per-video timelines"""
+    os.makedirs(out_dir, exist_ok=True)
+    # A video given twice is analysed once
+    paths = list(dict.fromkeys(paths))
+    stats_window = settings.get('stats_window', DEFAULT_STATS_WINDOW)
+    tasks = [task for path in paths for task in split_chunks(path, chunk_seconds, warmup, stats_window)]
+    pending = {path: sum(task[0] == path for task in tasks) for path in paths}
+    results = {path: [] for path in paths}
+    summary = {}
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, settings)) as pool:
+        for path, chunk_start, rows, events in pool.map(analyse_chunk, tasks):
+            results[path].append((chunk_start, rows, events))
+            if len(results[path]) == pending[path]:
+                rows, events = write_outputs(path, results.pop(path), out_dir)
+                duration = rows[-1, 1] if len(rows) else 0.0
+                summary[path] = {
+                    'frames': len(rows),
+                    'duration': float(duration),
+                    'alerts': sum(e['kind'] == "alert" for e in events),
+                    'blinks': sum(e['kind'] == "blink" for e in events),
+                    'fatigue_alerts': sum(e['kind'] == "fatigue" for e in events),
+                }
+    elapsed = time.perf_counter() - start
+    return summary, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('videos', nargs='+')
+    parser.add_argument('--out', default='results', help='output directory')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-seconds', type=float, default=DEFAULT_CHUNK_SECONDS,
+                        help='split videos into chunks of this length (0 = whole files)')
+    parser.add_argument('--warmup', type=int,
+                        help='frames replayed before each chunk to prime the closure counter and the '
+                             'statistics (default: the statistics window, so results match an unchunked run; '
+                             'about 60 s of extra work per chunk)')
+    parser.add_argument('--model', help="landmark model file (default: the landmark backend's)")
+    parser.add_argument('--detector', default=DEFAULT_DETECTOR, choices=tuple(DETECTORS))
+    parser.add_argument('--landmarks', default=DEFAULT_LANDMARKS, choices=tuple(LANDMARK_MODELS))
+    parser.add_argument('--driver-policy', default=DEFAULT_DRIVER_POLICY, choices=DRIVER_POLICIES)
+    parser.add_argument('--seat', type=float, nargs=4, default=DEFAULT_SEAT_REGION,
+                        metavar=('LEFT', 'TOP', 'RIGHT', 'BOTTOM'),
+                        help="driver's seat as fractions of the frame (seat policy)")
+    parser.add_argument('--ear-threshold', type=float, default=DEFAULT_EAR_THRESHOLD)
+    parser.add_argument('--alert-seconds', type=float, default=DEFAULT_ALERT_SECONDS,
+                        help='continuous eye closure that raises an alert')
+    parser.add_argument('--interval', type=int, default=DEFAULT_DETECT_INTERVAL)
+    parser.add_argument('--policy', default=DEFAULT_REDETECT_POLICY)
+    parser.add_argument('--width', type=int, default=DEFAULT_PROCESS_WIDTH)
+    args = parser.parse_args()
+
+    summary, elapsed = analyse(args.videos, args.out, args.workers, args.chunk_seconds, args.warmup,
+                               args.model, ear_threshold=args.ear_threshold,
+                               alert_seconds=args.alert_seconds, detect_interval=args.interval,
+                               redetect_policy=args.policy, process_width=args.width,
+                               detector_backend=args.detector, landmark_backend=args.landmarks,
+                               driver_policy=args.driver_policy, seat_region=args.seat)
+
+    total = sum(info['duration'] for info in summary.values())
+    for path, info in summary.items():
+        print(f"{path}: {info['frames']} frames, {info['duration']:.0f}s, "
+              f"{info['alerts']} alerts, {info['blinks']} blinks")
+    print(f"Processed {total:.0f}s of video in {elapsed:.1f}s "
+          f"({total / max(elapsed, 1e-9):.1f}x real time) with {args.workers} workers")
+
+
+if __name__ == '__main__':
+    main()
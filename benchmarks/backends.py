@@ -0,0 +1,118 @@
+"""Speed/accuracy comparison of detector and landmark backends
+
+Replays the first frames of a recorded video through FaceTracker with every
+combination of the requested backends and compares each against the
+reference (HOG detector, 68-point model, full resolution, every frame).
+Landmark error is measured on the 12 eye points every model shares, as the
+mean point distance normalised by the inter-ocular distance (eye NME); EAR
+error is the mean absolute EAR difference on frames where both found a
+face. Model load time is reported separately from per-frame time.
+
+    python -m benchmarks.backends drive.mp4 --detectors hog dnn --landmarks 68 eyes
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from backends import DETECTORS, LANDMARK_MODELS, create_detector, create_landmarks
+from benchmarks.resolution import load_frames, run
+from detection import FaceTracker
+from ear import FACE_68, eye_aspect_ratio
+from metrics import StageProfiler
+
+
+def eye_nme(shape, layout, reference):
+    """Mean eye landmark error normalised by the reference inter-ocular distance"""
+    ref_eyes = reference[FACE_68.eyes].astype(float)
+    interocular = np.linalg.norm(ref_eyes[:6].mean(axis=0) - ref_eyes[6:].mean(axis=0))
+    error = np.linalg.norm(shape[layout.eyes].astype(float) - ref_eyes, axis=1).mean()
+    return error / max(interocular, 1.0)
+
+
+def compare(results, layout, reference):
+    times = np.array([elapsed for elapsed, _ in results]) * 1000.0
+    found = [shape is not None for _, shape in results]
+    ref_found = [shape is not None for _, shape in reference]
+    pairs = [(shape, ref) for (_, shape), (_, ref) in zip(results, reference)
+             if shape is not None and ref is not None]
+    errors = [eye_nme(shape, layout, ref) for shape, ref in pairs]
+    if pairs:
+        shapes, refs = np.stack([p[0] for p in pairs]), np.stack([p[1] for p in pairs])
+        ear_error = float(np.abs(eye_aspect_ratio(shapes, layout) - eye_aspect_ratio(refs)).mean())
+    else:
+        ear_error = None
+    recall = sum(f and r for f, r in zip(found, ref_found)) / max(sum(ref_found), 1)
+    false_faces = sum(f and not r for f, r in zip(found, ref_found))
+    return {
+        'mean_ms': float(times.mean()),
+        'p95_ms': float(np.percentile(times, 95)),
+        'fps': float(1000.0 / times.mean()),
+        'recall': float(recall),
+        'extra_frames': int(false_faces),
+        'eye_nme': float(np.mean(errors)) if errors else None,
+        'ear_error': ear_error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('video')
+    parser.add_argument('--detectors', nargs='+', default=list(DETECTORS), choices=tuple(DETECTORS))
+    parser.add_argument('--landmarks', nargs='+', default=list(LANDMARK_MODELS), choices=tuple(LANDMARK_MODELS))
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--policy', default='every_frame',
+                        help='re-detect policy used for every backend (default isolates the detector)')
+    parser.add_argument('--interval', type=int, default=5)
+    parser.add_argument('--width', type=int, default=640, help='detection width for every backend')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    if not frames:
+        parser.error(f"Could not read frames from {args.video}")
+
+    reference = run(FaceTracker(create_detector("hog"), create_landmarks("68"),
+                                policy='every_frame', process_width=0), frames)
+
+    report = {'video': args.video, 'frames': len(frames), 'width': args.width,
+              'resolution': list(frames[0].shape[::-1]), 'backends': {}}
+    print(f"{'detector':>8} {'marks':>6} {'load ms':>8} {'mean ms':>8} {'detect':>7} {'marks':>7} "
+          f"{'fps':>7} {'recall':>7} {'eye NME':>8} {'EAR err':>8}")
+    for detector_name in args.detectors:
+        for landmarks_name in args.landmarks:
+            detector, landmarks = create_detector(detector_name), create_landmarks(landmarks_name)
+            start = time.perf_counter()
+            try:
+                detector.load()
+                landmarks.load()
+            except RuntimeError as e:
+                print(f"{detector_name:>8} {landmarks_name:>6}  skipped: {e}")
+                continue
+            load_ms = (time.perf_counter() - start) * 1000.0
+
+            profiler = StageProfiler(window=1_000_000)
+            tracker = FaceTracker(detector, landmarks, args.interval, args.policy,
+                                  process_width=args.width, profiler=profiler)
+            row = compare(run(tracker, frames), landmarks.layout, reference)
+            stages = profiler.snapshot()
+            row['load_ms'] = load_ms
+            row['detect_ms'] = stages['detect']['p50'] if 'detect' in stages else None
+            row['landmarks_ms'] = stages['landmarks']['p50'] if 'landmarks' in stages else None
+            report['backends'][f"{detector_name}+{landmarks_name}"] = row
+
+            detect = f"{row['detect_ms']:.2f}" if row['detect_ms'] is not None else "-"
+            marks = f"{row['landmarks_ms']:.2f}" if row['landmarks_ms'] is not None else "-"
+            nme = f"{row['eye_nme']:.4f}" if row['eye_nme'] is not None else "-"
+            ear_error = f"{row['ear_error']:.4f}" if row['ear_error'] is not None else "-"
+            print(f"{detector_name:>8} {landmarks_name:>6} {load_ms:8.0f} {row['mean_ms']:8.2f} {detect:>7} "
+                  f"{marks:>7} {row['fps']:7.1f} {row['recall']:7.3f} {nme:>8} {ear_error:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Equivalence of chunked and unchunked batch analysis
+
+Scores videos with batch.analyse once as whole files and once split into
+chunks (each with its warm-up), and compares the two outputs:
+
+    frames    every column of <name>.frames.csv, to the precision it is written with
+    events    (kind, frame) of every event in <name>.events.jsonl
+
+Any difference is listed and the exit code is 1. The re-detect policy
+defaults to every_frame here: with tracking, a chunk's re-detect schedule
+can differ from the unchunked run and move landmarks slightly.
+
+    python -m benchmarks.chunking drive.mp4 --chunk-seconds 120 --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from backends import DEFAULT_DETECTOR, DEFAULT_LANDMARKS, DETECTORS, LANDMARK_MODELS
+from batch import FRAME_COLUMNS, analyse
+
+# Half a unit in the last digit written by batch.write_outputs, plus rounding slack
+TOLERANCE = {'time': 1e-3, 'ear': 1e-4, 'mar': 1e-4, 'perclos': 1e-4, 'fatigue': 0.1}
+
+
+def load_outputs(out_dir, path):
+    """(frame rows, [(kind, frame)]) written for one video"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    rows = np.loadtxt(os.path.join(out_dir, f"{name}.frames.csv"), delimiter=",", skiprows=1, ndmin=2)
+    with open(os.path.join(out_dir, f"{name}.events.jsonl")) as f:
+        events = [(event['kind'], event['frame']) for event in map(json.loads, f)]
+    return rows, events
+
+
+def compare(whole, chunked):
+    """{'frames': n, 'columns': {column: differing frames}, 'missing': [...], 'extra': [...]}"""
+    (rows, events), (chunk_rows, chunk_events) = whole, chunked
+    report = {'frames': len(rows), 'chunked_frames': len(chunk_rows), 'columns': {}}
+    if rows.shape == chunk_rows.shape:
+        for i, column in enumerate(FRAME_COLUMNS):
+            same = np.isclose(rows[:, i], chunk_rows[:, i], rtol=0, atol=TOLERANCE.get(column, 0), equal_nan=True)
+            if not same.all():
+                report['columns'][column] = rows[~same, 0].astype(int).tolist()
+    report['missing'] = sorted(set(events) - set(chunk_events))
+    report['extra'] = sorted(set(chunk_events) - set(events))
+    report['identical'] = (rows.shape == chunk_rows.shape and not report['columns']
+                           and events == chunk_events)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('videos', nargs='+')
+    parser.add_argument('--chunk-seconds', type=float, default=120.0)
+    parser.add_argument('--warmup', type=int, help='frames replayed before each chunk (default: batch.py default)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--policy', default='every_frame')
+    parser.add_argument('--detector', default=DEFAULT_DETECTOR, choices=tuple(DETECTORS))
+    parser.add_argument('--landmarks', default=DEFAULT_LANDMARKS, choices=tuple(LANDMARK_MODELS))
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    settings = {'redetect_policy': args.policy, 'detector_backend': args.detector,
+                'landmark_backend': args.landmarks}
+    with tempfile.TemporaryDirectory(prefix="chunking-") as tmp:
+        whole_dir, chunk_dir = os.path.join(tmp, "whole"), os.path.join(tmp, "chunked")
+        analyse(args.videos, whole_dir, args.workers, 0, **settings)
+        analyse(args.videos, chunk_dir, args.workers, args.chunk_seconds, args.warmup, **settings)
+        report = {path: compare(load_outputs(whole_dir, path), load_outputs(chunk_dir, path))
+                  for path in dict.fromkeys(args.videos)}
+
+    for path, result in report.items():
+        print(f"{path}: {result['frames']} frames, {'identical' if result['identical'] else 'DIFFERENT'}")
+        if result['chunked_frames'] != result['frames']:
+            print(f"  chunked run wrote {result['chunked_frames']} frames")
+        for column, frames in result['columns'].items():
+            print(f"  {column}: {len(frames)} frames differ, first at {frames[0]}")
+        for kind, frame in result['missing']:
+            print(f"  missing {kind} at frame {frame}")
+        for kind, frame in result['extra']:
+            print(f"  extra {kind} at frame {frame}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if not all(result['identical'] for result in report.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Labelled landmark fixtures for the replay benchmark
+
+A fixture is a sequence of 68-point landmark sets (NaN rows where no face
+is visible) plus ground truth: the eye-closure episodes as [start, end)
+frame ranges. Synthetic fixtures are generated from a seed, so the same
+command always produces byte-identical sequences; they are fed to
+FatigueEngine.process_landmarks, so they exercise the EAR state machine
+without a camera, face detection or model files (dlib must still be
+installed, as the engine imports it). Fixtures are stored as .npz:
+
+    shapes    (N, 68, 2) float32, NaN where no face
+    closures  (K, 2) int, [start, end) frame ranges with the eyes closed
+    fps       frame rate the sequence was recorded or generated at
+
+    python -m benchmarks.fixtures --out benchmarks/fixtures
+"""
+import argparse
+import os
+
+import numpy as np
+
+OPEN_EAR = 0.30
+CLOSED_EAR = 0.12
+EYE_WIDTH = 30.0
+
+# name -> (seed, seconds, long closures, face dropouts)
+DEFAULT_FIXTURES = {
+    'alert_driver': (1, 120, 0, 0),
+    'drowsy_driver': (2, 120, 4, 0),
+    'dropouts': (3, 120, 2, 6),
+}
+
+
+def face_template():
+    """A neutral 68-point face roughly 200 px wide, eyes open at OPEN_EAR"""
+    shape = np.zeros((68, 2), dtype=np.float64)
+    # Jaw, brows and nose: only need to be plausible, EAR/MAR ignore them
+    shape[0:17, 0] = np.linspace(200, 400, 17)
+    shape[0:17, 1] = 300 + 80 * np.sin(np.linspace(0, np.pi, 17))
+    shape[17:27, 0] = np.linspace(230, 370, 10)
+    shape[17:27, 1] = 240
+    shape[27:36, 0] = np.linspace(285, 315, 9)
+    shape[27:36, 1] = np.linspace(260, 330, 9)
+    # Mouth: outer lip 48-59, inner lip 60-67 with a small opening
+    angles = np.linspace(0, 2 * np.pi, 12, endpoint=False)
+    shape[48:60] = np.stack([300 + 40 * np.cos(angles), 370 + 15 * np.sin(angles)], axis=1)
+    shape[60:68] = [(265, 370), (280, 366), (300, 365), (320, 366),
+                    (335, 370), (320, 374), (300, 375), (280, 374)]
+    set_eyes(shape, OPEN_EAR)
+    return shape
+
+
+def set_eyes(shape, ear):
+    """Place both eyes (36-41 right, 42-47 left) so each has the given EAR"""
+    half = ear * EYE_WIDTH / 2.0
+    for first, x0 in ((36, 245.0), (42, 325.0)):
+        w = EYE_WIDTH
+        shape[first:first + 6] = [(x0, 270), (x0 + w / 3, 270 - half), (x0 + 2 * w / 3, 270 - half),
+                                  (x0 + w, 270), (x0 + 2 * w / 3, 270 + half), (x0 + w / 3, 270 + half)]
+    return shape
+
+
+def synthetic_sequence(seed, seconds=120, fps=30.0, long_closures=0, dropouts=0,
+                       long_seconds=(1.2, 3.0), blink_interval=(2.0, 6.0)):
+    """Generate (shapes, closures) for a driver blinking normally
+
+    Blinks last 3-6 frames. ``long_closures`` episodes last ``long_seconds``
+    and ``dropouts`` face-less gaps of 0.5-2 s are placed between episodes.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * fps)
+    ear = OPEN_EAR + rng.normal(0, 0.008, n)
+    closures = []
+
+    # Episode start times: regular blinks, some of them replaced by long closures
+    t = rng.uniform(*blink_interval)
+    starts = []
+    while t < seconds - max(long_seconds) - 1:
+        starts.append(int(t * fps))
+        t += rng.uniform(*blink_interval)
+    long_ids = set(rng.choice(len(starts), size=min(long_closures, len(starts)), replace=False).tolist())
+
+    for i, start in enumerate(starts):
+        if i in long_ids:
+            length = int(rng.uniform(*long_seconds) * fps)
+        else:
+            length = int(rng.integers(3, 7))
+        end = min(start + length, n)
+        if closures and start <= closures[-1][1]:
+            continue
+        ear[start:end] = CLOSED_EAR + rng.normal(0, 0.008, end - start)
+        closures.append((start, end))
+
+    # Face dropouts only in open-eye stretches so the ground truth stays exact
+    present = np.ones(n, dtype=bool)
+    gaps = [(a[1] + 5, b[0] - 5) for a, b in zip(closures, closures[1:])]
+    gaps = [(a, b) for a, b in gaps if b - a > int(2 * fps)]
+    for j in rng.permutation(len(gaps))[:dropouts]:
+        a, b = gaps[j]
+        length = int(rng.uniform(0.5, 2.0) * fps)
+        start = int(rng.integers(a, b - length))
+        present[start:start + length] = False
+
+    template = face_template()
+    shapes = np.empty((n, 68, 2), dtype=np.float32)
+    jitter = rng.normal(0, 0.3, (n, 2))
+    for i in range(n):
+        if not present[i]:
+            shapes[i] = np.nan
+            continue
+        shape = set_eyes(template.copy(), ear[i])
+        shapes[i] = shape + jitter[i]
+    return shapes, np.array(closures, dtype=np.int64).reshape(-1, 2)
+
+
+def save_fixture(path, shapes, closures, fps):
+    np.savez_compressed(path, shapes=shapes, closures=closures, fps=np.float64(fps))
+
+
+def load_fixture(path):
+    """Return (shapes, closures, fps) of a stored fixture"""
+    with np.load(path) as data:
+        return data['shapes'], data['closures'], float(data['fps'])
+
+
+def default_fixtures(fps=30.0):
+    """{name: (shapes, closures, fps)} of the built-in synthetic set"""
+    return {name: (*synthetic_sequence(seed, seconds, fps, long_closures, dropouts), fps)
+            for name, (seed, seconds, long_closures, dropouts) in DEFAULT_FIXTURES.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the built-in synthetic fixtures")
+    parser.add_argument('--out', default=os.path.join('benchmarks', 'fixtures'))
+    parser.add_argument('--fps', type=float, default=30.0)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for name, (shapes, closures, fps) in default_fixtures(args.fps).items():
+        path = os.path.join(args.out, f"{name}.npz")
+        save_fixture(path, shapes, closures, fps)
+        print(f"{path}: {len(shapes)} frames, {len(closures)} closures")
+
+
+if __name__ == '__main__':
+    main()
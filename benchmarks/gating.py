@@ -0,0 +1,117 @@
+"""CPU savings and accuracy cost of change-gated inference
+
+Replays labelled videos (``drive.mp4`` plus ``drive.labels.json``, as for
+benchmarks.replay) through the full detector once without the change gate
+and once per gate threshold, and reports for each run:
+
+    skipped     fraction of frames that reused the last landmarks
+    fps         engine throughput
+    blinks      blink events found / labelled closures, and closures with a matching blink
+    alerts      alert recall against the labels and mean delay in frames
+    agreement   fraction of the ungated run's blink and alert events also found, at the same frame +- tolerance
+
+    python -m benchmarks.gating drive.mp4 --thresholds 2 3 5 8 --max-skip 4 --json gating.json
+"""
+import argparse
+import json
+import time
+
+from backends import DEFAULT_DETECTOR, DEFAULT_LANDMARKS, DETECTORS, LANDMARK_MODELS
+from benchmarks.replay import accuracy, load_video
+from engine import FatigueEngine
+from gating import DEFAULT_MAX_SKIP
+
+
+def run(engine, frames, fps):
+    """Replay frames; returns (seconds, skipped frames, blink frames, alert frames)"""
+    engine.reset()
+    blinks, alerts = [], []
+    skipped = 0
+    start = time.perf_counter()
+    for index, frame in enumerate(frames):
+        result = engine.process(frame, index / fps)
+        skipped += result.skipped
+        blinks.extend(event.frame_index for event in result.events if event.kind == "blink")
+        alerts.extend(event.frame_index for event in result.events if event.kind == "alert")
+    return time.perf_counter() - start, skipped, blinks, alerts
+
+
+def matched(frames, reference, tolerance):
+    """How many reference frames have a frame within tolerance (each used once)"""
+    unmatched = list(frames)
+    found = 0
+    for frame in reference:
+        match = next((f for f in unmatched if abs(f - frame) <= tolerance), None)
+        if match is not None:
+            unmatched.remove(match)
+            found += 1
+    return found
+
+
+def blink_recall(closures, blinks, tolerance):
+    """Fraction of labelled closures followed by a blink event when the eyes reopen"""
+    found = sum(any(start <= frame <= end + tolerance for frame in blinks) for start, end in closures)
+    return found / len(closures) if len(closures) else 1.0
+
+
+def row(run_result, frames, closures, fps, alert_seconds, tolerance, baseline=None):
+    elapsed, skipped, blinks, alerts = run_result
+    result = {
+        'skipped': skipped / len(frames),
+        'fps': len(frames) / elapsed if elapsed > 0 else None,
+        'blink_recall': blink_recall(closures, blinks, tolerance),
+        'accuracy': accuracy(closures, alerts, len(blinks), fps, alert_seconds, tolerance),
+    }
+    if baseline is not None:
+        _, _, base_blinks, base_alerts = baseline
+        events = len(base_blinks) + len(base_alerts)
+        agreement = matched(blinks, base_blinks, tolerance) + matched(alerts, base_alerts, tolerance)
+        result['agreement'] = agreement / events if events else 1.0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('videos', nargs='+', help='labelled videos')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[2.0, 3.0, 5.0, 8.0],
+                        help='gate thresholds in mean grey levels')
+    parser.add_argument('--max-skip', type=int, default=DEFAULT_MAX_SKIP)
+    parser.add_argument('--frames', type=int, help='limit frames per video')
+    parser.add_argument('--tolerance', type=int, default=2, help='event frame matching tolerance')
+    parser.add_argument('--model', help="landmark model file (default: the landmark backend's)")
+    parser.add_argument('--detector', default=DEFAULT_DETECTOR, choices=tuple(DETECTORS))
+    parser.add_argument('--landmarks', default=DEFAULT_LANDMARKS, choices=tuple(LANDMARK_MODELS))
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    engine = FatigueEngine(args.model, detector_backend=args.detector, landmark_backend=args.landmarks)
+    engine.load()
+    report = {'settings': engine.settings(), 'max_skip': args.max_skip, 'videos': {}}
+    print(f"{'video':<20}{'threshold':>10}{'skipped':>9}{'fps':>9}{'blinks':>9}{'recall':>8}"
+          f"{'alerts':>8}{'delay':>7}{'agree':>7}")
+    for path in args.videos:
+        frames, closures, fps = load_video(path, args.frames)
+        engine.configure(change_threshold=0)
+        baseline = run(engine, frames, fps)
+        rows = {'off': row(baseline, frames, closures, fps, engine.alert_seconds, args.tolerance)}
+        for threshold in args.thresholds:
+            engine.configure(change_threshold=threshold, max_skip=args.max_skip)
+            rows[f"{threshold:g}"] = row(run(engine, frames, fps), frames, closures, fps, engine.alert_seconds,
+                                         args.tolerance, baseline)
+        report['videos'][path] = {'frames': len(frames), 'closures': len(closures), 'runs': rows}
+        for name, result in rows.items():
+            acc = result['accuracy']
+            delay = f"{acc['alert_delay_frames']:.1f}" if acc['alert_delay_frames'] is not None else "-"
+            agreement = f"{result['agreement']:.2f}" if 'agreement' in result else "-"
+            print(f"{path[-20:]:<20}{name:>10}{result['skipped']:9.1%}{result['fps']:9.1f}"
+                  f"{acc['blinks']:>4}/{acc['blinks_expected']:<4}{result['blink_recall']:8.2f}"
+                  f"{acc['alert_recall']:8.2f}{delay:>7}{agreement:>7}")
+    engine.configure(change_threshold=0)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Throughput, latency and equivalence of frame-parallel inference
+
+Runs the first frames of a recorded video through FatigueEngine.process
+with the every_frame policy, then through ParallelInference with each
+worker count, feeding frames as fast as they are accepted, and reports:
+
+    fps         frames per second through the whole pipeline
+    latency     p50/p95 ms from submitting a frame to its result
+    identical   whether every FrameResult matches the serial run
+
+    python -m benchmarks.parallel drive.mp4 --workers 1 2 4 8 --json parallel.json
+"""
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from backends import DEFAULT_DETECTOR, DEFAULT_LANDMARKS, DETECTORS, LANDMARK_MODELS
+from engine import FatigueEngine
+from parallel import DEPTH_PER_WORKER, ParallelInference, create_pool
+from pipeline import FramePacket
+
+
+def load_frames(path, limit):
+    """Decode up to limit BGR frames and the video frame rate (decode time is not benchmarked)"""
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames, fps
+
+
+def signature(result):
+    """What must not change between serial and parallel processing"""
+    faces = [(face.face_id, face.box, face.driver, None if face.ear is None else round(face.ear, 6))
+             for face in result.faces]
+    events = [(event.kind, event.frame_index) for event in result.events]
+    return faces, result.alarm_on, result.counter, events
+
+
+def run_serial(engine, frames, fps):
+    latencies, results = [], []
+    start = time.perf_counter()
+    for index, frame in enumerate(frames):
+        submitted = time.perf_counter()
+        results.append(signature(engine.process(frame, index / fps)))
+        latencies.append(time.perf_counter() - submitted)
+    return time.perf_counter() - start, latencies, results
+
+
+def run_parallel(engine, frames, fps, workers, depth):
+    pool = create_pool(engine, workers)
+    inference = ParallelInference(pool, engine, depth or DEPTH_PER_WORKER * workers)
+    latencies, results, submitted = [], [], {}
+
+    def finish(packet):
+        results.append(signature(inference.process(packet)))
+        latencies.append(time.perf_counter() - submitted.pop(packet.index))
+
+    start = time.perf_counter()
+    for index, frame in enumerate(frames):
+        while inference.full:
+            finish(inference.collect(None))
+        submitted[index] = time.perf_counter()
+        inference.submit(FramePacket(index, index / fps, frame))
+        packet = inference.collect()
+        while packet is not None:
+            finish(packet)
+            packet = inference.collect()
+    while inference.pending:
+        finish(inference.collect(None))
+    elapsed = time.perf_counter() - start
+    inference.close()
+    pool.shutdown()
+    return elapsed, latencies, results
+
+
+def row(elapsed, latencies, results, reference):
+    latencies = np.array(latencies) * 1000.0
+    return {
+        'fps': len(results) / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'identical': results == reference,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('video')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--depth', type=int, default=0,
+                        help=f'frames in flight (default {DEPTH_PER_WORKER} per worker)')
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--width', type=int, default=0, help='detection width (default full resolution)')
+    parser.add_argument('--detector', default=DEFAULT_DETECTOR, choices=tuple(DETECTORS))
+    parser.add_argument('--landmarks', default=DEFAULT_LANDMARKS, choices=tuple(LANDMARK_MODELS))
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    frames, fps = load_frames(args.video, args.frames)
+    if not frames:
+        parser.error(f"Could not read frames from {args.video}")
+    engine = FatigueEngine(redetect_policy='every_frame', process_width=args.width,
+                           detector_backend=args.detector, landmark_backend=args.landmarks)
+    engine.load()
+
+    # A fresh clone per run, so face ids start from zero every time
+    serial = run_serial(engine.clone(), frames, fps)
+    reference = serial[2]
+    report = {'video': args.video, 'frames': len(frames), 'resolution': list(frames[0].shape[1::-1]),
+              'serial': row(*serial, reference), 'workers': {}}
+    print(f"{'workers':>8} {'fps':>7} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} identical")
+    base = report['serial']['fps']
+    print(f"{'serial':>8} {base:7.1f} {1.0:8.2f} {report['serial']['p50_ms']:8.1f} "
+          f"{report['serial']['p95_ms']:8.1f} yes")
+    for workers in args.workers:
+        result = row(*run_parallel(engine.clone(), frames, fps, workers, args.depth), reference)
+        report['workers'][str(workers)] = result
+        print(f"{workers:>8} {result['fps']:7.1f} {result['fps'] / base:8.2f} {result['p50_ms']:8.1f} "
+              f"{result['p95_ms']:8.1f} {'yes' if result['identical'] else 'NO'}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
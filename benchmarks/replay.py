@@ -0,0 +1,256 @@
+"""Reproducible replay benchmark for the detection pipeline
+
+Replays fixed frame or landmark sequences through FatigueEngine with no
+camera and no GUI, and reports, per fixture:
+
+    throughput   frames per second of engine processing
+    stages       p50/p95/p99 ms of every profiled stage
+    memory       peak traced Python/NumPy allocation (separate pass) and peak RSS
+    accuracy     blink count and alert frames against labelled ground truth
+
+Fixtures are .npz landmark sequences (see benchmarks.fixtures), replayed
+with process_landmarks, or video files with a ``<video>.labels.json`` next
+to them holding {"closures": [[start, end], ...]}, replayed through the
+full detector. Without arguments the built-in synthetic set is used.
+
+    python -m benchmarks.replay --json bench.json
+    python -m benchmarks.replay drive.mp4 benchmarks/fixtures/*.npz --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from benchmarks.fixtures import default_fixtures, load_fixture
+from backends import DEFAULT_DETECTOR, DEFAULT_LANDMARKS, DETECTORS, LANDMARK_MODELS
+from engine import FatigueEngine
+from metrics import StageProfiler
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Landmark fixtures never reach the face models, so they are not loaded
+_NO_MODEL = object()
+
+
+def load_video(path, limit=None):
+    """Decode a video fixture up front (decode time is not benchmarked)"""
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = []
+    while limit is None or len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    with open(os.path.splitext(path)[0] + ".labels.json") as f:
+        closures = np.array(json.load(f)['closures'], dtype=np.int64).reshape(-1, 2)
+    return frames, closures, fps
+
+
+def landmark_faces(shape):
+    """process_landmarks input for one fixture frame"""
+    if np.isnan(shape[0, 0]):
+        return []
+    x0, y0 = shape.min(axis=0)
+    x1, y1 = shape.max(axis=0)
+    return [((int(x0), int(y0), int(x1 - x0), int(y1 - y0)), shape)]
+
+
+def replay(engine, items, fps, landmarks):
+    """Run every item through the engine; returns (seconds, alert frames, blinks)"""
+    engine.reset()
+    step = engine.process_landmarks if landmarks else engine.process
+    alerts = []
+    blinks = 0
+    start = time.perf_counter()
+    for index, item in enumerate(items):
+        frame_start = time.perf_counter()
+        result = step(landmark_faces(item) if landmarks else item, index / fps)
+        engine.profiler.record("frame", time.perf_counter() - frame_start)
+        alerts.extend(event.frame_index for event in result.events if event.kind == "alert")
+        blinks = result.blinks
+    return time.perf_counter() - start, alerts, blinks
+
+
+def expected_alerts(closures, fps, alert_seconds):
+    """First frame of each closure at which the eyes have been closed for alert_seconds"""
+    expected = []
+    for start, end in closures:
+        # Same timestamps as replay(): frame index / fps
+        closed_for = np.arange(start, end) / fps - start / fps
+        reached = np.flatnonzero(closed_for >= alert_seconds)
+        if len(reached):
+            expected.append(int(start + reached[0]))
+    return expected
+
+
+def accuracy(closures, alerts, blinks, fps, alert_seconds, tolerance):
+    expected = expected_alerts(closures, fps, alert_seconds)
+    unmatched = list(alerts)
+    delays = []
+    for frame in expected:
+        match = next((a for a in unmatched if abs(a - frame) <= tolerance), None)
+        if match is not None:
+            unmatched.remove(match)
+            delays.append(match - frame)
+    return {
+        'blinks': blinks,
+        'blinks_expected': len(closures),
+        'blink_error': blinks - len(closures),
+        'alerts': len(alerts),
+        'alerts_expected': len(expected),
+        'alert_recall': len(delays) / len(expected) if expected else 1.0,
+        'alert_precision': len(delays) / len(alerts) if alerts else 1.0,
+        'alert_delay_frames': float(np.mean(delays)) if delays else None,
+    }
+
+
+def peak_memory(engine, items, fps, landmarks):
+    """Peak traced allocation (MB) of a second, untimed replay"""
+    tracemalloc.start()
+    try:
+        replay(engine, items, fps, landmarks)
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def peak_rss():
+    """Peak resident set size of this process in MB (None where unavailable)"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if sys.platform == "darwin" else rss / 1e3
+
+
+def benchmark(name, engine, items, closures, fps, landmarks, tolerance=2, memory=True, repeat=3):
+    engine.profiler.reset()
+    # Best of several runs; every run produces the same alerts and blinks
+    elapsed, alerts, blinks = min((replay(engine, items, fps, landmarks) for _ in range(repeat)),
+                                  key=lambda run: run[0])
+    stages = engine.profiler.snapshot()
+    return {
+        'fixture': name,
+        'kind': 'landmarks' if landmarks else 'video',
+        'frames': len(items),
+        'seconds': elapsed,
+        'fps': len(items) / elapsed if elapsed > 0 else None,
+        'stages': stages,
+        'peak_traced_mb': peak_memory(engine, items, fps, landmarks) if memory else None,
+        'peak_rss_mb': peak_rss(),
+        'accuracy': accuracy(closures, alerts, blinks, fps, engine.alert_seconds, tolerance),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline, max_slowdown):
+    """Print per-fixture deltas against a baseline report; returns the regressions"""
+    regressions = []
+    old = {row['fixture']: row for row in baseline['fixtures']}
+    for row in report['fixtures']:
+        ref = old.get(row['fixture'])
+        if ref is None or not ref['fps'] or not row['fps']:
+            continue
+        change = row['fps'] / ref['fps'] - 1.0
+        print(f"{row['fixture']:<20} fps {ref['fps']:9.1f} -> {row['fps']:9.1f} ({change:+.1%})")
+        if change < -max_slowdown:
+            regressions.append(f"{row['fixture']}: throughput {change:+.1%}")
+        for key in ('alert_recall', 'alert_precision'):
+            if row['accuracy'][key] < ref['accuracy'][key]:
+                regressions.append(f"{row['fixture']}: {key} {ref['accuracy'][key]:.3f} -> "
+                                   f"{row['accuracy'][key]:.3f}")
+        if abs(row['accuracy']['blink_error']) > abs(ref['accuracy']['blink_error']):
+            regressions.append(f"{row['fixture']}: blink error {ref['accuracy']['blink_error']} -> "
+                               f"{row['accuracy']['blink_error']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('fixtures', nargs='*', help='.npz landmark fixtures or labelled videos')
+    parser.add_argument('--frames', type=int, help='limit frames per video fixture')
+    parser.add_argument('--tolerance', type=int, default=2, help='alert frame matching tolerance')
+    parser.add_argument('--repeat', type=int, default=3, help='report the fastest of this many runs')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--model', help="landmark model file (default: the landmark backend's)")
+    parser.add_argument('--detector', default=DEFAULT_DETECTOR, choices=tuple(DETECTORS),
+                        help='face detector for video fixtures')
+    parser.add_argument('--landmarks', default=DEFAULT_LANDMARKS, choices=tuple(LANDMARK_MODELS),
+                        help='landmark model for video fixtures')
+    parser.add_argument('--json', help='write the report to this file')
+    parser.add_argument('--compare', help='baseline report to check for regressions')
+    parser.add_argument('--max-slowdown', type=float, default=0.10,
+                        help='allowed throughput drop against the baseline (fraction)')
+    args = parser.parse_args()
+
+    videos = [path for path in args.fixtures if not path.endswith(".npz")]
+    profiler = StageProfiler(window=1_000_000)
+    # Landmark fixtures are 68-point sequences whatever backend the videos use
+    landmark_engine = FatigueEngine(detector=_NO_MODEL, predictor=_NO_MODEL, profiler=profiler)
+    engine = FatigueEngine(args.model, detector_backend=args.detector, landmark_backend=args.landmarks,
+                           profiler=profiler) if videos else landmark_engine
+
+    if args.fixtures:
+        fixtures = {}
+        for path in args.fixtures:
+            name = os.path.splitext(os.path.basename(path))[0]
+            if path.endswith(".npz"):
+                fixtures[name] = (*load_fixture(path), True)
+            else:
+                frames, closures, fps = load_video(path, args.frames)
+                fixtures[name] = (frames, closures, fps, False)
+    else:
+        fixtures = {name: (*fixture, True) for name, fixture in default_fixtures().items()}
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'settings': engine.settings(),
+        'fixtures': [],
+    }
+    print(f"{'fixture':<20}{'frames':>8}{'fps':>11}{'frame p95':>11}{'peak MB':>9}"
+          f"{'blinks':>9}{'alerts':>9}{'recall':>8}")
+    for name, (items, closures, fps, landmarks) in fixtures.items():
+        row = benchmark(name, landmark_engine if landmarks else engine, items, closures, fps, landmarks,
+                        args.tolerance, memory=not args.no_memory, repeat=max(args.repeat, 1))
+        report['fixtures'].append(row)
+        acc = row['accuracy']
+        peak = f"{row['peak_traced_mb']:.1f}" if row['peak_traced_mb'] is not None else "-"
+        print(f"{name:<20}{row['frames']:>8}{row['fps']:11.1f}{row['stages']['frame']['p95']:11.3f}"
+              f"{peak:>9}{acc['blinks']:>4}/{acc['blinks_expected']:<4}"
+              f"{acc['alerts']:>4}/{acc['alerts_expected']:<4}{acc['alert_recall']:8.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.max_slowdown)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Speed/accuracy trade-off of the detection resolution
+
+Replays the first frames of a recorded video through FaceTracker at several
+processing widths and compares each against full-resolution detection on
+every frame. Landmark error is the mean point distance normalised by the
+inter-ocular distance (NME), the usual landmark accuracy measure, and EAR
+error is the mean absolute EAR difference on frames where both found a face.
+
+    python -m benchmarks.resolution drive.mp4 --widths 0 960 640 480 320
+"""
+import argparse
+import json
+import time
+
+import cv2
+import dlib
+import numpy as np
+
+from detection import FaceTracker
+from ear import eye_aspect_ratio
+
+
+def load_frames(path, limit):
+    """Decode up to limit grayscale frames (decode time is not benchmarked)"""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    cap.release()
+    return frames
+
+
+def run(tracker, frames):
+    """Return per-frame (seconds, first-face landmarks or None)"""
+    tracker.reset()
+    results = []
+    for gray in frames:
+        start = time.perf_counter()
+        tracks = tracker.update(gray)
+        elapsed = time.perf_counter() - start
+        results.append((elapsed, tracks[0].shape.copy() if tracks else None))
+    return results
+
+
+def landmark_nme(shape, reference):
+    """Mean landmark error normalised by the reference inter-ocular distance"""
+    interocular = np.linalg.norm(reference[36:42].mean(axis=0) - reference[42:48].mean(axis=0))
+    error = np.linalg.norm(shape.astype(float) - reference, axis=1).mean()
+    return error / max(interocular, 1.0)
+
+
+def compare(results, reference):
+    times = np.array([elapsed for elapsed, _ in results]) * 1000.0
+    found = [shape is not None for _, shape in results]
+    ref_found = [shape is not None for _, shape in reference]
+    pairs = [(shape, ref) for (_, shape), (_, ref) in zip(results, reference)
+             if shape is not None and ref is not None]
+    errors = [landmark_nme(shape, ref) for shape, ref in pairs]
+    if pairs:
+        shapes, refs = np.stack([p[0] for p in pairs]), np.stack([p[1] for p in pairs])
+        ear_error = float(np.abs(eye_aspect_ratio(shapes) - eye_aspect_ratio(refs)).mean())
+    else:
+        ear_error = None
+    recall = sum(f and r for f, r in zip(found, ref_found)) / max(sum(ref_found), 1)
+    return {
+        'mean_ms': float(times.mean()),
+        'p95_ms': float(np.percentile(times, 95)),
+        'fps': float(1000.0 / times.mean()),
+        'recall': float(recall),
+        'nme': float(np.mean(errors)) if errors else None,
+        'ear_error': ear_error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('video')
+    parser.add_argument('--widths', type=int, nargs='+', default=[0, 960, 640, 480, 320])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--policy', default='every_frame',
+                        help='re-detect policy used for every width (default isolates resolution)')
+    parser.add_argument('--interval', type=int, default=5)
+    parser.add_argument('--model', default='shape_predictor_68_face_landmarks.dat')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    if not frames:
+        parser.error(f"Could not read frames from {args.video}")
+    detector = dlib.get_frontal_face_detector()
+    predictor = dlib.shape_predictor(args.model)
+
+    reference = run(FaceTracker(detector, predictor, policy='every_frame', process_width=0), frames)
+
+    report = {'video': args.video, 'frames': len(frames),
+              'resolution': list(frames[0].shape[::-1]), 'widths': {}}
+    print(f"{'width':>6} {'mean ms':>8} {'p95 ms':>8} {'fps':>7} {'recall':>7} {'NME':>7} {'EAR err':>8}")
+    for width in args.widths:
+        tracker = FaceTracker(detector, predictor, args.interval, args.policy, process_width=width)
+        row = compare(run(tracker, frames), reference)
+        report['widths'][str(width)] = row
+        nme = f"{row['nme']:.4f}" if row['nme'] is not None else "-"
+        ear_error = f"{row['ear_error']:.4f}" if row['ear_error'] is not None else "-"
+        print(f"{width or 'full':>6} {row['mean_ms']:8.2f} {row['p95_ms']:8.2f} "
+              f"{row['fps']:7.1f} {row['recall']:7.3f} {nme:>7} {ear_error:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,442 @@
+"""Long-run soak test with memory and resource-leak tracking
+
+Drives the engine, or the engine inside a monitoring pipeline, through
+hours of simulated driving at an accelerated rate and samples the process
+periodically:
+
+    rss        resident set size
+    traced     Python/NumPy heap (tracemalloc), with the allocators that grew most
+    threads    live threads, by name
+    handles    open file descriptors (handles on Windows, with psutil)
+
+Growth is the median of the last WINDOW_SAMPLES samples minus the median
+of the first WINDOW_SAMPLES after a warm-up, the same statistic at both
+ends, so a single peak or dip at either end (a restart freeing the clip
+ring, say) neither hides nor fakes growth; exceeding any limit fails the run (exit code 1) with a report of
+what grew.
+
+Modes:
+
+    engine   FatigueEngine.process on this thread as fast as it runs
+    stream   a MultiCameraMonitor stream with its capture, inference and
+             render threads, session recorder and alert clips, fed
+             --speed times faster than real time and restarted every
+             --restart-minutes of simulated time like a new shift
+
+Neither mode covers the GUI: the stream's render stage returns nothing, so
+main.py's overlays, tile compositing and Tk image updates are not soaked.
+
+Frames replay the built-in synthetic drivers (blinks, long closures, face
+dropouts; see benchmarks.fixtures) and stand-in face models read each
+frame's landmarks back from a tag drawn into it, so no camera or model
+files are needed; the engine still imports dlib.
+
+    python -m benchmarks.soak --hours 12 --mode stream --json soak.json
+"""
+import argparse
+import collections
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.fixtures import default_fixtures
+from engine import FatigueEngine
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+FRAME_SIZE = (640, 480)
+TAG_MARK = 255  # starts the 4-pixel tag repeated along every row; tag bytes are 0-254
+FACE_MARGIN = 0.15  # detector box around the landmarks, as real detectors return
+WINDOW_SAMPLES = 5  # samples at each end of the run whose medians growth is measured between
+
+
+class Box:
+    """Face box with the dlib.rectangle accessors the tracker uses"""
+
+    def __init__(self, left, top, right, bottom):
+        self._box = (left, top, right, bottom)
+
+    def left(self):
+        return self._box[0]
+
+    def top(self):
+        return self._box[1]
+
+    def right(self):
+        return self._box[2]
+
+    def bottom(self):
+        return self._box[3]
+
+    def width(self):
+        return self._box[2] - self._box[0] + 1
+
+    def height(self):
+        return self._box[3] - self._box[1] + 1
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class Shape:
+    """Landmarks with the dlib.full_object_detection accessors imutils reads"""
+
+    def __init__(self, rect, points):
+        self.rect = rect
+        self.points = points
+
+    @property
+    def num_parts(self):
+        return len(self.points)
+
+    def part(self, i):
+        return self.points[i]
+
+
+class SyntheticScene:
+    """Tagged frames of the synthetic drivers plus face models that read the tags back
+
+    Every row of a frame repeats [TAG_MARK, b0, b1, b2], the frame index in
+    base 255, so any crop the tracker hands to the predictor still carries
+    it. The detector returns the box of the landmarks for that index and
+    the predictor returns those landmarks placed relative to the box it is
+    given, like a real model.
+    """
+
+    def __init__(self):
+        self.shapes = np.concatenate([shapes for shapes, _, _ in default_fixtures().values()])
+        self.boxes = [self._face_box(shape) for shape in self.shapes]
+        self.fallback = next(i for i, box in enumerate(self.boxes) if box is not None)
+
+    @staticmethod
+    def _face_box(shape):
+        if np.isnan(shape[0, 0]):
+            return None
+        x0, y0 = shape.min(axis=0)
+        x1, y1 = shape.max(axis=0)
+        mx, my = (x1 - x0) * FACE_MARGIN, (y1 - y0) * FACE_MARGIN
+        return int(x0 - mx), int(y0 - my), int(x1 + mx), int(y1 + my)
+
+    def frame(self, index):
+        """BGR frame tagged with its index"""
+        tag = [TAG_MARK, index % 255, index // 255 % 255, index // 65025 % 255]
+        row = np.resize(np.array(tag, dtype=np.uint8), FRAME_SIZE[0])
+        frame = np.empty((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+        frame[:] = row[None, :, None]
+        return frame
+
+    @staticmethod
+    def _index(gray):
+        row = gray[0]
+        start = int(np.argmax(row == TAG_MARK))
+        b0, b1, b2 = (int(v) for v in row[start + 1:start + 4])
+        return b0 + 255 * b1 + 65025 * b2
+
+    def detector(self, gray, upsample=0):
+        box = self.boxes[self._index(gray) % len(self.boxes)]
+        return [Box(*box)] if box is not None else []
+
+    def predictor(self, gray, rect):
+        i = self._index(gray) % len(self.shapes)
+        shape, box = self.shapes[i], self.boxes[i]
+        if box is None:
+            # Tracking a face that has just gone: answer with some face, as a real model would
+            shape, box = self.shapes[self.fallback], self.boxes[self.fallback]
+        sx = rect.width() / max(box[2] - box[0] + 1, 1)
+        sy = rect.height() / max(box[3] - box[1] + 1, 1)
+        points = [Point(int(round(rect.left() + (x - box[0]) * sx)), int(round(rect.top() + (y - box[1]) * sy)))
+                  for x, y in shape]
+        return Shape(rect, points)
+
+
+class SyntheticCapture:
+    """CameraCapture stand-in producing tagged frames on a simulated clock
+
+    Frames are produced ``speed`` times faster than ``fps`` (as fast as
+    they are read with speed 0); their timestamps advance by 1 / fps each,
+    so the engine sees an ordinary camera. ``clock`` is the simulated time.
+    """
+
+    def __init__(self, scene, fps: float = 30.0, speed: float = 0.0, start_index: int = 0):
+        self.scene = scene
+        self.fps = fps
+        self.speed = speed
+        self.index = start_index
+        self.connected = False
+        self.next_frame = 0.0
+
+    @property
+    def clock(self):
+        return self.index / self.fps
+
+    def start(self):
+        self.connected = True
+        self.next_frame = time.monotonic()
+        return self
+
+    def stop(self):
+        self.connected = False
+
+    @property
+    def ended(self):
+        return not self.connected
+
+    def read(self, timeout: float = 1.0):
+        if not self.connected:
+            return False, None, None
+        if self.speed:
+            delay = self.next_frame - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_frame += 1.0 / (self.fps * self.speed)
+        index = self.index
+        self.index += 1
+        return True, self.scene.frame(index), index / self.fps
+
+
+def rss_mb():
+    """Current resident set size in MB (None where it cannot be read)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        pass
+    return psutil.Process().memory_info().rss / 1e6 if psutil else None
+
+
+def open_handles():
+    """Open file descriptors (handles on Windows); None where they cannot be counted"""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        pass
+    if psutil:
+        process = psutil.Process()
+        return process.num_handles() if sys.platform == "win32" else process.num_fds()
+    return None
+
+
+class ResourceSampler:
+    """Periodic samples of the process and the growth between them"""
+
+    def __init__(self, trace: bool = True, top: int = 10):
+        self.trace = trace
+        self.top = top
+        self.samples = []
+        self.baseline = None  # (index of the first sample, tracemalloc snapshot, thread names)
+        self.started = time.perf_counter()
+        if trace:
+            tracemalloc.start()
+
+    def sample(self, simulated, frames):
+        row = {
+            'hours': simulated / 3600.0,
+            'wall': time.perf_counter() - self.started,
+            'frames': frames,
+            'rss_mb': rss_mb(),
+            'traced_mb': tracemalloc.get_traced_memory()[0] / 1e6 if self.trace else None,
+            'threads': threading.active_count(),
+            'handles': open_handles(),
+        }
+        self.samples.append(row)
+        return row
+
+    def set_baseline(self):
+        """Measure growth from the latest sample on"""
+        snapshot = tracemalloc.take_snapshot() if self.trace else None
+        self.baseline = (len(self.samples) - 1, snapshot, self._thread_names())
+
+    @property
+    def measured(self):
+        """Samples from the baseline on"""
+        return self.samples[self.baseline[0]:] if self.baseline else []
+
+    @staticmethod
+    def _thread_names():
+        return collections.Counter(thread.name for thread in threading.enumerate())
+
+    def growth(self):
+        """{metric: growth} from the median of the first to the median of the last WINDOW_SAMPLES samples"""
+        head = self.measured[:WINDOW_SAMPLES]
+        tail = self.measured[-WINDOW_SAMPLES:]
+        growth = {}
+        for key in ('rss_mb', 'traced_mb', 'threads', 'handles'):
+            if head[0][key] is None:
+                continue
+            growth[key] = float(np.median([row[key] for row in tail]) - np.median([row[key] for row in head]))
+        return growth
+
+    def top_allocators(self):
+        """Source lines whose traced allocations grew most since the baseline"""
+        if not self.trace or self.baseline is None:
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)])
+        stats = snapshot.compare_to(self.baseline[1], 'lineno')
+        return [{'where': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 'size_kb': stat.size_diff / 1e3, 'count': stat.count_diff}
+                for stat in stats[:self.top] if stat.size_diff > 0]
+
+    def threads_added(self):
+        """Thread names running now that were not at the baseline (with counts)"""
+        added = self._thread_names() - self.baseline[2]
+        return dict(added)
+
+    def close(self):
+        if self.trace:
+            tracemalloc.stop()
+
+
+def soak_engine(args, scene):
+    """Run the engine on this thread; yields (simulated seconds, frames) at every sample point"""
+    engine = FatigueEngine(detector=scene.detector, predictor=scene.predictor)
+    events = collections.Counter()
+    engine.add_listener(lambda event: events.update((event.kind,)))
+    every = max(int(args.sample_minutes * 60 * args.fps), 1)
+    total = int(args.hours * 3600 * args.fps)
+    for index in range(total):
+        engine.process(scene.frame(index), index / args.fps)
+        if (index + 1) % every == 0:
+            yield (index + 1) / args.fps, index + 1
+    print("Events:", dict(events))
+
+
+def soak_stream(args, scene):
+    """Run a monitored stream; yields (simulated seconds, frames) at every sample point"""
+    # Imported here: the engine mode needs none of the stream stack
+    from multicam import MultiCameraMonitor
+
+    out_dir = tempfile.mkdtemp(prefix="soak-")
+    template = FatigueEngine(detector=scene.detector, predictor=scene.predictor)
+    captures = []
+
+    def capture(source, **settings):
+        start = captures[-1].index if captures else 0
+        captures.append(SyntheticCapture(scene, args.fps, args.speed, start))
+        return captures[-1]
+
+    monitor = MultiCameraMonitor(["synthetic"], template, workers=1, render=lambda stream, packet: None,
+                                 render_fps=args.render_fps, record_dir=os.path.join(out_dir, "sessions"),
+                                 clip_dir=os.path.join(out_dir, "clips"), capture_factory=capture)
+    events = collections.Counter()
+    monitor.add_listener(lambda stream, event: events.update((event.kind,)))
+    alarm = None
+    if args.alarm:
+        from alerts import AlarmPlayer
+        alarm = AlarmPlayer(args.alarm)
+        monitor.add_listener(lambda stream, event: alarm.alert(stream.name) if event.kind == "alert"
+                             else alarm.clear(stream.name) if event.kind == "alert_cleared" else None)
+    try:
+        monitor.start()
+        next_sample = args.sample_minutes * 60
+        next_restart = args.restart_minutes * 60 if args.restart_minutes else None
+        end = args.hours * 3600
+        while True:
+            time.sleep(0.05)
+            clock = captures[-1].clock
+            if next_restart is not None and clock >= next_restart:
+                monitor.stop()
+                monitor.start()
+                next_restart += args.restart_minutes * 60
+            if clock >= next_sample:
+                yield clock, captures[-1].index
+                next_sample += args.sample_minutes * 60
+            if clock >= end:
+                break
+    finally:
+        monitor.stop()
+        if alarm:
+            alarm.close()
+        shutil.rmtree(out_dir, ignore_errors=True)
+    print("Events:", dict(events))
+
+
+def check(growth, limits):
+    """Limit violations as readable strings"""
+    failures = []
+    for key, limit in limits.items():
+        if limit is not None and key in growth and growth[key] > limit:
+            failures.append(f"{key} grew by {growth[key]:.1f} (limit {limit:g})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=("engine", "stream"), default="engine")
+    parser.add_argument('--hours', type=float, default=12.0, help='simulated driving time')
+    parser.add_argument('--fps', type=float, default=30.0, help='simulated camera frame rate')
+    parser.add_argument('--speed', type=float, default=20.0,
+                        help='stream mode: frames per real second as a multiple of --fps (0 = as fast as possible)')
+    parser.add_argument('--render-fps', type=float, default=10.0, help='stream mode: render stage rate')
+    parser.add_argument('--restart-minutes', type=float, default=60.0,
+                        help='stream mode: stop and start the monitor this often, in simulated minutes (0 = never)')
+    parser.add_argument('--alarm', metavar='WAV', help='stream mode: also sound alerts through AlarmPlayer')
+    parser.add_argument('--sample-minutes', type=float, default=10.0, help='simulated minutes between samples')
+    parser.add_argument('--warmup-minutes', type=float, default=30.0,
+                        help='simulated minutes before the baseline sample')
+    parser.add_argument('--max-rss-mb', type=float, default=50.0, help='allowed RSS growth')
+    parser.add_argument('--max-traced-mb', type=float, default=10.0, help='allowed traced heap growth')
+    parser.add_argument('--max-threads', type=int, default=0, help='allowed growth of the live thread count')
+    parser.add_argument('--max-handles', type=int, default=0, help='allowed growth of open handles')
+    parser.add_argument('--no-tracemalloc', action='store_true', help='faster, but no heap or allocator report')
+    parser.add_argument('--json', help='write the report to this file')
+    args = parser.parse_args()
+
+    scene = SyntheticScene()
+    sampler = ResourceSampler(trace=not args.no_tracemalloc)
+    run = soak_engine if args.mode == "engine" else soak_stream
+    print(f"{'hours':>6}{'wall s':>8}{'frames':>10}{'RSS MB':>9}{'heap MB':>9}{'threads':>8}{'handles':>8}")
+    try:
+        for simulated, frames in run(args, scene):
+            row = sampler.sample(simulated, frames)
+            if sampler.baseline is None and simulated >= args.warmup_minutes * 60:
+                sampler.set_baseline()
+            print(f"{row['hours']:6.2f}{row['wall']:8.0f}{row['frames']:10d}"
+                  f"{row['rss_mb'] or 0:9.1f}{row['traced_mb'] or 0:9.2f}{row['threads']:8d}{row['handles'] or 0:8d}")
+    except KeyboardInterrupt:
+        print("Interrupted")
+
+    report = {'mode': args.mode, 'hours': args.hours, 'fps': args.fps, 'samples': sampler.samples,
+              'limits': {'rss_mb': args.max_rss_mb, 'traced_mb': args.max_traced_mb,
+                         'threads': args.max_threads, 'handles': args.max_handles}}
+    if len(sampler.measured) < 2 * WINDOW_SAMPLES:
+        report['failures'] = [f"{len(sampler.measured)} samples after the warm-up, {2 * WINDOW_SAMPLES} needed; "
+                              "run longer or sample more often"]
+    else:
+        report['growth'] = sampler.growth()
+        report['top_allocators'] = sampler.top_allocators()
+        report['threads_added'] = sampler.threads_added()
+        report['failures'] = check(report['growth'], report['limits'])
+        print("Growth since warm-up:", {key: round(value, 2) for key, value in report['growth'].items()})
+        for row in report['top_allocators']:
+            print(f"  {row['size_kb']:+10.1f} kB {row['count']:+8d} blocks  {row['where']}")
+        if report['threads_added']:
+            print("Threads added:", report['threads_added'])
+    sampler.close()
+    report['passed'] = not report['failures']
+    for failure in report['failures']:
+        print("FAIL", failure)
+    print("PASS" if report['passed'] else "FAILED")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if not report['passed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
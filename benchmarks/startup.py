@@ -0,0 +1,59 @@
+"""Cold-start time of the GUI
+
+Launches ``main.py --exit-after-startup`` several times and reports the
+median of every startup phase the app logs (window shown, deferred
+imports, model load, Start enabled) together with the wall time of the
+whole process, which also covers interpreter start and teardown. Needs a
+display (or Xvfb).
+
+    python -m benchmarks.startup --runs 5 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+
+def launch(log_path):
+    """Run the app once; returns (process wall seconds, its startup record)"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, MAIN, "--exit-after-startup", "--startup-log", log_path],
+                   cwd=os.path.dirname(MAIN), check=True, capture_output=True)
+    elapsed = time.perf_counter() - start
+    with open(log_path) as f:
+        record = json.loads(f.readlines()[-1])
+    return elapsed, record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "startup.jsonl")
+        for _ in range(max(args.runs, 1)):
+            elapsed, record = launch(log_path)
+            if record['error']:
+                sys.exit(f"Startup failed: {record['error']}")
+            runs.append({'process_ms': elapsed * 1000, **{k: v for k, v in record.items() if k.endswith("_ms")}})
+
+    report = {'runs': len(runs), 'median': {key: statistics.median(run[key] for run in runs) for key in runs[0]}}
+    for key, value in report['median'].items():
+        print(f"{key[:-3]:<10}{value:8.0f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Always-fresh camera capture
+
+CameraCapture reads the camera continuously on its own thread and keeps
+only the newest frame together with the monotonic time it was grabbed.
+Because the driver's queue is drained as fast as the camera fills it,
+consumers never analyse a frame that sat in an OpenCV buffer while they
+were busy. Live sources (camera indices and stream URLs) are reopened
+automatically, with backoff, when they drop; video files end normally.
+Decoding time is reported to ``profiler`` as the "capture" stage; the time
+``grab`` spends waiting for the camera's next frame is not counted.
+
+    capture = CameraCapture(0, width=1280, height=720, fps=30, fourcc="MJPG").start()
+    ok, frame, timestamp = capture.read()
+"""
+import threading
+import time
+
+import cv2
+
+from metrics import NULL_PROFILER
+
+PIXEL_FORMATS = ("", "MJPG", "YUYV", "H264")
+
+
+def is_live(source):
+    """Camera index or network stream (as opposed to a video file)"""
+    return isinstance(source, int) or "://" in str(source)
+
+
+class CameraCapture:
+    """Newest-frame-only capture with configurable format and auto-reconnect"""
+
+    def __init__(self, source, width: int = 0, height: int = 0, fps: float = 0, fourcc: str = "",
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 10.0, max_failures: int = 30,
+                 profiler=None):
+        self.source = source
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fourcc = fourcc
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.max_failures = max_failures
+        self.profiler = profiler or NULL_PROFILER
+
+        self.cap = None
+        self.connected = False
+        self.reconnects = 0
+        self.frames = 0
+        self.running = False
+        self.thread = None
+        self._cond = threading.Condition()
+        self._frame = None
+        self._timestamp = 0.0
+        self._sequence = 0
+        self._consumed = 0
+
+    def open(self):
+        """(Re)open the source and apply the requested format; True on success"""
+        self._release()
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            cap.release()
+            return False
+        # Keep the driver queue as short as the backend allows
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if self.fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        if self.width and self.height:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.fps:
+            cap.set(cv2.CAP_PROP_FPS, self.fps)
+        self.cap = cap
+        self.connected = True
+        return True
+
+    def start(self):
+        """Open the source if needed and start the grab thread; None if it cannot be opened"""
+        if self.cap is None and not self.open():
+            return None
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="grab", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+        self._release()
+
+    def read(self, timeout: float = 1.0):
+        """Wait for a frame newer than the last one read; (ok, frame, capture timestamp)"""
+        with self._cond:
+            if self._sequence == self._consumed and self.running:
+                self._cond.wait(timeout)
+            if self._sequence == self._consumed:
+                return False, None, None
+            self._consumed = self._sequence
+            return True, self._frame, self._timestamp
+
+    @property
+    def ended(self):
+        """True once the grab thread has stopped (end of a video file, or stop())"""
+        return not self.running
+
+    @property
+    def settings(self):
+        """Format actually delivered by the camera (width, height, fps)"""
+        if self.cap is None:
+            return None
+        return (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                self.cap.get(cv2.CAP_PROP_FPS))
+
+    def _release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        self.connected = False
+
+    def _run(self):
+        failures = 0
+        delay = self.reconnect_delay
+        while self.running:
+            if self.cap is None:
+                # Reconnect with exponential backoff
+                time.sleep(delay)
+                if not self.running:
+                    break
+                if self.open():
+                    print(f"Camera {self.source} reconnected")
+                    self.reconnects += 1
+                    failures = 0
+                    delay = self.reconnect_delay
+                else:
+                    delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+
+            # Stamp at grab time, before the (possibly slow) decode
+            ok = self.cap.grab()
+            timestamp = time.monotonic()
+            if ok:
+                start = time.perf_counter()
+                ok, frame = self.cap.retrieve()
+                self.profiler.record("capture", time.perf_counter() - start)
+            if not ok:
+                failures += 1
+                if not is_live(self.source):
+                    break
+                if failures >= self.max_failures:
+                    print(f"Camera {self.source} lost, reconnecting")
+                    self._release()
+                else:
+                    time.sleep(0.01)
+                continue
+
+            failures = 0
+            self.frames += 1
+            with self._cond:
+                self._frame = frame
+                self._timestamp = timestamp
+                self._sequence += 1
+                self._cond.notify_all()
+        # End of a video file (or stop): readers stop waiting
+        self.connected = False
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
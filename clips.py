@@ -0,0 +1,227 @@
+"""Evidence clips around drowsiness alerts
+
+Every stream keeps its recent frames in a FrameRing: one preallocated array
+of reduced frames (default 320 px wide, at most 10 fps), so memory stays
+constant over a whole shift. Adding a frame is a single resize straight
+into its ring slot; nothing else is copied on the inference thread.
+
+On each alert the AlertClipRecorder waits until the post-alert seconds have
+been captured, then hands the clip's ring *positions* to a background
+encoder thread. The encoder copies those slots out, checks their sequence
+numbers so a frame overwritten in the meantime is dropped rather than mixed
+in (the ring holds a margin beyond pre + post seconds, so this only happens
+if the encoder falls far behind), and writes an MP4 plus a JSON EAR trace:
+
+    clips/camera-0/20261017-081502.mp4
+    clips/camera-0/20261017-081502.json   alert times, fps, time/EAR/alarm per frame
+"""
+import json
+import math
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+
+DEFAULT_PRE_SECONDS = 10.0
+DEFAULT_POST_SECONDS = 10.0
+DEFAULT_CLIP_WIDTH = 320
+DEFAULT_CLIP_FPS = 10.0
+MARGIN_SECONDS = 5.0  # extra ring time the encoder has to copy a clip out
+
+
+def to_bgr(frame):
+    """A grey, BGR or BGRA frame of any depth as 3-channel uint8 BGR"""
+    if frame.dtype == np.uint16:
+        frame = (frame >> 8).astype(np.uint8)
+    elif frame.dtype != np.uint8:
+        frame = cv2.convertScaleAbs(frame)
+    if frame.ndim == 2 or frame.shape[2] == 1:
+        return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    return frame
+
+
+class FrameRing:
+    """Fixed-size ring of reduced BGR frames with their timestamp, EAR and alarm state
+
+    The frame array is allocated on the first write, once the aspect ratio
+    is known, and never again.
+    """
+
+    def __init__(self, capacity: int, width: int = DEFAULT_CLIP_WIDTH):
+        self.capacity = capacity
+        self.width = width
+        self.frames = None  # (capacity, height, width, 3) uint8
+        self.times = np.full(capacity, np.nan)
+        self.ear = np.full(capacity, np.nan, dtype=np.float32)
+        self.alarm = np.zeros(capacity, dtype=np.uint8)
+        # Sequence number of the frame in each slot, -1 while it is written
+        self.seq = np.full(capacity, -1, dtype=np.int64)
+        self.count = 0  # frames written so far
+
+    @property
+    def nbytes(self):
+        return self.frames.nbytes if self.frames is not None else 0
+
+    def write(self, frame, timestamp, ear=np.nan, alarm=False):
+        """Resize a frame into the next slot (grey and BGRA frames are converted to BGR)"""
+        if self.frames is None:
+            height, width = frame.shape[:2]
+            out_width = min(self.width, width) // 2 * 2
+            out_height = round(height * out_width / width) // 2 * 2
+            self.frames = np.zeros((self.capacity, out_height, out_width, 3), dtype=np.uint8)
+        slot = self.count % self.capacity
+        self.seq[slot] = -1
+        out = self.frames[slot]
+        size = (out.shape[1], out.shape[0])
+        if frame.dtype == np.uint8 and frame.shape[2:] == (3,):
+            cv2.resize(frame, size, dst=out, interpolation=cv2.INTER_AREA)
+        else:
+            # cv2.resize would silently allocate a new array rather than fill the slot
+            np.copyto(out, to_bgr(cv2.resize(frame, size, interpolation=cv2.INTER_AREA)))
+        self.times[slot] = timestamp
+        self.ear[slot] = ear
+        self.alarm[slot] = alarm
+        self.seq[slot] = self.count
+        self.count += 1
+
+    def snapshot(self, first, last):
+        """Copy frames first..last (sequence numbers) that are still intact
+
+        Returns (frames, times, ear, alarm) without the frames that were
+        overwritten before or while they were copied.
+        """
+        seqs = np.arange(first, last + 1)
+        slots = seqs % self.capacity
+        frames, times = self.frames[slots], self.times[slots]
+        ear, alarm = self.ear[slots], self.alarm[slots]
+        # Checked after copying: a slot rewritten meanwhile has another number
+        intact = self.seq[slots] == seqs
+        return frames[intact], times[intact], ear[intact], alarm[intact]
+
+
+@dataclass
+class Clip:
+    """A clip waiting for its post-alert frames"""
+    start: float
+    end: float
+    alerts: list = field(default_factory=list)
+
+
+class AlertClipRecorder:
+    """Keep a ring of recent frames for one stream and write a clip around every alert"""
+
+    def __init__(self, path, source=None, pre: float = DEFAULT_PRE_SECONDS, post: float = DEFAULT_POST_SECONDS,
+                 fps: float = DEFAULT_CLIP_FPS, width: int = DEFAULT_CLIP_WIDTH, max_pending: int = 4):
+        self.path = path
+        self.source = source
+        self.pre = pre
+        self.post = post
+        # Frames at most this far apart are skipped, a little under 1 / fps
+        # so capture jitter does not halve the rate
+        self.spacing = 0.9 / fps
+        self.ring = FrameRing(math.ceil((pre + post + MARGIN_SECONDS) / self.spacing), width)
+        self.next_write = -math.inf
+        self.clips = []  # waiting for their post-alert frames
+        self.written = 0
+        self.dropped = 0
+        self.wall_offset = time.time() - time.monotonic()
+        os.makedirs(path, exist_ok=True)
+        self.pending = queue.Queue(max_pending)
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="clips", daemon=True)
+        self.thread.start()
+
+    def write(self, frame, timestamp, result):
+        """Add a processed frame and its FrameResult (inference thread; never touches the disk)"""
+        if timestamp >= self.next_write:
+            self.next_write = timestamp + self.spacing
+            self.ring.write(frame, timestamp, result.ear if result.ear is not None else np.nan,
+                            result.alarm_on)
+        for event in result.events:
+            if event.kind == "alert":
+                # Clips still recording show the new alert too
+                for clip in self.clips:
+                    clip.alerts.append(timestamp)
+                self.clips.append(Clip(timestamp - self.pre, timestamp + self.post, [timestamp]))
+        while self.clips and timestamp >= self.clips[0].end:
+            self._submit(self.clips.pop(0))
+
+    def _submit(self, clip):
+        """Queue the ring positions of a clip for encoding"""
+        first = max(self.ring.count - self.ring.capacity, 0)
+        try:
+            self.pending.put_nowait((clip, first, self.ring.count - 1))
+        except queue.Full:
+            # The encoder cannot keep up; losing a clip beats stalling detection
+            self.dropped += 1
+            print("Alert clip dropped: encoder busy")
+
+    def close(self, timeout: float = 30.0):
+        """Write the clips still waiting (with what has been captured) and stop the encoder"""
+        if self.closed:
+            return
+        self.closed = True
+        for clip in self.clips:
+            self.pending.put((clip, max(self.ring.count - self.ring.capacity, 0), self.ring.count - 1))
+        self.clips = []
+        self.pending.put(None)
+        self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            try:
+                self._encode(*item)
+                self.written += 1
+            except (OSError, cv2.error) as e:
+                print("Alert clip error:", e)
+
+    def _encode(self, clip, first, last):
+        if last < first:
+            return
+        frames, times, ear, alarm = self.ring.snapshot(first, last)
+        keep = (times >= clip.start) & (times <= clip.end)
+        frames, times, ear, alarm = frames[keep], times[keep], ear[keep], alarm[keep]
+        if not len(frames):
+            return
+        # Playback at the rate the frames were actually kept
+        fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 1.0
+
+        alert = clip.alerts[0]
+        name = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.wall_offset + alert))
+        base = os.path.join(self.path, name)
+        suffix = 1
+        while os.path.exists(base + ".mp4"):
+            suffix += 1
+            base = os.path.join(self.path, f"{name}-{suffix}")
+
+        height, width = frames.shape[1:3]
+        writer = cv2.VideoWriter(base + ".mp4", cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+        if not writer.isOpened():
+            raise OSError(f"Cannot open video writer for {base}.mp4")
+        try:
+            for frame in frames:
+                writer.write(frame)
+        finally:
+            writer.release()
+
+        trace = {
+            'source': self.source,
+            'alerts': [self.wall_offset + t for t in clip.alerts],
+            'fps': fps,
+            'frames': len(frames),
+            # Seconds relative to the (first) alert; EAR is null without a face
+            'time': np.round(times - alert, 3).tolist(),
+            'ear': [None if np.isnan(value) else round(float(value), 4) for value in ear],
+            'alarm': alarm.astype(bool).tolist(),
+        }
+        with open(base + ".json", "w") as f:
+            json.dump(trace, f)
@@ -0,0 +1,294 @@
+import time
+
+import cv2
+import dlib
+import numpy as np
+from imutils import face_utils
+
+from metrics import NULL_PROFILER
+
+# Re-detect policies:
+#   every_frame - full HOG detection on every frame (original behaviour)
+#   interval    - full detection every N frames, landmark tracking in between
+#   adaptive    - like interval, but also re-detect as soon as tracking quality drops
+REDETECT_POLICIES = ("every_frame", "interval", "adaptive")
+
+
+def landmark_box(shape):
+    """Bounding box (left, top, right, bottom) of a landmark array"""
+    x0, y0 = shape.min(axis=0)
+    x1, y1 = shape.max(axis=0)
+    return float(x0), float(y0), float(x1), float(y1)
+
+
+def scale_rect(rect, factor):
+    """Scale a dlib rectangle by factor (maps detections back to the full frame)"""
+    return dlib.rectangle(int(round(rect.left() * factor)), int(round(rect.top() * factor)),
+                          int(round(rect.right() * factor)), int(round(rect.bottom() * factor)))
+
+
+def box_iou(a, b):
+    """Intersection over union of two (left, top, right, bottom) boxes"""
+    iw = min(a[2], b[2]) - max(a[0], b[0])
+    ih = min(a[3], b[3]) - max(a[1], b[1])
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def rect_box(rect):
+    """(left, top, right, bottom) of a dlib rectangle"""
+    return float(rect.left()), float(rect.top()), float(rect.right()), float(rect.bottom())
+
+
+class Track:
+    """A face followed between full detections by re-seeding from its landmarks
+
+    ``id`` stays the same across re-detections while the face box overlaps
+    its previous position. ``fresh`` tells whether the landmarks were
+    predicted on the current frame; faces that are not analysed every frame
+    (passengers) keep their last landmarks, or none, in between.
+    """
+
+    def __init__(self, rect, shape=None, track_id: int = 0):
+        self.id = track_id
+        self.rect = rect
+        self.shape = None
+        self.offset = None
+        self.fresh = False
+        self.quality = 1.0
+        if shape is not None:
+            self.set_shape(shape)
+
+    def set_shape(self, shape):
+        """Landmarks predicted on the current frame"""
+        if self.offset is None:
+            # Remember where the detector box sits relative to the landmarks so
+            # the tracked box keeps the geometry the predictor was trained on
+            l, t, r, b = landmark_box(shape)
+            w, h = max(r - l, 1.0), max(b - t, 1.0)
+            rect = self.rect
+            self.offset = ((rect.left() - l) / w, (rect.top() - t) / h,
+                           (rect.right() - r) / w, (rect.bottom() - b) / h)
+        self.shape = shape
+        self.fresh = True
+
+    def next_rect(self):
+        """Predict the face box for the next frame from the current landmarks"""
+        if self.shape is None:
+            return self.rect
+        l, t, r, b = landmark_box(self.shape)
+        w, h = max(r - l, 1.0), max(b - t, 1.0)
+        ol, ot, o_r, ob = self.offset
+        return dlib.rectangle(int(round(l + ol * w)), int(round(t + ot * h)),
+                              int(round(r + o_r * w)), int(round(b + ob * h)))
+
+
+class FaceTracker:
+    """Run the full face detector every N frames and track faces in between
+
+    Between detections each face box is seeded from the previous frame's
+    landmarks, so only the (cheap) shape predictor runs. Tracking quality is
+    the IoU between consecutive landmark boxes; a face that jumps or
+    collapses scores low and triggers a re-detect under the adaptive policy.
+
+    Detection runs on a copy downscaled to ``process_width`` pixels (0 keeps
+    full resolution) and the predictor only sees a padded crop around the
+    face; all rects and landmarks are returned in full-frame coordinates.
+    Detector and predictor time is reported to ``profiler`` as the "detect"
+    and "landmarks" stages.
+
+    With a ``priority`` face (the driver), only that face gets landmarks on
+    every frame; the others are predicted together on detection frames and
+    once every ``passenger_interval`` frames (0 = only on detection frames),
+    keeping their last landmarks in between. Without one, every face is
+    predicted on every frame.
+
+    ``detect_faces`` is the stateless half of a detection frame and
+    ``assign_ids`` the stateful half, so frames can be analysed in other
+    processes and handed back in order (see parallel.py).
+    """
+
+    def __init__(self, detector, predictor, interval: int = 5,
+                 policy: str = "adaptive", min_quality: float = 0.5,
+                 process_width: int = 640, roi_padding: float = 0.25, profiler=None,
+                 passenger_interval: int = 0, match_iou: float = 0.3):
+        self.detector = detector
+        self.predictor = predictor
+        self.profiler = profiler or NULL_PROFILER
+        self.interval = interval
+        self.policy = policy
+        self.min_quality = min_quality
+        self.process_width = process_width
+        self.roi_padding = roi_padding
+        self.passenger_interval = passenger_interval
+        self.match_iou = match_iou
+        self.tracks = []
+        self.frames_since_detection = 0
+        self.detections = 0
+        self.next_id = 0
+
+    def configure(self, interval=None, policy=None, process_width=None, passenger_interval=None):
+        """Change the re-detect interval, policy, processing resolution and/or passenger rate
+
+        Tracks are kept unless the policy or processing resolution changes.
+        """
+        if policy is not None and policy not in REDETECT_POLICIES:
+            raise ValueError(f"Unknown re-detect policy: {policy}")
+        if passenger_interval is not None:
+            self.passenger_interval = max(0, int(passenger_interval))
+        if interval is not None:
+            self.interval = max(1, int(interval))
+        changed = False
+        if process_width is not None and max(0, int(process_width)) != self.process_width:
+            self.process_width = max(0, int(process_width))
+            changed = True
+        if policy is not None and policy != self.policy:
+            self.policy = policy
+            changed = True
+        if changed:
+            self.reset()
+
+    def reset(self):
+        """Forget all tracks so the next frame runs a full detection"""
+        self.tracks = []
+        self.frames_since_detection = 0
+
+    def update(self, gray, priority=None):
+        """Return the tracks (rect + landmarks) for this frame
+
+        ``priority`` is the id of the track to analyse on every frame.
+        """
+        if self._needs_detection():
+            return self._detect(gray, priority)
+
+        tracks = self._track(gray, priority)
+        if self.policy == "adaptive" and any(t.fresh and t.quality < self.min_quality for t in tracks):
+            return self._detect(gray, priority)
+        return tracks
+
+    def _needs_detection(self):
+        return (self.policy == "every_frame" or not self.tracks
+                or self.frames_since_detection >= self.interval)
+
+    def detection_scale(self, gray):
+        """Factor applied to the frame before running the face detector"""
+        width = gray.shape[1]
+        if not self.process_width or width <= self.process_width:
+            return 1.0
+        return self.process_width / width
+
+    def predict(self, gray, rect):
+        """Run the shape predictor on a padded crop around rect (full-frame coordinates)"""
+        start = time.perf_counter()
+        shape = self._predict(gray, rect)
+        self.profiler.record("landmarks", time.perf_counter() - start)
+        return shape
+
+    def _predict(self, gray, rect):
+        height, width = gray.shape[:2]
+        pad_x = int(rect.width() * self.roi_padding)
+        pad_y = int(rect.height() * self.roi_padding)
+        x0, y0 = max(rect.left() - pad_x, 0), max(rect.top() - pad_y, 0)
+        x1, y1 = min(rect.right() + pad_x + 1, width), min(rect.bottom() + pad_y + 1, height)
+        if x1 <= x0 or y1 <= y0:
+            return face_utils.shape_to_np(self.predictor(gray, rect))
+
+        roi = np.ascontiguousarray(gray[y0:y1, x0:x1])
+        local = dlib.rectangle(rect.left() - x0, rect.top() - y0,
+                               rect.right() - x0, rect.bottom() - y0)
+        shape = face_utils.shape_to_np(self.predictor(roi, local))
+        shape[:, 0] += x0
+        shape[:, 1] += y0
+        return shape
+
+    def _wanted(self, track, priority):
+        """Whether a track gets landmarks on this frame"""
+        if priority is None or track.id == priority:
+            return True
+        # Passengers are predicted together: on detection frames and, if
+        # set, every passenger_interval frames in between
+        if self.frames_since_detection == 0:
+            return True
+        return bool(self.passenger_interval) and self.frames_since_detection % self.passenger_interval == 0
+
+    def _match_ids(self, faces):
+        """Ids for new detections: that of the best-overlapping previous track, else a new one"""
+        previous = [(track.id, rect_box(track.rect)) for track in self.tracks]
+        ids = []
+        for face in faces:
+            box = rect_box(face)
+            best = max(previous, key=lambda item: box_iou(box, item[1]), default=None)
+            if best is not None and box_iou(box, best[1]) >= self.match_iou:
+                previous.remove(best)
+                ids.append(best[0])
+            else:
+                ids.append(self.next_id)
+                self.next_id += 1
+        return ids
+
+    def detect(self, gray):
+        """Run the face detector (on the downscaled frame) and return full-frame rects"""
+        start = time.perf_counter()
+        scale = self.detection_scale(gray)
+        if scale == 1.0:
+            faces = self.detector(gray, 0)
+        else:
+            small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            faces = [scale_rect(face, 1.0 / scale) for face in self.detector(small, 0)]
+        self.profiler.record("detect", time.perf_counter() - start)
+        return faces
+
+    def detect_faces(self, gray):
+        """(rect, landmarks) of every face on this frame; does not touch the tracks"""
+        return [(face, self.predict(gray, face)) for face in self.detect(gray)]
+
+    def assign_ids(self, faces):
+        """Make the tracks of the next frame from detect_faces output, keeping ids
+
+        Equivalent to a detection frame of update() without a priority face.
+        """
+        ids = self._match_ids([rect for rect, _ in faces])
+        self.tracks = [Track(rect, shape, track_id) for (rect, shape), track_id in zip(faces, ids)]
+        self.frames_since_detection = 1
+        self.detections += 1
+        return self.tracks
+
+    def _detect(self, gray, priority=None):
+        faces = self.detect(gray)
+        self.frames_since_detection = 0
+        ids = self._match_ids(faces)
+        if priority not in ids:
+            # The priority face is gone: analyse everyone so a new one can be chosen
+            priority = None
+        tracks = []
+        for face, track_id in zip(faces, ids):
+            track = Track(face, track_id=track_id)
+            if self._wanted(track, priority):
+                track.set_shape(self.predict(gray, face))
+            tracks.append(track)
+        self.tracks = tracks
+        self.frames_since_detection = 1
+        self.detections += 1
+        return self.tracks
+
+    def _track(self, gray, priority=None):
+        height, width = gray.shape[:2]
+        frame_box = (0.0, 0.0, float(width), float(height))
+        for track in self.tracks:
+            track.fresh = False
+            if not self._wanted(track, priority):
+                continue
+            rect = track.next_rect()
+            shape = self.predict(gray, rect)
+            current = landmark_box(shape)
+            # A face seen by the detector but never predicted has nothing to compare with
+            track.quality = box_iou(landmark_box(track.shape), current) if track.shape is not None else 1.0
+            if box_iou(current, frame_box) <= 0.0:
+                track.quality = 0.0
+            track.rect = rect
+            track.set_shape(shape)
+        self.frames_since_detection += 1
+        return self.tracks
@@ -0,0 +1,68 @@
+"""Cheap frame display for the Tk video label
+
+Frames are resized once, with a fast interpolation, to a target size that
+is cached from the label's <Configure> events instead of being queried
+every frame. One PhotoImage is kept per size and updated in place with
+``paste()``, so steady-state display allocates no new Tk images.
+
+OpenCV and Pillow are imported on first use, so the window (and its
+VideoSurface) can be built before they are loaded.
+"""
+import math
+
+
+def grid_shape(count):
+    """(rows, cols) of the most square grid holding count tiles"""
+    cols = math.ceil(math.sqrt(count))
+    return math.ceil(count / cols), cols
+
+
+def fit_frame(frame, size):
+    """Resize a frame to size (width, height); returns frame itself if it already fits"""
+    import cv2
+    width, height = size
+    if width <= 1 or height <= 1:
+        return frame
+    frame_height, frame_width = frame.shape[:2]
+    if (frame_width, frame_height) == (width, height):
+        return frame
+    # INTER_AREA is the cheapest alias-free filter for shrinking,
+    # INTER_LINEAR the cheapest acceptable one for enlarging
+    shrinking = width < frame_width and height < frame_height
+    return cv2.resize(frame, (width, height),
+                      interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR)
+
+
+class VideoSurface:
+    """Shows RGB frames on a Tk label, reusing one PhotoImage while the size is unchanged"""
+
+    def __init__(self, label, on_resize=None):
+        self.label = label
+        self.on_resize = on_resize
+        self.size = (0, 0)
+        self.photo = None
+        label.bind("<Configure>", self._configured)
+
+    def show(self, rgb):
+        """Display an RGB frame (H, W, 3 uint8)"""
+        from PIL import Image, ImageTk
+        image = Image.fromarray(rgb)
+        if self.photo is None or (self.photo.width(), self.photo.height()) != image.size:
+            self.photo = ImageTk.PhotoImage(image=image)
+            self.label.configure(image=self.photo, text="")
+        else:
+            self.photo.paste(image)
+
+    def clear(self, **options):
+        """Remove the image and restore the label's placeholder options"""
+        self.photo = None
+        self.label.configure(image="", **options)
+
+    def _configured(self, event):
+        # Borders are not part of the drawable area
+        border = 2 * int(self.label.cget("bd"))
+        size = (max(event.width - border, 0), max(event.height - border, 0))
+        if size != self.size:
+            self.size = size
+            if self.on_resize:
+                self.on_resize(size)
@@ -0,0 +1,54 @@
+"""Driver selection among several visible faces
+
+Only the driver's face drives the EAR state machine, the alerts and the
+rolling fatigue statistics; passengers are tracked with their own state
+but never raise alarms. Policies:
+
+    largest     the largest face box (closest to the camera)
+    seat        the largest face whose box centre lies in a fixed seat
+                region, given as (left, top, right, bottom) fractions of
+                the frame; no driver while the seat is empty
+    continuity  keep the current driver for as long as it is tracked and
+                pick the largest face only when it is lost (default)
+"""
+DRIVER_POLICIES = ("largest", "seat", "continuity")
+DEFAULT_DRIVER_POLICY = "continuity"
+DEFAULT_SEAT_REGION = (0.25, 0.0, 0.75, 1.0)  # centre band: the camera faces the driver
+
+
+def box_area(box):
+    return box[2] * box[3]
+
+
+def in_region(box, region, frame_size):
+    """Whether the centre of an (x, y, w, h) box lies in a fractional region"""
+    width, height = frame_size
+    cx = (box[0] + box[2] / 2.0) / width
+    cy = (box[1] + box[3] / 2.0) / height
+    return region[0] <= cx <= region[2] and region[1] <= cy <= region[3]
+
+
+class DriverSelector:
+    """Pick the driver's face id from the (face id, box) pairs of a frame"""
+
+    def __init__(self, policy: str = DEFAULT_DRIVER_POLICY, seat=DEFAULT_SEAT_REGION):
+        if policy not in DRIVER_POLICIES:
+            raise ValueError(f"Unknown driver policy: {policy}")
+        self.policy = policy
+        self.seat = tuple(seat)
+        self.driver_id = None
+
+    def reset(self):
+        self.driver_id = None
+
+    def select(self, faces, frame_size=None):
+        """faces: [(face id, (x, y, w, h))]; returns the driver's id or None
+
+        Without a frame size the seat policy falls back to the largest face.
+        """
+        if self.policy == "continuity" and any(face_id == self.driver_id for face_id, _ in faces):
+            return self.driver_id
+        if self.policy == "seat" and frame_size:
+            faces = [(face_id, box) for face_id, box in faces if in_region(box, self.seat, frame_size)]
+        self.driver_id = max(faces, key=lambda face: box_area(face[1]))[0] if faces else None
+        return self.driver_id
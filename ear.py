@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+# Landmark index pairs on the 68-point model, as (point, point) rows:
+# two vertical eyelid distances and the horizontal eye width per eye
+# (left eye = points 42-47, right eye = 36-41, same split as imutils),
+# then three vertical inner-lip distances and the inner mouth width.
+_PAIRS = np.array([
+    [43, 47], [44, 46], [42, 45],
+    [37, 41], [38, 40], [36, 39],
+    [61, 67], [62, 66], [63, 65], [60, 64],
+])
+
+
+@dataclass(frozen=True, eq=False)
+class LandmarkLayout:
+    """Where the eyes (and mouth) sit in a landmark model's output"""
+    name: str
+    points: int
+    pairs: np.ndarray  # rows as in _PAIRS; eye rows only when the model has no mouth
+    right_eye: slice
+    left_eye: slice
+
+    @property
+    def eyes(self):
+        """Both eyes, 12 points in 68-point model order"""
+        return slice(self.right_eye.start, self.left_eye.stop)
+
+    @property
+    def has_mouth(self):
+        return len(self.pairs) == len(_PAIRS)
+
+
+# The standard 68-point model and an eye-only model trained on its points
+# 36-47 (see backends.train_eye_model)
+FACE_68 = LandmarkLayout("68", 68, _PAIRS, slice(36, 42), slice(42, 48))
+EYES_12 = LandmarkLayout("eyes", 12, _PAIRS[:6] - 36, slice(0, 6), slice(6, 12))
+LAYOUTS = {layout.name: layout for layout in (FACE_68, EYES_12)}
+
+
+def aspect_ratios(shapes, layout=FACE_68):
+    """Left EAR, right EAR and MAR for landmarks of shape (N, 2) or (K, N, 2)
+
+    All point distances are computed in one batched operation. Returns an
+    array of shape (3,) or (K, 3); MAR is NaN for models without a mouth.
+    """
+    shapes = np.asarray(shapes, dtype=np.float64)
+    pairs = layout.pairs
+    diff = shapes[..., pairs[:, 0], :] - shapes[..., pairs[:, 1], :]
+    d = np.sqrt((diff * diff).sum(axis=-1))
+
+    left = (d[..., 0] + d[..., 1]) / (2.0 * d[..., 2])
+    right = (d[..., 3] + d[..., 4]) / (2.0 * d[..., 5])
+    if layout.has_mouth:
+        mouth = (d[..., 6] + d[..., 7] + d[..., 8]) / (2.0 * d[..., 9])
+    else:
+        mouth = np.full_like(left, np.nan)
+    return np.stack([left, right, mouth], axis=-1)
+
+
+def eye_aspect_ratio(shapes, layout=FACE_68):
+    """Mean EAR of both eyes for landmarks of shape (N, 2) or (K, N, 2)"""
+    ratios = aspect_ratios(shapes, layout)
+    return (ratios[..., 0] + ratios[..., 1]) / 2.0
+
+
+def mouth_aspect_ratio(shapes):
+    """Inner-lip MAR (yawning) for landmarks of shape (68, 2) or (K, 68, 2)"""
+    return aspect_ratios(shapes)[..., 2]
@@ -0,0 +1,503 @@
+"""Headless fatigue detection engine
+
+The engine owns the face models, the tracker and the EAR state machine. It
+takes BGR or grayscale numpy frames and returns a FrameResult per frame,
+notifying listeners of events (blinks, alerts). It imports no GUI toolkit,
+so it runs unchanged on headless in-vehicle boxes and in server processes.
+
+    engine = FatigueEngine()
+    engine.add_listener(lambda event: print(event))
+    result = engine.process(frame)
+"""
+import math
+import time
+from dataclasses import dataclass, field
+
+import cv2
+
+from backends import DEFAULT_DETECTOR, DEFAULT_LANDMARKS, create_detector, create_landmarks
+from detection import FaceTracker
+from driver import DEFAULT_DRIVER_POLICY, DEFAULT_SEAT_REGION, DriverSelector
+from ear import FACE_68, aspect_ratios
+from fatigue import FatigueStats
+from gating import DEFAULT_CHANGE_THRESHOLD, DEFAULT_MAX_SKIP, ChangeGate
+from metrics import NULL_PROFILER
+
+DEFAULT_EAR_THRESHOLD = 0.25
+DEFAULT_ALERT_SECONDS = 0.7  # continuous eye closure that raises an alert
+DEFAULT_DETECT_INTERVAL = 5
+DEFAULT_REDETECT_POLICY = "adaptive"
+DEFAULT_PROCESS_WIDTH = 640
+DEFAULT_STATS_WINDOW = 60.0  # seconds of PERCLOS / blink statistics
+DEFAULT_FATIGUE_THRESHOLD = 60  # fatigue score (0-100) that raises an alert, 0 = off
+FATIGUE_HYSTERESIS = 10  # the score must fall this far below the threshold to clear
+FATIGUE_MIN_FILL = 0.5  # fraction of the window needed before the score can alert
+DEFAULT_PASSENGER_INTERVAL = 0  # analyse passengers every N frames, 0 = only on detection frames
+
+
+@dataclass
+class Event:
+    """Something noteworthy that happened on a frame"""
+    kind: str  # "blink", "alert", "alert_cleared", "fatigue", "fatigue_cleared", "face_found",
+    # "face_lost" or "driver_changed"
+    frame_index: int
+    timestamp: float
+    data: dict = field(default_factory=dict)
+
+
+@dataclass
+class FaceResult:
+    """Per-face measurements in full-frame coordinates"""
+    box: tuple  # (x, y, w, h)
+    shape: object  # (N, 2) landmark array in the layout's order
+    ear: float
+    mar: float  # NaN when the landmark model has no mouth
+    layout: object = FACE_68
+    face_id: int = None  # stable while the face is tracked
+    driver: bool = False
+
+    @property
+    def left_eye(self):
+        return self.shape[self.layout.left_eye]
+
+    @property
+    def right_eye(self):
+        return self.shape[self.layout.right_eye]
+
+
+@dataclass
+class FaceState:
+    """Eye-closure state of one tracked face"""
+    counter: int = 0  # frames in the current closure
+    closed_since: float = None
+    blinks: int = 0
+    result: FaceResult = None  # last measurement, shown while the face is not re-analysed
+
+    def update(self, closed, timestamp):
+        """Advance the closure; returns (frames, seconds) of a blink that just ended, else None"""
+        if closed:
+            if self.closed_since is None:
+                self.closed_since = timestamp
+            self.counter += 1
+            return None
+        blink = (self.counter, timestamp - self.closed_since) if self.counter else None
+        if blink:
+            self.blinks += 1
+        self.counter = 0
+        self.closed_since = None
+        return blink
+
+
+@dataclass
+class FrameResult:
+    """Everything the engine knows after processing one frame
+
+    ``faces`` holds every tracked face; the EAR, closure, alert and
+    statistics fields all describe the driver's face.
+    """
+    index: int
+    timestamp: float
+    faces: list
+    ear: float = None
+    mar: float = None
+    counter: int = 0  # frames in the current closure
+    closed_for: float = 0.0  # seconds of the current closure, from capture timestamps
+    progress: float = 0.0  # 0-100, closure relative to the alert criterion
+    drowsy: bool = False
+    alarm_on: bool = False
+    alerts: int = 0
+    blinks: int = 0
+    total_frames: int = 0
+    drowsy_frames: int = 0
+    skipped: bool = False  # landmarks reused from the last analysed frame (see gating.py)
+    skipped_frames: int = 0
+    # Rolling statistics over the engine's stats window (see fatigue.py)
+    perclos: float = 0.0
+    blink_rate: float = 0.0  # blinks per minute
+    mean_blink: float = 0.0  # seconds
+    max_blink: float = 0.0  # seconds
+    ear_trend: float = 0.0  # EAR per minute
+    fatigue: float = 0.0  # 0-100 combined score
+    fatigue_alarm: bool = False
+    events: list = field(default_factory=list)
+
+
+class FatigueEngine:
+    """Frame-in, result-out drowsiness detector with no GUI dependencies"""
+
+    def __init__(self, model_path: str = None, detector=None, predictor=None,
+                 ear_threshold: float = DEFAULT_EAR_THRESHOLD,
+                 alert_seconds: float = DEFAULT_ALERT_SECONDS,
+                 detect_interval: int = DEFAULT_DETECT_INTERVAL,
+                 redetect_policy: str = DEFAULT_REDETECT_POLICY,
+                 process_width: int = DEFAULT_PROCESS_WIDTH,
+                 stats_window: float = DEFAULT_STATS_WINDOW,
+                 fatigue_threshold: float = DEFAULT_FATIGUE_THRESHOLD,
+                 detector_backend: str = DEFAULT_DETECTOR, landmark_backend: str = DEFAULT_LANDMARKS,
+                 driver_policy: str = DEFAULT_DRIVER_POLICY, seat_region=DEFAULT_SEAT_REGION,
+                 passenger_interval: int = DEFAULT_PASSENGER_INTERVAL,
+                 change_threshold: float = DEFAULT_CHANGE_THRESHOLD, max_skip: int = DEFAULT_MAX_SKIP,
+                 profiler=None):
+        # Models can be injected so several engines share one copy; backends
+        # (see backends.py) load their model files on first use
+        self.detector_backend = detector_backend
+        self.landmark_backend = landmark_backend
+        self.detector = detector or create_detector(detector_backend)
+        self.predictor = predictor or create_landmarks(landmark_backend, model_path)
+        self.layout = getattr(self.predictor, 'layout', FACE_68)
+        self.profiler = profiler or NULL_PROFILER
+        self.tracker = FaceTracker(self.detector, self.predictor, detect_interval,
+                                   redetect_policy, process_width=process_width,
+                                   profiler=self.profiler, passenger_interval=passenger_interval)
+        self.selector = DriverSelector(driver_policy, seat_region)
+        self.gate = ChangeGate(change_threshold, max_skip)
+
+        self.ear_threshold = ear_threshold
+        self.alert_seconds = alert_seconds
+        self.fatigue_threshold = fatigue_threshold
+        self.stats = FatigueStats(stats_window)
+        self.listeners = []
+        self.reset()
+
+    @property
+    def detect_interval(self):
+        return self.tracker.interval
+
+    @property
+    def redetect_policy(self):
+        return self.tracker.policy
+
+    @property
+    def process_width(self):
+        return self.tracker.process_width
+
+    @property
+    def stats_window(self):
+        return self.stats.window
+
+    @property
+    def passenger_interval(self):
+        return self.tracker.passenger_interval
+
+    @property
+    def counter(self):
+        """Frames in the driver's current closure"""
+        return self.driver_state.counter
+
+    def configure(self, ear_threshold=None, alert_seconds=None, detect_interval=None,
+                  redetect_policy=None, process_width=None, stats_window=None, fatigue_threshold=None,
+                  detector_backend=None, landmark_backend=None, driver_policy=None, seat_region=None,
+                  passenger_interval=None, change_threshold=None, max_skip=None):
+        """Update thresholds and detection settings (None leaves a value unchanged)"""
+        if driver_policy is not None or seat_region is not None:
+            self.selector = DriverSelector(driver_policy or self.selector.policy,
+                                           seat_region or self.selector.seat)
+        if detector_backend is not None and detector_backend != self.detector_backend:
+            self.detector = self.tracker.detector = create_detector(detector_backend)
+            self.detector_backend = detector_backend
+            self.tracker.reset()
+        if landmark_backend is not None and landmark_backend != self.landmark_backend:
+            self.predictor = self.tracker.predictor = create_landmarks(landmark_backend)
+            self.landmark_backend = landmark_backend
+            self.layout = self.predictor.layout
+            self.tracker.reset()
+            self.gate.reset()
+        if ear_threshold is not None:
+            self.ear_threshold = float(ear_threshold)
+        if alert_seconds is not None:
+            self.alert_seconds = max(0.0, float(alert_seconds))
+        if stats_window is not None:
+            self.stats = FatigueStats(max(1.0, float(stats_window)))
+        if fatigue_threshold is not None:
+            self.fatigue_threshold = max(0.0, float(fatigue_threshold))
+        self.tracker.configure(detect_interval, redetect_policy, process_width, passenger_interval)
+        self.gate.configure(change_threshold, max_skip)
+
+    def settings(self):
+        """Current thresholds and detection settings, as accepted by configure()"""
+        return {
+            'ear_threshold': self.ear_threshold,
+            'alert_seconds': self.alert_seconds,
+            'detect_interval': self.detect_interval,
+            'redetect_policy': self.redetect_policy,
+            'process_width': self.process_width,
+            'stats_window': self.stats_window,
+            'fatigue_threshold': self.fatigue_threshold,
+            'detector_backend': self.detector_backend,
+            'landmark_backend': self.landmark_backend,
+            'driver_policy': self.selector.policy,
+            'seat_region': self.selector.seat,
+            'passenger_interval': self.passenger_interval,
+            'change_threshold': self.gate.threshold,
+            'max_skip': self.gate.max_skip,
+        }
+
+    def load(self):
+        """Load the backend models now instead of on the first frame"""
+        for model in (self.detector, self.predictor):
+            if hasattr(model, 'load'):
+                model.load()
+
+    def clone(self):
+        """New engine sharing this engine's models, settings and profiler but not its state"""
+        return FatigueEngine(detector=self.detector, predictor=self.predictor,
+                             profiler=self.profiler, **self.settings())
+
+    def reset(self):
+        """Start a new session: clear counters and tracking state"""
+        self.tracker.reset()
+        self.selector.reset()
+        self.gate.reset()
+        self.frame_index = 0
+        self.frame_size = None
+        self.driver_id = None
+        self.driver_state = FaceState()
+        self.faces = {}  # passenger face id -> FaceState
+        self.alerts = 0
+        self.alarm_on = False
+        self.total_frames = 0
+        self.drowsy_frames = 0
+        self.skipped_frames = 0
+        self.blink_count = 0
+        self.face_present = False
+        self.fatigue_alarm = False
+        self.stats.reset()
+
+    def add_listener(self, callback):
+        """Call callback(event) for every emitted Event"""
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self.listeners.remove(callback)
+
+    def process(self, frame, timestamp=None):
+        """Process one BGR or grayscale frame and return its FrameResult
+
+        ``timestamp`` should be the capture time in seconds (any monotonic
+        origin). Closure durations are measured between capture timestamps,
+        so alerts fire after the same real time whatever the frame rate and
+        however many frames the pipeline drops.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self.frame_size = (gray.shape[1], gray.shape[0])
+        if self.gate.enabled:
+            start = time.perf_counter()
+            unchanged = self.face_present and self.gate.unchanged(gray)
+            self.profiler.record("gate", time.perf_counter() - start)
+            if unchanged:
+                # The driver's eyes look as on the last analysed frame: run its
+                # landmarks through the state machine again so closures stay timed
+                self.skipped_frames += 1
+                result = self.process_landmarks([(track.rect, track.shape if track.id == self.driver_id else None,
+                                                  track.id) for track in self.tracker.tracks], timestamp)
+                result.skipped = True
+                return result
+
+        # Only the driver gets landmarks on every frame
+        tracks = self.tracker.update(gray, self.driver_id)
+        result = self.process_landmarks([(track.rect, track.shape if track.fresh else None, track.id)
+                                         for track in tracks], timestamp)
+        if self.gate.enabled:
+            driver = next((track for track in tracks if track.id == self.driver_id and track.fresh), None)
+            if driver is not None:
+                self.gate.set_reference(gray, (driver.shape[self.layout.left_eye],
+                                               driver.shape[self.layout.right_eye]))
+            else:
+                self.gate.reset()
+        return result
+
+    def process_detections(self, faces, frame_size, timestamp=None):
+        """Process one frame's FaceTracker.detect_faces output, computed elsewhere
+
+        Frames must arrive in capture order; the result is then the same as
+        process() with the every_frame policy (see parallel.py).
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self.frame_size = frame_size
+        tracks = self.tracker.assign_ids(faces)
+        return self.process_landmarks([(track.rect, track.shape, track.id) for track in tracks], timestamp)
+
+    def process_landmarks(self, faces, timestamp=None):
+        """Run the state machine on already-detected faces
+
+        ``faces`` is a list of (rect, landmarks) or (rect, landmarks, face id)
+        where rect is a dlib rect or (x, y, w, h) and the landmarks are in the
+        engine's layout, by default (68, 2), or None for a tracked face that
+        was not analysed on this frame. Without ids faces are numbered by
+        position. The driver is chosen among them (see driver.py); every
+        face keeps its own closure state, but only the driver's raises
+        alerts and feeds the statistics.
+        Useful for replaying recorded or synthetic landmarks without running
+        the detector or the landmark model.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        start = time.perf_counter()
+        index = self.frame_index
+        self.frame_index += 1
+        self.total_frames += 1
+        events = []
+
+        faces = [(face[2] if len(face) > 2 else i, self._box(face[0]), face[1]) for i, face in enumerate(faces)]
+        driver_id = self.selector.select([(face_id, box) for face_id, box, _ in faces], self.frame_size)
+        if driver_id is not None and driver_id != self.driver_id:
+            self._switch_driver(driver_id, faces, index, timestamp, events)
+        tracked = {face_id for face_id, _, _ in faces}
+        for face_id in [face_id for face_id in self.faces if face_id not in tracked]:
+            del self.faces[face_id]
+
+        ear = mar = None
+        closed_for = 0.0
+        driver_seen = False
+        fresh = [face for face in faces if face[2] is not None]
+        # EAR/MAR for every analysed face in one batched call
+        ratios = aspect_ratios([shape for _, _, shape in fresh], self.layout) if fresh else []
+        for (face_id, box, shape), (left_ear, right_ear, face_mar) in zip(fresh, ratios):
+            face_ear = (left_ear + right_ear) / 2.0
+            closed = face_ear < self.ear_threshold
+            is_driver = face_id == driver_id
+            state = self.driver_state if is_driver else self.faces.setdefault(face_id, FaceState())
+            blink = state.update(closed, timestamp)
+            state.result = FaceResult(box, shape, float(face_ear), float(face_mar), self.layout, face_id, is_driver)
+            if not is_driver:
+                continue
+
+            driver_seen = True
+            ear, mar = face_ear, face_mar
+            if closed:
+                self.drowsy_frames += 1
+                closed_for = timestamp - state.closed_since
+            else:
+                if blink:
+                    self.blink_count += 1
+                    events.append(Event("blink", index, timestamp, {'frames': blink[0], 'duration': blink[1]}))
+                if self.alarm_on:
+                    events.append(Event("alert_cleared", index, timestamp))
+                self.alarm_on = False
+
+            # Drowsiness detection
+            if state.counter and closed_for >= self.alert_seconds and not self.alarm_on:
+                self.alerts += 1
+                self.alarm_on = True
+                events.append(Event("alert", index, timestamp,
+                                    {'ear': float(ear), 'alerts': self.alerts, 'closed_for': closed_for}))
+
+        # Faces not analysed on this frame show their last measurement
+        results = []
+        for face_id, _, _ in faces:
+            state = self.driver_state if face_id == driver_id else self.faces.get(face_id)
+            if state is not None and state.result is not None:
+                results.append(state.result)
+
+        if driver_seen:
+            # Rolling statistics follow the same face the EAR fields report
+            self.stats.update(timestamp, float(ear), ear < self.ear_threshold)
+            self._check_fatigue(index, timestamp, events)
+
+        if driver_seen != self.face_present:
+            self.face_present = driver_seen
+            events.append(Event("face_found" if driver_seen else "face_lost", index, timestamp))
+
+        result = FrameResult(
+            index=index,
+            timestamp=timestamp,
+            faces=results,
+            ear=float(ear) if ear is not None else None,
+            mar=float(mar) if mar is not None and not math.isnan(mar) else None,
+            counter=self.counter,
+            closed_for=closed_for,
+            progress=(min(closed_for / self.alert_seconds * 100, 100) if self.alert_seconds else 100.0)
+            if driver_seen and self.counter else 0.0,
+            drowsy=driver_seen and self.alarm_on,
+            alarm_on=self.alarm_on,
+            alerts=self.alerts,
+            blinks=self.blink_count,
+            total_frames=self.total_frames,
+            drowsy_frames=self.drowsy_frames,
+            skipped_frames=self.skipped_frames,
+            fatigue_alarm=self.fatigue_alarm,
+            events=events,
+            **self.stats.snapshot(),
+        )
+        self.profiler.record("scoring", time.perf_counter() - start)
+        for event in events:
+            for listener in self.listeners:
+                listener(event)
+        return result
+
+    def _switch_driver(self, driver_id, faces, index, timestamp, events):
+        """Make driver_id the driver's face"""
+        previous = self.driver_id
+        self.driver_id = driver_id
+        previous_tracked = any(face_id == previous for face_id, _, _ in faces)
+        if not previous_tracked and driver_id not in self.faces:
+            # The driver's face was lost and a new face appeared: most likely
+            # the driver found again under a new id, so keep the driver's state
+            return
+
+        # A passenger takes over: their own closure state, fresh statistics
+        # and no alarm inherited from the previous driver
+        self.driver_state.result = None
+        if previous_tracked:
+            self.faces[previous] = self.driver_state
+        self.driver_state = self.faces.pop(driver_id, None) or FaceState()
+        self.stats.reset()
+        if self.alarm_on:
+            self.alarm_on = False
+            events.append(Event("alert_cleared", index, timestamp))
+        if self.fatigue_alarm:
+            self.fatigue_alarm = False
+            events.append(Event("fatigue_cleared", index, timestamp, {'score': 0.0}))
+        events.append(Event("driver_changed", index, timestamp, {'face': driver_id}))
+
+    def _check_fatigue(self, index, timestamp, events):
+        """Raise or clear the fatigue-score alert (with hysteresis)"""
+        if not self.fatigue_threshold:
+            return
+        score = self.stats.score
+        if not self.fatigue_alarm:
+            if score >= self.fatigue_threshold and self.stats.filled >= FATIGUE_MIN_FILL:
+                self.fatigue_alarm = True
+                events.append(Event("fatigue", index, timestamp,
+                                    {'score': score, 'perclos': self.stats.perclos}))
+        elif score < self.fatigue_threshold - FATIGUE_HYSTERESIS:
+            self.fatigue_alarm = False
+            events.append(Event("fatigue_cleared", index, timestamp, {'score': score}))
+
+    @staticmethod
+    def _box(rect):
+        if isinstance(rect, tuple):
+            return rect
+        return (rect.left(), rect.top(), rect.width(), rect.height())
+
+
+def run_camera(source=0, model_path: str = None):
+    """Monitor a camera or stream with no display, printing events"""
+    engine = FatigueEngine(model_path)
+    engine.add_listener(lambda event: print(f"{event.kind} frame={event.frame_index} {event.data}"))
+    # Imported here so the engine itself stays free of capture code
+    from capture import CameraCapture
+    capture = CameraCapture(source).start()
+    if capture is None:
+        raise RuntimeError(f"Cannot access camera {source}")
+    try:
+        while True:
+            ret, frame, timestamp = capture.read()
+            if not ret:
+                if not capture.running:
+                    break
+                continue
+            engine.process(frame, timestamp)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        capture.stop()
+
+
+if __name__ == "__main__":
+    import sys
+    arg = sys.argv[1] if len(sys.argv) > 1 else "0"
+    run_camera(int(arg) if arg.isdigit() else arg)
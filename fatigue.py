@@ -0,0 +1,176 @@
+"""Rolling fatigue statistics over a time window
+
+FatigueStats keeps, over the last ``window`` seconds of face-present
+frames:
+
+    perclos      fraction of time the eyes were closed (EAR below threshold)
+    blink_rate   blinks per minute
+    mean_blink   mean blink (closure) duration in seconds
+    max_blink    longest blink in the window, in seconds
+    ear_trend    least-squares EAR slope, in EAR per minute
+
+Each frame is one deque append plus evictions from the front, and every
+statistic is a running sum (or, for the maximum, a monotonic deque), so
+an update is amortised O(1) however long the shift. Running sums are
+recomputed exactly every few thousand updates to stop float drift.
+
+The statistics are combined into a 0-100 fatigue score; see
+``fatigue_score`` for the weights.
+"""
+from collections import deque
+
+# Frame durations are capped so a gap in face detection does not count
+# as one very long open- or closed-eye frame
+MAX_FRAME_GAP = 0.5
+RESYNC_EVERY = 4096
+
+# Score reference points (published PERCLOS and blink-duration studies put
+# drowsiness at roughly 15-30 % PERCLOS and 300-500 ms blinks)
+PERCLOS_DROWSY = 0.30
+BLINK_ALERT = 0.15
+BLINK_DROWSY = 0.50
+BLINK_RATE_DROWSY = 40.0
+BLINK_RATE_NORMAL = 15.0
+EAR_TREND_DROWSY = -0.05
+
+
+def _clip01(value):
+    return 0.0 if value < 0.0 else 1.0 if value > 1.0 else value
+
+
+def fatigue_score(perclos, blink_rate, mean_blink, ear_trend):
+    """Weighted 0-100 score: PERCLOS 50, blink duration 25, blink rate 15, EAR trend 10"""
+    return 100.0 * (
+        0.50 * _clip01(perclos / PERCLOS_DROWSY)
+        + 0.25 * _clip01((mean_blink - BLINK_ALERT) / (BLINK_DROWSY - BLINK_ALERT))
+        + 0.15 * _clip01((blink_rate - BLINK_RATE_NORMAL) / (BLINK_RATE_DROWSY - BLINK_RATE_NORMAL))
+        + 0.10 * _clip01(ear_trend / EAR_TREND_DROWSY)
+    )
+
+
+class FatigueStats:
+    """Incrementally maintained PERCLOS, blink and EAR-trend statistics"""
+
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.frames = deque()  # (timestamp, duration, closed, ear)
+        self.blinks = deque()  # (end timestamp, duration)
+        self.longest = deque()  # (end timestamp, duration), durations decreasing
+        self.last_timestamp = None
+        self.closed_since = None
+        self.updates = 0
+        self._resync()
+
+    def _resync(self):
+        """Recompute all running sums from the buffered frames"""
+        self.origin = self.frames[0][0] if self.frames else 0.0
+        self.total_time = sum(f[1] for f in self.frames)
+        self.closed_time = sum(f[1] for f in self.frames if f[2])
+        self.blink_time = sum(b[1] for b in self.blinks)
+        self.n = len(self.frames)
+        self.sum_t = sum(f[0] - self.origin for f in self.frames)
+        self.sum_tt = sum((f[0] - self.origin) ** 2 for f in self.frames)
+        self.sum_e = sum(f[3] for f in self.frames)
+        self.sum_te = sum((f[0] - self.origin) * f[3] for f in self.frames)
+
+    def update(self, timestamp, ear, closed):
+        """Add one face-present frame; returns the duration of a blink that just ended, else None"""
+        duration = 0.0 if self.last_timestamp is None else min(timestamp - self.last_timestamp, MAX_FRAME_GAP)
+        self.last_timestamp = timestamp
+
+        # Closed-eye accounting uses the time since the previous frame
+        self.frames.append((timestamp, duration, closed, ear))
+        self.total_time += duration
+        if closed:
+            self.closed_time += duration
+        t = timestamp - self.origin
+        self.n += 1
+        self.sum_t += t
+        self.sum_tt += t * t
+        self.sum_e += ear
+        self.sum_te += t * ear
+
+        blink = None
+        if closed and self.closed_since is None:
+            self.closed_since = timestamp
+        elif not closed and self.closed_since is not None:
+            blink = timestamp - self.closed_since
+            self.closed_since = None
+            self._add_blink(timestamp, blink)
+
+        self._evict(timestamp - self.window)
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            self._resync()
+        return blink
+
+    def _add_blink(self, timestamp, duration):
+        self.blinks.append((timestamp, duration))
+        self.blink_time += duration
+        while self.longest and self.longest[-1][1] <= duration:
+            self.longest.pop()
+        self.longest.append((timestamp, duration))
+
+    def _evict(self, cutoff):
+        frames = self.frames
+        while frames and frames[0][0] < cutoff:
+            timestamp, duration, closed, ear = frames.popleft()
+            self.total_time -= duration
+            if closed:
+                self.closed_time -= duration
+            t = timestamp - self.origin
+            self.n -= 1
+            self.sum_t -= t
+            self.sum_tt -= t * t
+            self.sum_e -= ear
+            self.sum_te -= t * ear
+        while self.blinks and self.blinks[0][0] < cutoff:
+            self.blink_time -= self.blinks.popleft()[1]
+        while self.longest and self.longest[0][0] < cutoff:
+            self.longest.popleft()
+
+    @property
+    def perclos(self):
+        return self.closed_time / self.total_time if self.total_time > 0 else 0.0
+
+    @property
+    def blink_rate(self):
+        span = self.total_time
+        return len(self.blinks) * 60.0 / span if span > 0 else 0.0
+
+    @property
+    def mean_blink(self):
+        return self.blink_time / len(self.blinks) if self.blinks else 0.0
+
+    @property
+    def max_blink(self):
+        return self.longest[0][1] if self.longest else 0.0
+
+    @property
+    def ear_trend(self):
+        denominator = self.n * self.sum_tt - self.sum_t * self.sum_t
+        if self.n < 2 or denominator <= 1e-9:
+            return 0.0
+        return (self.n * self.sum_te - self.sum_t * self.sum_e) / denominator * 60.0
+
+    @property
+    def filled(self):
+        """Fraction of the window covered by buffered frames"""
+        return min(self.total_time / self.window, 1.0) if self.window > 0 else 1.0
+
+    @property
+    def score(self):
+        return fatigue_score(self.perclos, self.blink_rate, self.mean_blink, self.ear_trend)
+
+    def snapshot(self):
+        return {
+            'perclos': self.perclos,
+            'blink_rate': self.blink_rate,
+            'mean_blink': self.mean_blink,
+            'max_blink': self.max_blink,
+            'ear_trend': self.ear_trend,
+            'fatigue': self.score,
+        }
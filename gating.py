@@ -0,0 +1,91 @@
+"""Change-gated inference: skip landmark prediction while the eyes look the same
+
+After every analysed frame the gate keeps a tiny copy of each of the
+driver's eye regions (a padded box around the eye landmarks, shrunk to
+PATCH_SIZE with area averaging, which also evens out sensor noise). On the
+next frames the same boxes are cut from the new frame and compared: while
+the mean absolute difference of both eyes stays below ``threshold`` grey
+levels, detection and the shape predictor are skipped and the engine feeds
+the previous landmarks through the EAR/alert state machine again, so
+closures keep being timed and a driver who falls asleep still raises the
+alert on time. A blink, a head movement or a lighting change alters the eye
+region and the frame is analysed normally; after ``max_skip`` skipped
+frames in a row one is analysed anyway.
+
+Differences are measured against the last *analysed* frame, not the
+previous one, so slow drift adds up until it triggers inference.
+"""
+import cv2
+import numpy as np
+
+DEFAULT_CHANGE_THRESHOLD = 0.0  # mean grey-level change that counts as a change, 0 = gate off
+DEFAULT_MAX_SKIP = 4  # frames in a row that may reuse the last landmarks
+PATCH_SIZE = (16, 8)  # (width, height) an eye region is shrunk to
+EYE_PADDING = (0.3, 0.6)  # fraction of the eye width added left/right and above/below (lids, brow)
+
+
+def eye_box(points, frame_size):
+    """Padded (x0, y0, x1, y1) box around an eye's landmarks, clipped to the frame"""
+    x0, y0 = points.min(axis=0)
+    x1, y1 = points.max(axis=0)
+    width = max(x1 - x0, 1)
+    pad_x, pad_y = width * EYE_PADDING[0], width * EYE_PADDING[1]
+    return (int(max(x0 - pad_x, 0)), int(max(y0 - pad_y, 0)),
+            int(min(x1 + pad_x + 1, frame_size[0])), int(min(y1 + pad_y + 1, frame_size[1])))
+
+
+def eye_patch(gray, box):
+    """Low-resolution float copy of a box of the frame"""
+    x0, y0, x1, y1 = box
+    return cv2.resize(gray[y0:y1, x0:x1], PATCH_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+class ChangeGate:
+    """Decide per frame whether the driver's eye regions changed since the last analysed frame"""
+
+    def __init__(self, threshold: float = DEFAULT_CHANGE_THRESHOLD, max_skip: int = DEFAULT_MAX_SKIP):
+        self.threshold = threshold
+        self.max_skip = max_skip
+        self.boxes = []
+        self.patches = []
+        self.run = 0  # frames skipped in a row
+
+    @property
+    def enabled(self):
+        return self.threshold > 0 and self.max_skip > 0
+
+    def configure(self, threshold=None, max_skip=None):
+        """Change the threshold and/or the longest run of skipped frames, keeping the reference"""
+        if threshold is not None:
+            self.threshold = max(0.0, float(threshold))
+        if max_skip is not None:
+            self.max_skip = max(0, int(max_skip))
+
+    def reset(self):
+        """Forget the reference so the next frame is analysed"""
+        self.boxes = []
+        self.patches = []
+        self.run = 0
+
+    def set_reference(self, gray, eyes):
+        """Remember the eye regions of an analysed frame; eyes are landmark arrays"""
+        frame_size = (gray.shape[1], gray.shape[0])
+        boxes = [eye_box(points, frame_size) for points in eyes]
+        if any(x1 <= x0 or y1 <= y0 for x0, y0, x1, y1 in boxes):
+            self.reset()
+            return
+        self.boxes = boxes
+        self.patches = [eye_patch(gray, box) for box in boxes]
+        self.run = 0
+
+    def difference(self, gray):
+        """Largest mean absolute grey-level change of an eye region"""
+        return max(float(np.abs(eye_patch(gray, box) - patch).mean())
+                   for box, patch in zip(self.boxes, self.patches))
+
+    def unchanged(self, gray):
+        """True if this frame may reuse the last analysed frame's landmarks"""
+        if not self.boxes or self.run >= self.max_skip or self.difference(gray) >= self.threshold:
+            return False
+        self.run += 1
+        return True
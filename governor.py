@@ -0,0 +1,106 @@
+"""Adaptive quality governor for low-power hardware
+
+The governor watches how old each frame is when its inference finishes
+(capture-to-result latency) against a latency budget. When the p90 of
+recent frames exceeds the budget it steps down one quality level; when it
+stays well below the budget for a while it steps back up. Levels are
+cumulative and ordered by how little they cost in detection quality:
+
+    0 full       configured settings
+    1 display    display rate halved
+    2 overlays   + no overlay drawing
+    3 interval   + full face detection half as often
+    4 width      + face detection at most 480 px wide
+    5 minimal    + face detection at most 320 px wide, a third as often
+
+The governor only decides the level. Each stream applies it to its own
+engine and pipeline on its own inference thread (see CameraStream).
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    name: str
+    display_scale: float = 1.0  # fraction of the configured display rate
+    overlays: bool = True  # draw eye contours, boxes and EAR text
+    interval_scale: int = 1  # multiplier on the detection interval
+    max_width: int = 0  # cap on the detection width (0 = no cap)
+
+    def process_width(self, width):
+        """Detection width at this level for a configured width (0 = full resolution)"""
+        if not self.max_width:
+            return width
+        return min(width, self.max_width) if width else self.max_width
+
+
+QUALITY_LEVELS = (
+    QualityLevel("full"),
+    QualityLevel("display", display_scale=0.5),
+    QualityLevel("overlays", display_scale=0.5, overlays=False),
+    QualityLevel("interval", display_scale=0.5, overlays=False, interval_scale=2),
+    QualityLevel("width", display_scale=0.5, overlays=False, interval_scale=2, max_width=480),
+    QualityLevel("minimal", display_scale=0.5, overlays=False, interval_scale=3, max_width=320),
+)
+DEFAULT_BUDGET = 0.100  # seconds from capture to inference result
+
+
+class QualityGovernor:
+    """Pick a QualityLevel from recent capture-to-result latencies"""
+
+    def __init__(self, budget: float = DEFAULT_BUDGET, window: int = 30, restore_ratio: float = 0.6,
+                 degrade_cooldown: float = 2.0, restore_delay: float = 5.0, levels=QUALITY_LEVELS):
+        self.budget = budget
+        self.restore_ratio = restore_ratio
+        self.degrade_cooldown = degrade_cooldown
+        self.restore_delay = restore_delay
+        self.levels = levels
+        self.samples = deque(maxlen=window)
+        self.index = 0
+        self.changed_at = time.monotonic()
+        self.p90 = None
+        self.listeners = []
+        self._lock = threading.Lock()
+
+    @property
+    def level(self):
+        return self.levels[self.index]
+
+    def add_listener(self, callback):
+        """Call callback(level, p90) after every level change"""
+        self.listeners.append(callback)
+
+    def observe(self, latency):
+        """Record one frame's capture-to-result latency (seconds, any thread)"""
+        with self._lock:
+            self.samples.append(latency)
+            if len(self.samples) < self.samples.maxlen:
+                return
+            ordered = sorted(self.samples)
+            self.p90 = ordered[int(0.9 * (len(ordered) - 1))]
+            now = time.monotonic()
+            since = now - self.changed_at
+            if self.p90 > self.budget and since >= self.degrade_cooldown and self.index < len(self.levels) - 1:
+                step = 1
+            elif self.p90 < self.budget * self.restore_ratio and since >= self.restore_delay and self.index > 0:
+                step = -1
+            else:
+                return
+            self.index += step
+            self.changed_at = now
+            # Judge the new level on its own frames only
+            self.samples.clear()
+            level, p90 = self.level, self.p90
+        print(f"Quality level -> {level.name} (p90 latency {p90 * 1000:.0f} ms, budget {self.budget * 1000:.0f} ms)")
+        for listener in self.listeners:
+            listener(level, p90)
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+            self.index = 0
+            self.changed_at = time.monotonic()
+            self.p90 = None
@@ -0,0 +1,314 @@
+"""Landmark cache for re-scoring recordings with other thresholds
+
+Nearly all the time of an offline analysis goes to face detection and
+landmark prediction, which do not depend on the EAR threshold or the alert
+rule. ``build`` runs them once per video (in parallel chunks, like
+batch.py) and stores the driver's landmarks and face box per frame in an
+.npz file named after a hash of the video's contents and of the detection
+settings. ``score`` and ``sweep`` then replay the EAR state machine from the
+cache with vectorised NumPy code, so trying a grid of settings on a
+multi-hour recording takes seconds.
+
+Cache file:
+
+    times     (N,) float64   seconds from the start of the video
+    present   (N,) bool      a driver's face was found
+    boxes     (N, 4) int16   x, y, w, h (zeros without a face)
+    shapes    (N, P, 2) int16 landmarks in the model's layout
+    layout, settings, video_hash, fps
+
+    python landmark_cache.py build drive.mp4 --workers 8
+    python landmark_cache.py sweep drive.mp4 --thresholds 0.18 0.20 0.22 0.25 --alert-seconds 1.0 1.5 2.0
+    python landmark_cache.py score drive.mp4 --ear-threshold 0.22 --alert-seconds 1.2 --events drive.events.jsonl
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from ear import LAYOUTS, aspect_ratios
+from fatigue import MAX_FRAME_GAP
+
+DEFAULT_CACHE_DIR = "landmark_cache"
+DEFAULT_THRESHOLDS = tuple(np.round(np.arange(0.15, 0.351, 0.01), 2))
+DEFAULT_ALERT_SECONDS_GRID = (0.5, 1.0, 1.5, 2.0, 3.0)
+
+
+def video_hash(path, block: int = 1 << 20):
+    """Content hash of a video file (hex)"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for data in iter(lambda: f.read(block), b""):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def cache_path(video, settings, cache_dir: str = DEFAULT_CACHE_DIR, digest: str = None):
+    """Cache file of a video for the given detection settings"""
+    digest = digest or video_hash(video)
+    tag = hashlib.blake2b(json.dumps(settings, sort_keys=True).encode(), digest_size=4).hexdigest()
+    return os.path.join(cache_dir, f"{digest}-{tag}.npz")
+
+
+@dataclass
+class LandmarkCache:
+    """Per-frame driver landmarks of one video"""
+    times: np.ndarray
+    present: np.ndarray
+    boxes: np.ndarray
+    shapes: np.ndarray
+    layout: str
+    settings: dict
+    video_hash: str = ""
+    fps: float = 30.0
+
+    def __post_init__(self):
+        self._ear = None
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def ear(self):
+        """Mean EAR per frame, NaN without a face (computed once)"""
+        if self._ear is None:
+            self._ear = np.full(len(self.times), np.nan)
+            ratios = aspect_ratios(self.shapes[self.present], LAYOUTS[self.layout])
+            self._ear[self.present] = ratios[:, :2].mean(axis=1)
+        return self._ear
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, times=self.times, present=self.present, boxes=self.boxes, shapes=self.shapes,
+                 layout=self.layout, settings=json.dumps(self.settings), video_hash=self.video_hash,
+                 fps=self.fps)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['times'], data['present'], data['boxes'], data['shapes'], str(data['layout']),
+                       json.loads(str(data['settings'])), str(data['video_hash']), float(data['fps']))
+
+
+# One engine per worker process, created by the pool initializer
+_engine = None
+
+
+def _init_worker(model_path, settings):
+    global _engine
+    import cv2
+    from engine import FatigueEngine
+    cv2.setNumThreads(1)
+    _engine = FatigueEngine(model_path, **settings)
+    _engine.load()
+
+
+def extract_chunk(task):
+    """Driver landmarks of frames [start, end) of a video; runs inside a worker process"""
+    import cv2
+    path, start, end, _ = task
+    _engine.reset()
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    points = _engine.layout.points
+    times, present, boxes, shapes = [], [], [], []
+    index = start
+    while index < end:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        t = index / fps
+        driver = next((face for face in _engine.process(frame, t).faces if face.driver), None)
+        times.append(t)
+        present.append(driver is not None)
+        boxes.append(driver.box if driver else (0, 0, 0, 0))
+        shapes.append(driver.shape if driver else np.zeros((points, 2)))
+        index += 1
+    cap.release()
+    return (start, np.array(times), np.array(present, dtype=bool), np.array(boxes, dtype=np.int16).reshape(-1, 4),
+            np.array(shapes, dtype=np.int16).reshape(-1, points, 2))
+
+
+def build(video, settings, cache_dir: str = DEFAULT_CACHE_DIR, workers=None, chunk_seconds: float = 600.0,
+          model_path=None, digest: str = None):
+    """Run detection and landmarks over a video and save its cache; returns the LandmarkCache"""
+    from batch import split_chunks, video_info
+    tasks = split_chunks(video, chunk_seconds, 0)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, settings)) as pool:
+        chunks = sorted(pool.map(extract_chunk, tasks), key=lambda chunk: chunk[0])
+    _, fps = video_info(video)
+    digest = digest or video_hash(video)
+    cache = LandmarkCache(*(np.concatenate([chunk[i] for chunk in chunks]) for i in range(1, 5)),
+                          layout=_layout_name(settings.get('landmark_backend')), settings=settings,
+                          video_hash=digest, fps=fps)
+    cache.save(cache_path(video, settings, cache_dir, digest))
+    return cache
+
+
+def _layout_name(landmark_backend=None):
+    # backends needs dlib; only building a cache imports it
+    from backends import DEFAULT_LANDMARKS, LANDMARK_MODELS
+    return LANDMARK_MODELS[landmark_backend or DEFAULT_LANDMARKS][1].name
+
+
+def open_cache(video, settings, cache_dir: str = DEFAULT_CACHE_DIR, rebuild: bool = False, **build_options):
+    """Load a video's cache for these settings, building it first if needed"""
+    digest = video_hash(video)
+    path = cache_path(video, settings, cache_dir, digest)
+    if os.path.exists(path) and not rebuild:
+        return LandmarkCache.load(path)
+    return build(video, settings, cache_dir, digest=digest, **build_options)
+
+
+def score(times, ear, ear_threshold, alert_seconds):
+    """Blinks, alerts and PERCLOS of an EAR series, as FatigueEngine would report them
+
+    Frames without a face (NaN EAR) are skipped; like the engine, a closure
+    continues across them. Returns a dict of arrays indexing the input.
+    """
+    face = np.flatnonzero(~np.isnan(ear))
+    t = times[face]
+    closed = ear[face] < ear_threshold
+
+    # Closed runs: starts at the first closed frame, ends at the reopening frame (or len)
+    edges = np.diff(closed.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    since = t[starts]
+
+    # One alert per run, on its first frame closed for alert_seconds (the
+    # alarm stays on until the eyes reopen)
+    run = np.cumsum(edges[:-1] == 1) - 1
+    shut = np.flatnonzero(closed)
+    due = shut[t[shut] - since[run[shut]] >= alert_seconds]
+    _, first = np.unique(run[due], return_index=True)
+    alert_at = due[first]
+
+    # A blink is counted when the eyes reopen
+    reopened = ends < len(t)
+    blink_end = ends[reopened]
+
+    # Time-weighted PERCLOS as in FatigueStats, over the whole recording
+    durations = np.minimum(np.diff(t, prepend=t[:1]), MAX_FRAME_GAP)
+    total = durations.sum()
+    return {
+        'alert_frames': face[alert_at],
+        'blink_frames': face[blink_end],
+        'blink_lengths': blink_end - starts[reopened],
+        'blink_durations': t[blink_end] - since[reopened],
+        'perclos': float(durations[closed].sum() / total) if total > 0 else 0.0,
+    }
+
+
+def summarise(cache, scored):
+    """Counts and rates of a score() result over a cached video"""
+    minutes = max(cache.times[-1] - cache.times[0], 1e-9) / 60.0 if len(cache) else 0.0
+    durations = scored['blink_durations']
+    return {
+        'alerts': len(scored['alert_frames']),
+        'blinks': len(scored['blink_frames']),
+        'blink_rate': float(len(durations) / minutes) if minutes else 0.0,
+        'mean_blink': float(durations.mean()) if len(durations) else 0.0,
+        'perclos': scored['perclos'],
+    }
+
+
+def sweep(cache, thresholds=DEFAULT_THRESHOLDS, alert_seconds=DEFAULT_ALERT_SECONDS_GRID):
+    """summarise() for every (EAR threshold, alert seconds) pair"""
+    rows = []
+    for threshold in thresholds:
+        for seconds in alert_seconds:
+            scored = score(cache.times, cache.ear, threshold, seconds)
+            rows.append({'ear_threshold': float(threshold), 'alert_seconds': float(seconds),
+                         **summarise(cache, scored)})
+    return rows
+
+
+def events(cache, scored):
+    """Blink and alert events in batch.py's events.jsonl format, in frame order"""
+    ear = cache.ear
+    found = [{'kind': "blink", 'frame': int(frame), 'time': round(float(cache.times[frame]), 3),
+              'frames': int(length), 'duration': float(duration)}
+             for frame, length, duration in zip(scored['blink_frames'], scored['blink_lengths'],
+                                                scored['blink_durations'])]
+    found += [{'kind': "alert", 'frame': int(frame), 'time': round(float(cache.times[frame]), 3),
+               'ear': float(ear[frame])} for frame in scored['alert_frames']]
+    return sorted(found, key=lambda event: (event['frame'], event['kind'] == "blink"))
+
+
+def main():
+    from backends import DEFAULT_DETECTOR, DEFAULT_LANDMARKS, DETECTORS, LANDMARK_MODELS
+    from driver import DEFAULT_DRIVER_POLICY, DEFAULT_SEAT_REGION, DRIVER_POLICIES
+    from engine import (DEFAULT_ALERT_SECONDS, DEFAULT_DETECT_INTERVAL, DEFAULT_EAR_THRESHOLD,
+                        DEFAULT_PROCESS_WIDTH, DEFAULT_REDETECT_POLICY)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('video')
+    common.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    common.add_argument('--rebuild', action='store_true', help='re-run detection even if a cache exists')
+    common.add_argument('--workers', type=int, default=os.cpu_count())
+    common.add_argument('--model', help="landmark model file (default: the landmark backend's)")
+    common.add_argument('--detector', default=DEFAULT_DETECTOR, choices=tuple(DETECTORS))
+    common.add_argument('--landmarks', default=DEFAULT_LANDMARKS, choices=tuple(LANDMARK_MODELS))
+    common.add_argument('--interval', type=int, default=DEFAULT_DETECT_INTERVAL)
+    common.add_argument('--policy', default=DEFAULT_REDETECT_POLICY)
+    common.add_argument('--width', type=int, default=DEFAULT_PROCESS_WIDTH)
+    common.add_argument('--driver-policy', default=DEFAULT_DRIVER_POLICY, choices=DRIVER_POLICIES)
+    common.add_argument('--seat', type=float, nargs=4, default=DEFAULT_SEAT_REGION,
+                        metavar=('LEFT', 'TOP', 'RIGHT', 'BOTTOM'))
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('build', parents=[common], help='cache the landmarks of a video')
+    sweep_parser = commands.add_parser('sweep', parents=[common], help='score a grid of settings')
+    sweep_parser.add_argument('--thresholds', type=float, nargs='+', default=DEFAULT_THRESHOLDS)
+    sweep_parser.add_argument('--alert-seconds', type=float, nargs='+', default=DEFAULT_ALERT_SECONDS_GRID)
+    sweep_parser.add_argument('--json', help='also write the results to this file')
+    score_parser = commands.add_parser('score', parents=[common], help='score one setting')
+    score_parser.add_argument('--ear-threshold', type=float, default=DEFAULT_EAR_THRESHOLD)
+    score_parser.add_argument('--alert-seconds', type=float, default=DEFAULT_ALERT_SECONDS)
+    score_parser.add_argument('--events', help='write blink and alert events to this JSONL file')
+    args = parser.parse_args()
+
+    settings = {'detector_backend': args.detector, 'landmark_backend': args.landmarks,
+                'detect_interval': args.interval, 'redetect_policy': args.policy, 'process_width': args.width,
+                'driver_policy': args.driver_policy, 'seat_region': list(args.seat)}
+    start = time.perf_counter()
+    cache = open_cache(args.video, settings, args.cache_dir, rebuild=args.rebuild or args.command == 'build',
+                       workers=args.workers, model_path=args.model)
+    print(f"{args.video}: {len(cache)} frames, {cache.present.mean() * 100 if len(cache) else 0:.1f}% with a face "
+          f"({time.perf_counter() - start:.1f}s)")
+
+    start = time.perf_counter()
+    if args.command == 'sweep':
+        rows = sweep(cache, args.thresholds, args.alert_seconds)
+        print(f"{'EAR':>6} {'alert s':>8} {'alerts':>7} {'blinks':>7} {'per min':>8} {'mean s':>7} {'PERCLOS':>8}")
+        for row in rows:
+            print(f"{row['ear_threshold']:6.2f} {row['alert_seconds']:8.2f} {row['alerts']:7d} {row['blinks']:7d} "
+                  f"{row['blink_rate']:8.1f} {row['mean_blink']:7.3f} {row['perclos'] * 100:7.1f}%")
+        print(f"{len(rows)} settings scored in {time.perf_counter() - start:.2f}s")
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({'video': args.video, 'frames': len(cache), 'settings': settings, 'results': rows},
+                          f, indent=2)
+    elif args.command == 'score':
+        scored = score(cache.times, cache.ear, args.ear_threshold, args.alert_seconds)
+        print(json.dumps(summarise(cache, scored)))
+        if args.events:
+            with open(args.events, 'w') as f:
+                for event in events(cache, scored):
+                    f.write(json.dumps(event) + "\n")
+
+
+if __name__ == '__main__':
+    main()
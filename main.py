@@ -1,23 +1,38 @@
-import cv2
-import dlib
+import time
+
+# Startup phases are timed from here (see FatigueMonitorApp.startup)
+STARTED = time.perf_counter()
+
+import argparse
+import json
 import threading
-from imutils import face_utils
-from scipy.spatial import distance as dist
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
-import simpleaudio as sa
-import time
+
+from display import VideoSurface, fit_frame, grid_shape
+from governor import DEFAULT_BUDGET, QUALITY_LEVELS, QualityGovernor
+from metrics import MetricsExporter, StageProfiler, serve_metrics
+
+# OpenCV, dlib, NumPy, Pillow, simpleaudio and the modules built on them are
+# imported where they are used. load_models imports them on a background
+# thread once the window is shown, so those later imports are cheap.
+
+# Video display rate; rendering is capped independently of processing
+DEFAULT_DISPLAY_FPS = 30
+# Every monitoring session is persisted here (see recorder.py)
+DEFAULT_SESSION_DIR = "sessions"
+DEFAULT_CLIP_DIR = "clips"
 
 
 class FatigueMonitorApp:
     """Modern Fatigue Monitor with Enhanced GUI"""
 
-    def __init__(self, root, camera_index: int = 0):
+    def __init__(self, root, camera_index: int = 0, profiler=None, startup_log=None,
+                 exit_after_startup: bool = False, telemetry=None, processes: int = 0):
         self.root = root
         self.root.title("Fatigue Monitor Pro")
-        self.root.geometry("1200x800")
-        self.root.minsize(1000, 700)
+        self.root.geometry("1200x900")
+        self.root.minsize(1000, 800)
         
         # Modern color scheme
         self.colors = {
@@ -38,30 +53,46 @@ class FatigueMonitorApp:
         # Style configuration
         self.setup_styles()
         
-        self.camera_index = camera_index
-        self.cap = None
+        self.camera_sources = [camera_index]
+        self.monitor = None
+        self.tiles = []
+        self.tile_size = (0, 0)
+        self.mosaic = None
+        self.display_fps = DEFAULT_DISPLAY_FPS
+        self.record_sessions = True
+        self.save_clips = True
+        # Requested camera format (0 / "" keep the driver default); see capture.py
+        self.capture_settings = {'width': 0, 'height': 0, 'fps': 0, 'fourcc': ""}
+        # Degrades quality in steps when frames get older than the budget
+        self.governor = QualityGovernor(DEFAULT_BUDGET)
         self.monitoring = False
         self.alarm_wav = "alarm.wav"
+        self.alarm = None
         self.start_time = None
 
-        # Detection models setup
-        self.detector = dlib.get_frontal_face_detector()
-        self.predictor = dlib.shape_predictor("shape_predictor_68_face_landmarks.dat")
-        (self.lStart, self.lEnd) = face_utils.FACIAL_LANDMARKS_IDXS["left_eye"]
-        (self.rStart, self.rEnd) = face_utils.FACIAL_LANDMARKS_IDXS["right_eye"]
-
-        # EAR constants
-        self.EAR_THRESHOLD = 0.25
-        self.CONSEC_FRAMES = 20
-        self.counter = 0
-        self.alerts = 0
-        self.alarm_on = False
-        self.total_frames = 0
-        self.drowsy_frames = 0
-        self.blink_count = 0
-        self.avg_ear = 0.0
+        # Per-stage latency percentiles shown in the performance card
+        self.profiler = profiler or StageProfiler()
+        # Optional TelemetryPublisher streaming events and summaries to a fleet collector
+        self.telemetry = telemetry
+        # Worker processes for frame-parallel detection (0 = detect on threads)
+        self.processes = processes
+
+        # Detection engine: holds the shared models and the settings that
+        # every camera stream's own engine is cloned from. It is created by
+        # the loader thread after the window is shown (see load_models).
+        self.engine = None
+        self.load_error = None
+        self.loader = None
+        # Seconds per startup phase: window, imports, models, ready
+        self.startup = {}
+        self.startup_log = startup_log
+        self.exit_after_startup = exit_after_startup
 
         self.setup_ui()
+        self.start_btn["state"] = "disabled"
+        self.settings_btn["state"] = "disabled"
+        self.status_var.set("⏳ Loading detection models...")
+        self.root.after_idle(self.window_shown)
 
     def setup_styles(self):
         """Configure modern styles for ttk widgets"""
@@ -148,6 +179,7 @@ class FatigueMonitorApp:
         self.video_label = tk.Label(video_frame, bg='black', text="Camera Feed\nWill Appear Here", 
                                    fg='white', font=('Segoe UI', 16), relief='flat', bd=2)
         self.video_label.pack(fill='both', expand=True, padx=10, pady=(0, 10))
+        self.video_surface = VideoSurface(self.video_label, on_resize=lambda size: self.update_tile_size())
 
     def create_control_panel(self, parent):
         """Create modern control panel"""
@@ -223,6 +255,9 @@ class FatigueMonitorApp:
         # Alerts card
         self.create_alerts_card(stats_container)
         
+        # Rolling fatigue statistics
+        self.create_fatigue_card(stats_container)
+        
         # Performance metrics
         self.create_performance_card(stats_container)
 
@@ -256,9 +291,9 @@ class FatigueMonitorApp:
         ear_value.pack(side='left')
         
         # EAR threshold indicator
-        threshold_label = tk.Label(ear_display_frame, text=f"Threshold: {self.EAR_THRESHOLD}", 
+        self.threshold_label = tk.Label(ear_display_frame, text="Threshold: --", 
                                   font=('Segoe UI', 10), fg=self.colors['text_secondary'], bg=self.colors['card'])
-        threshold_label.pack(side='right')
+        self.threshold_label.pack(side='right')
         
         # Drowsiness progress
         tk.Label(ear_card, text="Drowsiness Level", 
@@ -302,6 +337,32 @@ class FatigueMonitorApp:
         tk.Label(blink_frame, text="Blinks", 
                 font=('Segoe UI', 10), fg=self.colors['text_secondary'], bg=self.colors['card']).pack(side='left', padx=(10, 0))
 
+    def create_fatigue_card(self, parent):
+        """Create rolling fatigue statistics card"""
+        fatigue_card = tk.Frame(parent, bg=self.colors['card'], relief='flat', bd=1)
+        fatigue_card.pack(fill='x', pady=(0, 10))
+        
+        tk.Label(fatigue_card, text="😴 Fatigue Statistics", 
+                font=('Segoe UI', 12, 'bold'), fg=self.colors['text'], bg=self.colors['card']).pack(anchor='w', padx=15, pady=(10, 5))
+        
+        # Two columns of label/value pairs
+        grid = tk.Frame(fatigue_card, bg=self.colors['card'])
+        grid.pack(fill='x', padx=15, pady=(0, 5))
+        self.fatigue_vars = {}
+        items = (('perclos', "PERCLOS:"), ('blink_rate', "Blinks/min:"), ('mean_blink', "Mean Blink:"),
+                 ('max_blink', "Max Blink:"), ('ear_trend', "EAR Trend:"), ('fatigue', "Score:"))
+        for i, (key, text) in enumerate(items):
+            row, col = divmod(i, 2)
+            self.fatigue_vars[key] = tk.StringVar(value="--")
+            tk.Label(grid, text=text, font=('Segoe UI', 10), fg=self.colors['text_secondary'],
+                    bg=self.colors['card']).grid(row=row, column=col * 2, sticky='w')
+            tk.Label(grid, textvariable=self.fatigue_vars[key], font=('Segoe UI', 10, 'bold'), fg=self.colors['text'],
+                    bg=self.colors['card']).grid(row=row, column=col * 2 + 1, sticky='w', padx=(5, 15))
+        
+        self.fatigue_progress = ttk.Progressbar(fatigue_card, mode='determinate', 
+                                                length=300, style='Warning.Horizontal.TProgressbar')
+        self.fatigue_progress.pack(fill='x', padx=15, pady=(0, 10))
+
     def create_performance_card(self, parent):
         """Create performance metrics card"""
         perf_card = tk.Frame(parent, bg=self.colors['card'], relief='flat', bd=1)
@@ -322,13 +383,48 @@ class FatigueMonitorApp:
         
         # Drowsiness percentage
         drowsy_frame = tk.Frame(perf_card, bg=self.colors['card'])
-        drowsy_frame.pack(fill='x', padx=15, pady=(0, 10))
+        drowsy_frame.pack(fill='x', padx=15, pady=(0, 5))
         
         self.drowsy_percent_var = tk.StringVar(value="0.0%")
         tk.Label(drowsy_frame, text="Drowsiness:", font=('Segoe UI', 10), fg=self.colors['text_secondary'], bg=self.colors['card']).pack(side='left')
         drowsy_value = tk.Label(drowsy_frame, textvariable=self.drowsy_percent_var, 
                                font=('Segoe UI', 10, 'bold'), fg=self.colors['warning'], bg=self.colors['card'])
         drowsy_value.pack(side='left', padx=(5, 0))
+        
+        # Frames that reused the last landmarks (change-gated inference)
+        skipped_frame = tk.Frame(perf_card, bg=self.colors['card'])
+        skipped_frame.pack(fill='x', padx=15, pady=(0, 5))
+        
+        self.skipped_percent_var = tk.StringVar(value="0.0%")
+        tk.Label(skipped_frame, text="Skipped Frames:", font=('Segoe UI', 10), fg=self.colors['text_secondary'], bg=self.colors['card']).pack(side='left')
+        skipped_value = tk.Label(skipped_frame, textvariable=self.skipped_percent_var, 
+                                font=('Segoe UI', 10, 'bold'), fg=self.colors['text'], bg=self.colors['card'])
+        skipped_value.pack(side='left', padx=(5, 0))
+        
+        # Detection-to-audio latency of the last alarm
+        latency_frame = tk.Frame(perf_card, bg=self.colors['card'])
+        latency_frame.pack(fill='x', padx=15, pady=(0, 5))
+        
+        self.alarm_latency_var = tk.StringVar(value="--")
+        tk.Label(latency_frame, text="Alarm Latency:", font=('Segoe UI', 10), fg=self.colors['text_secondary'], bg=self.colors['card']).pack(side='left')
+        latency_value = tk.Label(latency_frame, textvariable=self.alarm_latency_var, 
+                                font=('Segoe UI', 10, 'bold'), fg=self.colors['text'], bg=self.colors['card'])
+        latency_value.pack(side='left', padx=(5, 0))
+        
+        # Active quality level of the load governor
+        quality_frame = tk.Frame(perf_card, bg=self.colors['card'])
+        quality_frame.pack(fill='x', padx=15, pady=(0, 5))
+        
+        self.quality_var = tk.StringVar(value=QUALITY_LEVELS[0].name)
+        tk.Label(quality_frame, text="Quality:", font=('Segoe UI', 10), fg=self.colors['text_secondary'], bg=self.colors['card']).pack(side='left')
+        self.quality_label = tk.Label(quality_frame, textvariable=self.quality_var, 
+                                      font=('Segoe UI', 10, 'bold'), fg=self.colors['success'], bg=self.colors['card'])
+        self.quality_label.pack(side='left', padx=(5, 0))
+        
+        # Per-stage latency percentiles (ms)
+        self.stages_var = tk.StringVar(value="")
+        tk.Label(perf_card, textvariable=self.stages_var, justify='left', anchor='w',
+                font=('Consolas', 9), fg=self.colors['text_secondary'], bg=self.colors['card']).pack(fill='x', padx=15, pady=(0, 10))
 
     def create_status_bar(self, parent):
         """Create bottom status bar"""
@@ -346,13 +442,82 @@ class FatigueMonitorApp:
                                 font=('Segoe UI', 10), fg=self.colors['text_secondary'], bg=self.colors['surface'])
         version_label.pack(side='right', padx=10, pady=5)
 
+    def window_shown(self):
+        """The first frame of the window is drawn: start loading the models (Tk thread)"""
+        self.startup['window'] = time.perf_counter() - STARTED
+        self.loader = threading.Thread(target=self.load_models, name="loader", daemon=True)
+        self.loader.start()
+        self.root.after(50, self.check_models)
+
+    def load_models(self):
+        """Import the detection stack, load the models and decode the alarm (loader thread)"""
+        start = time.perf_counter()
+        try:
+            # Also warm the imports the render path and settings window use
+            import cv2, numpy, PIL.ImageTk  # noqa: F401
+            import multicam  # noqa: F401
+            from alerts import AlarmPlayer
+            from engine import FatigueEngine
+            imported = time.perf_counter()
+            try:
+                self.alarm = AlarmPlayer(self.alarm_wav)
+            except Exception as e:
+                print("Alarm error:", e)
+            engine = FatigueEngine(profiler=self.profiler)
+            self.engine = engine
+            engine.load()
+            self.startup['imports'] = imported - start
+            self.startup['models'] = time.perf_counter() - imported
+        except Exception as e:
+            self.load_error = e
+
+    def check_models(self):
+        """Enable Start once the loader thread is done (Tk thread)"""
+        if self.loader.is_alive():
+            self.root.after(50, self.check_models)
+            return
+        self.startup['ready'] = time.perf_counter() - STARTED
+        if self.engine is not None:
+            self.threshold_label.config(text=f"Threshold: {self.engine.ear_threshold}")
+            # A missing model can be fixed by picking another backend
+            self.settings_btn["state"] = "normal"
+        if self.load_error is not None:
+            self.status_var.set(f"❌ Cannot load detection models: {self.load_error}")
+        else:
+            self.start_btn["state"] = "normal"
+            self.status_var.set("Ready to start monitoring")
+        self.report_startup()
+        if self.exit_after_startup:
+            self.on_close()
+
+    def report_startup(self):
+        """Print the startup phases and append them to the startup log"""
+        phases = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.startup.items())
+        print(f"Startup: {phases}")
+        if self.startup_log:
+            record = {'time': time.time(), 'error': str(self.load_error) if self.load_error else None,
+                      **{f"{name}_ms": seconds * 1000 for name, seconds in self.startup.items()}}
+            with open(self.startup_log, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+
     def open_settings(self):
         """Open modern settings window"""
+        from backends import DEFAULT_DETECTOR, DEFAULT_LANDMARKS, DETECTORS, LANDMARK_MODELS
+        from capture import PIXEL_FORMATS
+        from detection import REDETECT_POLICIES
+        from driver import DEFAULT_DRIVER_POLICY, DRIVER_POLICIES
+        from engine import (DEFAULT_EAR_THRESHOLD, DEFAULT_ALERT_SECONDS, DEFAULT_DETECT_INTERVAL,
+                            DEFAULT_REDETECT_POLICY, DEFAULT_PROCESS_WIDTH, DEFAULT_FATIGUE_THRESHOLD,
+                            DEFAULT_PASSENGER_INTERVAL)
+        from gating import DEFAULT_CHANGE_THRESHOLD, DEFAULT_MAX_SKIP
+        from multicam import parse_sources
         settings_window = tk.Toplevel(self.root)
         settings_window.title("Settings - Fatigue Monitor Pro")
-        settings_window.geometry("500x600")
+        # Fit small cab displays; the settings scroll and can be resized
+        settings_window.geometry(f"520x{min(800, settings_window.winfo_screenheight() - 80)}")
+        settings_window.minsize(520, 300)
         settings_window.configure(bg=self.colors['bg'])
-        settings_window.resizable(False, False)
+        settings_window.resizable(False, True)
         settings_window.grab_set()
         
         # Settings header
@@ -363,9 +528,31 @@ class FatigueMonitorApp:
         tk.Label(header, text="⚙️ Settings", font=('Segoe UI', 16, 'bold'), 
                 fg='white', bg=self.colors['accent']).pack(expand=True)
         
-        # Settings content
-        content = tk.Frame(settings_window, bg=self.colors['bg'])
-        content.pack(fill='both', expand=True, padx=20, pady=20)
+        # Buttons, packed before the scrolled area so they always stay in view
+        btn_frame = tk.Frame(settings_window, bg=self.colors['bg'])
+        btn_frame.pack(side='bottom', fill='x', padx=20, pady=15)
+        
+        # Settings content, in a vertically scrolling canvas
+        body = tk.Frame(settings_window, bg=self.colors['bg'])
+        body.pack(fill='both', expand=True)
+        canvas = tk.Canvas(body, bg=self.colors['bg'], highlightthickness=0)
+        scrollbar = ttk.Scrollbar(body, orient='vertical', command=canvas.yview)
+        canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y')
+        canvas.pack(side='left', fill='both', expand=True)
+        
+        content = tk.Frame(canvas, bg=self.colors['bg'], padx=20, pady=20)
+        content_item = canvas.create_window((0, 0), window=content, anchor='nw')
+        content.bind('<Configure>', lambda e: canvas.configure(scrollregion=canvas.bbox('all')))
+        canvas.bind('<Configure>', lambda e: canvas.itemconfigure(content_item, width=e.width))
+        
+        def scroll(event):
+            # Windows/macOS report a wheel delta, X11 sends Button-4/5
+            step = -1 if event.num == 4 or event.delta > 0 else 1
+            canvas.yview_scroll(step, 'units')
+        
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            settings_window.bind(sequence, scroll)
         
         # Detection settings
         detection_frame = tk.Frame(content, bg=self.colors['card'], relief='flat', bd=1)
@@ -383,20 +570,115 @@ class FatigueMonitorApp:
         ear_scale = tk.Scale(ear_frame, from_=0.1, to=0.4, resolution=0.01, 
                             orient='horizontal', bg=self.colors['card'], fg=self.colors['text'],
                             highlightthickness=0, troughcolor=self.colors['surface'])
-        ear_scale.set(self.EAR_THRESHOLD)
+        ear_scale.set(self.engine.ear_threshold)
         ear_scale.pack(fill='x', pady=(5, 10))
         
-        # Consecutive frames
-        frames_frame = tk.Frame(detection_frame, bg=self.colors['card'])
-        frames_frame.pack(fill='x', padx=15, pady=(0, 15))
+        # Closed-eye duration before an alert
+        closure_frame = tk.Frame(detection_frame, bg=self.colors['card'])
+        closure_frame.pack(fill='x', padx=15, pady=(0, 15))
         
-        tk.Label(frames_frame, text="Consecutive Frames:", font=('Segoe UI', 10), 
+        tk.Label(closure_frame, text="Eyes Closed Before Alert (seconds):", font=('Segoe UI', 10), 
                 fg=self.colors['text'], bg=self.colors['card']).pack(anchor='w')
-        frames_scale = tk.Scale(frames_frame, from_=10, to=50, 
-                               orient='horizontal', bg=self.colors['card'], fg=self.colors['text'],
-                               highlightthickness=0, troughcolor=self.colors['surface'])
-        frames_scale.set(self.CONSEC_FRAMES)
-        frames_scale.pack(fill='x', pady=(5, 10))
+        closure_scale = tk.Scale(closure_frame, from_=0.3, to=3.0, resolution=0.1, 
+                                orient='horizontal', bg=self.colors['card'], fg=self.colors['text'],
+                                highlightthickness=0, troughcolor=self.colors['surface'])
+        closure_scale.set(self.engine.alert_seconds)
+        closure_scale.pack(fill='x', pady=(5, 10))
+        
+        # Detection interval
+        interval_frame = tk.Frame(detection_frame, bg=self.colors['card'])
+        interval_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(interval_frame, text="Full Detection Every N Frames:", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(anchor='w')
+        interval_scale = tk.Scale(interval_frame, from_=1, to=30, 
+                                 orient='horizontal', bg=self.colors['card'], fg=self.colors['text'],
+                                 highlightthickness=0, troughcolor=self.colors['surface'])
+        interval_scale.set(self.engine.detect_interval)
+        interval_scale.pack(fill='x', pady=(5, 10))
+        
+        # Re-detect policy
+        policy_frame = tk.Frame(detection_frame, bg=self.colors['card'])
+        policy_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(policy_frame, text="Re-detect Policy:", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
+        policy_var = tk.StringVar(value=self.engine.redetect_policy)
+        policy_combo = ttk.Combobox(policy_frame, textvariable=policy_var, values=REDETECT_POLICIES,
+                                    state='readonly', width=14)
+        policy_combo.pack(side='right')
+        
+        # Processing resolution
+        width_frame = tk.Frame(detection_frame, bg=self.colors['card'])
+        width_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(width_frame, text="Detection Width (px, 0 = full):", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
+        width_var = tk.StringVar(value=str(self.engine.process_width))
+        width_combo = ttk.Combobox(width_frame, textvariable=width_var, values=("0", "960", "640", "480", "320"),
+                                   width=14)
+        width_combo.pack(side='right')
+        
+        # Detector and landmark backends
+        detector_frame = tk.Frame(detection_frame, bg=self.colors['card'])
+        detector_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(detector_frame, text="Face Detector:", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
+        detector_var = tk.StringVar(value=self.engine.detector_backend)
+        detector_combo = ttk.Combobox(detector_frame, textvariable=detector_var, values=tuple(DETECTORS),
+                                      state='readonly', width=14)
+        detector_combo.pack(side='right')
+        
+        landmarks_frame = tk.Frame(detection_frame, bg=self.colors['card'])
+        landmarks_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(landmarks_frame, text="Landmark Model:", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
+        landmarks_var = tk.StringVar(value=self.engine.landmark_backend)
+        landmarks_combo = ttk.Combobox(landmarks_frame, textvariable=landmarks_var, values=tuple(LANDMARK_MODELS),
+                                       state='readonly', width=14)
+        landmarks_combo.pack(side='right')
+        
+        # Whose face drives the alerts when several are visible
+        driver_frame = tk.Frame(detection_frame, bg=self.colors['card'])
+        driver_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(driver_frame, text="Driver Selection:", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
+        driver_var = tk.StringVar(value=self.engine.selector.policy)
+        driver_combo = ttk.Combobox(driver_frame, textvariable=driver_var, values=DRIVER_POLICIES,
+                                    state='readonly', width=14)
+        driver_combo.pack(side='right')
+        
+        passenger_frame = tk.Frame(detection_frame, bg=self.colors['card'])
+        passenger_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(passenger_frame, text="Analyse Passengers Every N Frames (0 = on detection):", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
+        passenger_var = tk.StringVar(value=str(self.engine.passenger_interval))
+        passenger_combo = ttk.Combobox(passenger_frame, textvariable=passenger_var, values=("0", "2", "5", "10", "30"),
+                                       width=6)
+        passenger_combo.pack(side='right')
+        
+        gate_frame = tk.Frame(detection_frame, bg=self.colors['card'])
+        gate_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(gate_frame, text="Skip Frames With Unchanged Eyes (grey levels, 0 = off):", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
+        gate_var = tk.StringVar(value=f"{self.engine.gate.threshold:g}")
+        gate_combo = ttk.Combobox(gate_frame, textvariable=gate_var, values=("0", "2", "3", "5", "8"), width=6)
+        gate_combo.pack(side='right')
+        
+        max_skip_frame = tk.Frame(detection_frame, bg=self.colors['card'])
+        max_skip_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(max_skip_frame, text="Analyse At Least Every N Frames:", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
+        max_skip_var = tk.StringVar(value=str(self.engine.gate.max_skip + 1))
+        max_skip_combo = ttk.Combobox(max_skip_frame, textvariable=max_skip_var, values=("2", "3", "5", "8", "10"),
+                                      width=6)
+        max_skip_combo.pack(side='right')
         
         # Camera settings
         camera_frame = tk.Frame(content, bg=self.colors['card'], relief='flat', bd=1)
@@ -405,34 +687,198 @@ class FatigueMonitorApp:
         tk.Label(camera_frame, text="📷 Camera Settings", 
                 font=('Segoe UI', 12, 'bold'), fg=self.colors['text'], bg=self.colors['card']).pack(anchor='w', padx=15, pady=(10, 5))
         
-        # Camera index
+        # Camera indices / stream URLs
         cam_frame = tk.Frame(camera_frame, bg=self.colors['card'])
         cam_frame.pack(fill='x', padx=15, pady=(0, 15))
         
-        tk.Label(cam_frame, text="Camera Index:", font=('Segoe UI', 10), 
+        tk.Label(cam_frame, text="Cameras (comma separated):", font=('Segoe UI', 10), 
                 fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
-        cam_var = tk.StringVar(value=str(self.camera_index))
-        cam_entry = tk.Entry(cam_frame, textvariable=cam_var, font=('Segoe UI', 10), width=10)
+        cam_var = tk.StringVar(value=", ".join(str(source) for source in self.camera_sources))
+        cam_entry = tk.Entry(cam_frame, textvariable=cam_var, font=('Segoe UI', 10), width=20)
         cam_entry.pack(side='right')
         
-        # Buttons
-        btn_frame = tk.Frame(content, bg=self.colors['bg'])
-        btn_frame.pack(fill='x', pady=(20, 0))
+        # Requested camera format
+        resolution_frame = tk.Frame(camera_frame, bg=self.colors['card'])
+        resolution_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(resolution_frame, text="Camera Resolution:", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
+        width, height = self.capture_settings['width'], self.capture_settings['height']
+        resolution_var = tk.StringVar(value=f"{width}x{height}" if width and height else "default")
+        resolution_combo = ttk.Combobox(resolution_frame, textvariable=resolution_var,
+                                        values=("default", "640x480", "1280x720", "1920x1080"), width=14)
+        resolution_combo.pack(side='right')
+        
+        camera_fps_frame = tk.Frame(camera_frame, bg=self.colors['card'])
+        camera_fps_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(camera_fps_frame, text="Camera FPS (0 = default):", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
+        camera_fps_var = tk.StringVar(value=f"{self.capture_settings['fps']:g}")
+        camera_fps_combo = ttk.Combobox(camera_fps_frame, textvariable=camera_fps_var, values=("0", "15", "30", "60"),
+                                        width=14)
+        camera_fps_combo.pack(side='right')
+        
+        fourcc_frame = tk.Frame(camera_frame, bg=self.colors['card'])
+        fourcc_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(fourcc_frame, text="Pixel Format:", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
+        fourcc_var = tk.StringVar(value=self.capture_settings['fourcc'] or "default")
+        fourcc_combo = ttk.Combobox(fourcc_frame, textvariable=fourcc_var,
+                                    values=["default"] + [f for f in PIXEL_FORMATS if f], state='readonly', width=14)
+        fourcc_combo.pack(side='right')
+        
+        # Stage profiling
+        profile_frame = tk.Frame(camera_frame, bg=self.colors['card'])
+        profile_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        profile_var = tk.BooleanVar(value=self.profiler.enabled)
+        tk.Checkbutton(profile_frame, text="Profile pipeline stages", variable=profile_var,
+                       font=('Segoe UI', 10), fg=self.colors['text'], bg=self.colors['card'],
+                       selectcolor=self.colors['surface'], activebackground=self.colors['card'],
+                       highlightthickness=0).pack(side='left')
+        
+        # Latency budget of the load governor
+        budget_frame = tk.Frame(camera_frame, bg=self.colors['card'])
+        budget_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(budget_frame, text="Latency Budget (ms, 0 = off):", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
+        budget_var = tk.StringVar(value=f"{self.governor.budget * 1000:.0f}" if self.governor else "0")
+        budget_combo = ttk.Combobox(budget_frame, textvariable=budget_var, values=("0", "66", "100", "150", "250"),
+                                    width=14)
+        budget_combo.pack(side='right')
+        
+        # Session recording
+        record_frame = tk.Frame(camera_frame, bg=self.colors['card'])
+        record_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        record_var = tk.BooleanVar(value=self.record_sessions)
+        tk.Checkbutton(record_frame, text=f"Record sessions to ./{DEFAULT_SESSION_DIR}", variable=record_var,
+                       font=('Segoe UI', 10), fg=self.colors['text'], bg=self.colors['card'],
+                       selectcolor=self.colors['surface'], activebackground=self.colors['card'],
+                       highlightthickness=0).pack(side='left')
+        
+        clips_frame = tk.Frame(camera_frame, bg=self.colors['card'])
+        clips_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        clips_var = tk.BooleanVar(value=self.save_clips)
+        tk.Checkbutton(clips_frame, text=f"Save 10 s before/after each alert to ./{DEFAULT_CLIP_DIR}",
+                       variable=clips_var, font=('Segoe UI', 10), fg=self.colors['text'], bg=self.colors['card'],
+                       selectcolor=self.colors['surface'], activebackground=self.colors['card'],
+                       highlightthickness=0).pack(side='left')
+        
+        # Fatigue score alert
+        fatigue_frame = tk.Frame(detection_frame, bg=self.colors['card'])
+        fatigue_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(fatigue_frame, text="Fatigue Score Alert (0 = off):", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
+        fatigue_var = tk.StringVar(value=f"{self.engine.fatigue_threshold:g}")
+        fatigue_combo = ttk.Combobox(fatigue_frame, textvariable=fatigue_var, values=("0", "50", "60", "70", "80"),
+                                     width=14)
+        fatigue_combo.pack(side='right')
+        
+        # Display rate cap
+        display_frame = tk.Frame(camera_frame, bg=self.colors['card'])
+        display_frame.pack(fill='x', padx=15, pady=(0, 15))
+        
+        tk.Label(display_frame, text="Display FPS:", font=('Segoe UI', 10), 
+                fg=self.colors['text'], bg=self.colors['card']).pack(side='left')
+        display_var = tk.StringVar(value=str(self.display_fps))
+        display_combo = ttk.Combobox(display_frame, textvariable=display_var, values=("10", "15", "24", "30", "60"),
+                                     width=14)
+        display_combo.pack(side='right')
         
         def apply_settings():
+            # Parse and validate every field first, so a bad one changes nothing
             try:
-                self.EAR_THRESHOLD = ear_scale.get()
-                self.CONSEC_FRAMES = frames_scale.get()
-                self.camera_index = int(cam_var.get())
-                messagebox.showinfo("Settings", "Settings applied successfully!")
-                settings_window.destroy()
+                process_width = int(width_var.get())
+                fatigue_threshold = float(fatigue_var.get())
+                passenger_interval = max(int(passenger_var.get()), 0)
+                change_threshold = max(float(gate_var.get()), 0.0)
+                max_skip = max(int(max_skip_var.get()) - 1, 0)
+                camera_sources = parse_sources(cam_var.get())
+                display_fps = int(display_var.get())
+                if display_fps <= 0:
+                    raise ValueError(display_fps)
+                resolution = resolution_var.get().strip().lower()
+                width, height = (0, 0) if resolution == "default" else map(int, resolution.split("x"))
+                camera_fps = float(camera_fps_var.get())
+                if width < 0 or height < 0 or camera_fps < 0:
+                    raise ValueError(resolution)
+                budget = float(budget_var.get())
+                if budget < 0:
+                    raise ValueError(budget)
             except ValueError:
-                messagebox.showerror("Error", "Please enter a valid camera index!")
+                messagebox.showerror("Error", "Please enter valid camera indices/URLs, camera resolution and FPS, detection width, passenger interval, skip settings, fatigue score, latency budget and display FPS!")
+                return
+
+            self.engine.configure(ear_threshold=ear_scale.get(),
+                                  alert_seconds=closure_scale.get(),
+                                  detect_interval=interval_scale.get(),
+                                  redetect_policy=policy_var.get(),
+                                  process_width=process_width,
+                                  fatigue_threshold=fatigue_threshold,
+                                  detector_backend=detector_var.get(),
+                                  landmark_backend=landmarks_var.get(),
+                                  driver_policy=driver_var.get(),
+                                  passenger_interval=passenger_interval,
+                                  change_threshold=change_threshold,
+                                  max_skip=max_skip)
+            self.threshold_label.config(text=f"Threshold: {self.engine.ear_threshold}")
+            self.camera_sources = camera_sources
+            self.display_fps = display_fps
+            fourcc = "" if fourcc_var.get() == "default" else fourcc_var.get()
+            self.capture_settings = {'width': width, 'height': height, 'fps': camera_fps, 'fourcc': fourcc}
+            self.record_sessions = record_var.get()
+            self.save_clips = clips_var.get()
+            if not budget:
+                self.governor = None
+            elif self.governor:
+                self.governor.budget = budget / 1000.0
+            else:
+                self.governor = QualityGovernor(budget / 1000.0)
+            self.profiler.enabled = profile_var.get()
+            if not self.profiler.enabled:
+                self.profiler.reset()
+                self.stages_var.set("")
+
+            try:
+                self.engine.load()
+            except RuntimeError as e:
+                self.start_btn["state"] = "disabled"
+                messagebox.showerror("Error", f"Cannot load detection model: {e}")
+                return
+            self.load_error = None
+            self.start_btn["state"] = "normal"
+            self.status_var.set("Ready to start monitoring")
+            messagebox.showinfo("Settings", "Settings applied successfully!")
+            settings_window.destroy()
         
         def reset_settings():
-            ear_scale.set(0.25)
-            frames_scale.set(20)
+            ear_scale.set(DEFAULT_EAR_THRESHOLD)
+            closure_scale.set(DEFAULT_ALERT_SECONDS)
+            interval_scale.set(DEFAULT_DETECT_INTERVAL)
+            policy_var.set(DEFAULT_REDETECT_POLICY)
+            width_var.set(str(DEFAULT_PROCESS_WIDTH))
+            fatigue_var.set(str(DEFAULT_FATIGUE_THRESHOLD))
+            detector_var.set(DEFAULT_DETECTOR)
+            landmarks_var.set(DEFAULT_LANDMARKS)
+            driver_var.set(DEFAULT_DRIVER_POLICY)
+            passenger_var.set(str(DEFAULT_PASSENGER_INTERVAL))
+            gate_var.set(f"{DEFAULT_CHANGE_THRESHOLD:g}")
+            max_skip_var.set(str(DEFAULT_MAX_SKIP + 1))
             cam_var.set("0")
+            resolution_var.set("default")
+            camera_fps_var.set("0")
+            fourcc_var.set("default")
+            display_var.set(str(DEFAULT_DISPLAY_FPS))
+            profile_var.set(True)
+            budget_var.set(f"{DEFAULT_BUDGET * 1000:.0f}")
+            record_var.set(True)
+            clips_var.set(True)
         
         tk.Button(btn_frame, text="Apply", command=apply_settings, 
                  bg=self.colors['success'], fg='white', font=('Segoe UI', 11, 'bold'),
@@ -455,48 +901,82 @@ class FatigueMonitorApp:
             seconds = int(elapsed % 60)
             self.time_var.set(f"{hours:02d}:{minutes:02d}:{seconds:02d}")
             
-            # Update drowsiness percentage
-            if self.total_frames > 0:
-                drowsy_percent = (self.drowsy_frames / self.total_frames) * 100
+            # Update drowsiness percentage (over all cameras)
+            engines = [stream.engine for stream in self.monitor.streams] if self.monitor else []
+            total_frames = sum(engine.total_frames for engine in engines)
+            if total_frames > 0:
+                drowsy_percent = sum(engine.drowsy_frames for engine in engines) / total_frames * 100
                 self.drowsy_percent_var.set(f"{drowsy_percent:.1f}%")
+                skipped_percent = sum(engine.skipped_frames for engine in engines) / total_frames * 100
+                self.skipped_percent_var.set(f"{skipped_percent:.1f}%")
+            
+            if self.alarm and self.alarm.last_latency is not None:
+                self.alarm_latency_var.set(f"{self.alarm.last_latency * 1000:.0f} ms")
+            
+            if self.profiler.enabled:
+                self.stages_var.set(self.profiler.format_table())
+            
+            if self.governor:
+                self.show_quality(self.governor.level)
+            
+            self.show_camera_status()
         
         self.root.after(1000, self.update_time)
 
     def start_monitoring(self):
         """Start the monitoring process"""
-        self.cap = cv2.VideoCapture(self.camera_index)
-        if not self.cap.isOpened():
+        from multicam import MultiCameraMonitor
+        self.monitor = MultiCameraMonitor(self.camera_sources, self.engine, render=self.render_frame,
+                                          render_fps=self.display_fps,
+                                          record_dir=DEFAULT_SESSION_DIR if self.record_sessions else None,
+                                          clip_dir=DEFAULT_CLIP_DIR if self.save_clips else None,
+                                          governor=self.governor, capture_settings=self.capture_settings,
+                                          processes=self.processes)
+        self.monitor.add_listener(self.on_engine_event)
+        if self.telemetry:
+            from telemetry import attach
+            attach(self.monitor, self.telemetry)
+        failed = self.monitor.start()
+        if len(failed) == len(self.camera_sources):
+            self.monitor.stop()
+            self.monitor = None
             messagebox.showerror("Error", "Cannot access camera!")
             return
+        if failed:
+            messagebox.showwarning("Warning", "Cannot access camera(s): " + ", ".join(map(str, failed)))
         
         self.monitoring = True
         self.start_time = time.time()
-        self.total_frames = 0
-        self.drowsy_frames = 0
-        self.blink_count = 0
-        self.last_fps_time = time.time()
-        self.fps_counter = 0
+        self.tiles = [None] * len(self.monitor.streams)
+        self.update_tile_size()
+        self.show_quality(QUALITY_LEVELS[0])
         
         # Update UI
         self.start_btn["state"] = "disabled"
         self.stop_btn["state"] = "normal"
         self.settings_btn["state"] = "disabled"
         self.session_status.config(text="▶️ Session Status: Active", fg=self.colors['success'])
-        self.camera_status.config(text="📷 Camera: Connected", fg=self.colors['success'])
+        self.show_camera_status()
         self.status_var.set("🟢 Monitoring active - AI is watching for drowsiness")
         
-        self.video_loop()
+        self.poll_pipeline()
 
     def stop_monitoring(self):
         """Stop the monitoring process"""
         self.monitoring = False
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        if self.monitor:
+            if self.telemetry:
+                from telemetry import detach
+                detach(self.monitor, self.telemetry)
+            self.monitor.stop()
+            self.monitor = None
+        self.tiles = []
+        self.mosaic = None
+        if self.alarm:
+            self.alarm.stop()
         
         # Reset UI
-        self.video_label.config(image="", text="Camera Feed\nWill Appear Here", 
-                               fg='white', bg='black')
+        self.video_surface.clear(text="Camera Feed\nWill Appear Here", fg='white', bg='black')
         self.start_btn["state"] = "normal"
         self.stop_btn["state"] = "disabled"
         self.settings_btn["state"] = "normal"
@@ -506,125 +986,207 @@ class FatigueMonitorApp:
         self.ear_var.set("--")
         self.fps_var.set("0")
         self.drowsy_progress['value'] = 0
-        self.counter = 0
-        self.alarm_on = False
+        self.fatigue_progress['value'] = 0
+        for var in self.fatigue_vars.values():
+            var.set("--")
 
     def on_close(self):
         """Handle window close event"""
         self.stop_monitoring()
+        if self.alarm:
+            self.alarm.close()
         self.root.destroy()
 
-    def play_alarm(self):
-        """Play alarm sound"""
-        try:
-            sa.WaveObject.from_wave_file(self.alarm_wav).play()
-        except Exception as e:
-            print("Alarm error:", e)
-
-    @staticmethod
-    def calculate_EAR(eye):
-        """Calculate Eye Aspect Ratio"""
-        A = dist.euclidean(eye[1], eye[5])
-        B = dist.euclidean(eye[2], eye[4])
-        C = dist.euclidean(eye[0], eye[3])
-        return (A + B) / (2.0 * C)
-
-    def video_loop(self):
-        """Main video processing loop"""
-        if not self.monitoring:
+    def on_engine_event(self, stream, event):
+        """React to engine events (inference thread)"""
+        if not self.alarm:
             return
-        
-        ret, frame = self.cap.read()
-        if ret:
-            self.total_frames += 1
-            self.fps_counter += 1
-            
-            # Calculate FPS
-            current_time = time.time()
-            if current_time - self.last_fps_time >= 1.0:
-                self.fps_var.set(f"{self.fps_counter}")
-                self.fps_counter = 0
-                self.last_fps_time = current_time
-            
-            # Process frame
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.detector(gray, 0)
+        if event.kind == "alert":
+            self.alarm.alert(stream.name)
+        elif event.kind == "alert_cleared":
+            self.alarm.clear(stream.name)
+        elif event.kind == "fatigue":
+            self.alarm.alert((stream.name, "fatigue"))
+        elif event.kind == "fatigue_cleared":
+            self.alarm.clear((stream.name, "fatigue"))
+
+    def render_frame(self, stream, packet):
+        """Draw overlays and prepare the display tile for one stream (render thread)"""
+        import cv2
+        frame = packet.frame
+        result = packet.result
+
+        if result.drowsy:
+            # Draw warnings
+            cv2.putText(frame, "DROWSY!", (10, 30), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
+            cv2.putText(frame, "WAKE UP!", (10, 70), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+
+        # The load governor can turn the per-face overlays off; warnings stay
+        faces = result.faces if stream.quality.overlays else []
+        for face in faces:
+            # Passengers are drawn thin and grey; only the driver's EAR is shown
+            x, y, w, h = face.box
+            if not face.driver:
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (128, 128, 128), 1)
+                continue
+
+            # Draw eye contours
+            cv2.drawContours(frame, [cv2.convexHull(face.left_eye)], -1, (0, 255, 0), 1)
+            cv2.drawContours(frame, [cv2.convexHull(face.right_eye)], -1, (0, 255, 0), 1)
             
-            if faces:
-                for face in faces:
-                    shape = self.predictor(gray, face)
-                    shape = face_utils.shape_to_np(shape)
-                    left_eye = shape[self.lStart:self.lEnd]
-                    right_eye = shape[self.rStart:self.rEnd]
-                    ear = (self.calculate_EAR(left_eye) + self.calculate_EAR(right_eye)) / 2.0
-                    
-                    # Update EAR display
-                    self.ear_var.set(f"{ear:.3f}")
-                    
-                    # Blink detection
-                    if ear < self.EAR_THRESHOLD:
-                        self.counter += 1
-                        self.drowsy_frames += 1
-                    else:
-                        if self.counter > 0:
-                            self.blink_count += 1
-                            self.blink_var.set(f"{self.blink_count}")
-                        self.counter = 0
-                        self.alarm_on = False
-                    
-                    # Update progress bar
-                    progress = min((self.counter / self.CONSEC_FRAMES) * 100, 100)
-                    self.drowsy_progress['value'] = progress
-                    
-                    # Drowsiness detection
-                    if self.counter >= self.CONSEC_FRAMES:
-                        if not self.alarm_on:
-                            self.alerts += 1
-                            self.alert_var.set(f"{self.alerts}")
-                            self.alarm_on = True
-                            self.status_var.set("🚨 DROWSINESS DETECTED! Wake up!")
-                            threading.Thread(target=self.play_alarm, daemon=True).start()
-                        
-                        # Draw warnings
-                        cv2.putText(frame, "DROWSY!", (10, 30), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
-                        cv2.putText(frame, "WAKE UP!", (10, 70), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-                    else:
-                        if self.alarm_on:
-                            self.status_var.set("🟢 Monitoring active - AI is watching for drowsiness")
-                    
-                    # Draw eye contours
-                    cv2.drawContours(frame, [cv2.convexHull(left_eye)], -1, (0, 255, 0), 1)
-                    cv2.drawContours(frame, [cv2.convexHull(right_eye)], -1, (0, 255, 0), 1)
-                    
-                    # Draw face rectangle
-                    x, y, w, h = face.left(), face.top(), face.width(), face.height()
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
-                    
-                    # Draw EAR value on frame
-                    cv2.putText(frame, f"EAR: {ear:.3f}", (10, frame.shape[0] - 10), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            else:
-                self.ear_var.set("No Face")
-                self.drowsy_progress['value'] = 0
+            # Draw face rectangle
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
             
-            # Update video display
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(rgb)
-            # Resize to fit the display area
-            display_width = self.video_label.winfo_width()
-            display_height = self.video_label.winfo_height()
-            if display_width > 1 and display_height > 1:
-                img = img.resize((display_width-4, display_height-4), Image.Resampling.LANCZOS)
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.video_label.imgtk = imgtk
-            self.video_label.configure(image=imgtk, text="")
+            # Draw EAR value on frame
+            cv2.putText(frame, f"EAR: {face.ear:.3f}", (10, frame.shape[0] - 10), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+        if len(self.camera_sources) > 1:
+            # Label each tile with its camera
+            cv2.putText(frame, stream.name, (10, frame.shape[0] - 40), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+        # Resize first so the colour conversion only touches the tile's pixels
+        return cv2.cvtColor(fit_frame(frame, self.tile_size), cv2.COLOR_BGR2RGB)
+
+    def update_metrics(self, result):
+        """Reflect the latest inference result in the statistics panel"""
+        if result.ear is not None:
+            self.ear_var.set(f"{result.ear:.3f}")
+            self.drowsy_progress['value'] = result.progress
+        else:
+            self.ear_var.set("No Face")
+            self.drowsy_progress['value'] = 0
+
+        self.blink_var.set(f"{result.blinks}")
+        self.alert_var.set(f"{result.alerts}")
+        self.fatigue_vars['perclos'].set(f"{result.perclos * 100:.1f}%")
+        self.fatigue_vars['blink_rate'].set(f"{result.blink_rate:.1f}")
+        self.fatigue_vars['mean_blink'].set(f"{result.mean_blink * 1000:.0f} ms")
+        self.fatigue_vars['max_blink'].set(f"{result.max_blink * 1000:.0f} ms")
+        self.fatigue_vars['ear_trend'].set(f"{result.ear_trend:+.3f}/min")
+        self.fatigue_vars['fatigue'].set(f"{result.fatigue:.0f}")
+        self.fatigue_progress['value'] = result.fatigue
+        if result.alarm_on:
+            self.status_var.set("🚨 DROWSINESS DETECTED! Wake up!")
+        elif result.fatigue_alarm:
+            self.status_var.set("😴 High fatigue score - consider taking a break")
+        else:
+            self.status_var.set("🟢 Monitoring active - AI is watching for drowsiness")
 
-        self.root.after(10, self.video_loop)
+    def compose_tiles(self):
+        """Arrange the latest tile of every stream in a grid"""
+        import cv2
+        import numpy as np
+        tiles = [tile for tile in self.tiles if tile is not None]
+        if len(self.tiles) == 1 or not tiles:
+            return tiles[0] if tiles else None
+
+        rows, cols = grid_shape(len(self.tiles))
+        tile_height, tile_width = tiles[0].shape[:2]
+        shape = (rows * tile_height, cols * tile_width, 3)
+        # Reuse the mosaic buffer while the tile size is unchanged
+        if self.mosaic is None or self.mosaic.shape != shape:
+            self.mosaic = np.zeros(shape, dtype=np.uint8)
+        mosaic = self.mosaic
+        for i, tile in enumerate(self.tiles):
+            if tile is None:
+                continue
+            if tile.shape[:2] != (tile_height, tile_width):
+                tile = cv2.resize(tile, (tile_width, tile_height))
+            row, col = divmod(i, cols)
+            mosaic[row * tile_height:(row + 1) * tile_height, col * tile_width:(col + 1) * tile_width] = tile
+        return mosaic
+
+    def poll_pipeline(self):
+        """Pull the latest rendered frames and metrics into the UI (Tk thread)"""
+        if not self.monitoring or not self.monitor:
+            return
+
+        # Show the stats of the first camera that is alarming, else the first camera
+        streams = self.monitor.running_streams
+        results = [stream.latest_result for stream in streams if stream.latest_result is not None]
+        if results:
+            self.update_metrics(next((r for r in results if r.alarm_on), results[0]))
+        if streams:
+            self.fps_var.set(f"{sum(stream.fps for stream in streams) / len(streams):.0f}")
+
+        # Update video display
+        packets = []
+        for i, stream in enumerate(self.monitor.streams):
+            packet = stream.pipeline.latest_frame() if stream.pipeline else None
+            if packet is not None:
+                self.tiles[i] = packet.image
+                packets.append(packet)
+        if packets:
+            start = time.perf_counter()
+            self.video_surface.show(self.compose_tiles())
+            self.profiler.record("display", time.perf_counter() - start)
+            # Capture-to-screen age of every frame shown
+            now = time.monotonic()
+            for packet in packets:
+                self.profiler.record("latency", now - packet.timestamp)
+
+        display_fps = self.display_fps * (self.governor.level.display_scale if self.governor else 1.0)
+        self.root.after(max(int(1000 / display_fps), 5), self.poll_pipeline)
+
+    def show_quality(self, level):
+        """Reflect the load governor's quality level in the performance card (Tk thread)"""
+        self.quality_var.set(level.name)
+        self.quality_label.config(fg=self.colors['success'] if level == QUALITY_LEVELS[0] else self.colors['warning'])
+
+    def show_camera_status(self):
+        """Connected camera count, or a warning while any camera is reconnecting (Tk thread)"""
+        streams = self.monitor.running_streams if self.monitor else []
+        if any(not stream.connected for stream in streams):
+            self.camera_status.config(text="📷 Camera: Reconnecting...", fg=self.colors['warning'])
+            return
+        connected = len(streams)
+        self.camera_status.config(text=f"📷 Camera: Connected ({connected})" if connected > 1 else "📷 Camera: Connected",
+                                  fg=self.colors['success'])
+
+    def update_tile_size(self):
+        """Recompute the per-stream tile size from the cached video area (Tk thread)"""
+        rows, cols = grid_shape(len(self.tiles) or 1)
+        width, height = self.video_surface.size
+        self.tile_size = (width // cols, height // rows)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fatigue Monitor Pro")
+    parser.add_argument('--camera', type=int, default=0)
+    parser.add_argument('--metrics', help='append per-stage latency percentiles to this JSONL file')
+    parser.add_argument('--metrics-interval', type=float, default=10.0)
+    parser.add_argument('--metrics-port', type=int, help='serve Prometheus text metrics on this port')
+    parser.add_argument('--startup-log', help='append startup phase timings to this JSONL file')
+    parser.add_argument('--exit-after-startup', action='store_true',
+                        help='quit as soon as the models are loaded (startup measurements)')
+    parser.add_argument('--telemetry', metavar='URL',
+                        help='stream events and summaries to a collector (http://, udp://, tcp:// or unix://)')
+    parser.add_argument('--telemetry-buffer', default="telemetry_buffer",
+                        help='directory buffering telemetry while the collector is unreachable')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='detect on N worker processes, consecutive frames in parallel (0 = off)')
+    args = parser.parse_args()
+
+    profiler = StageProfiler()
+    exporter = MetricsExporter(profiler, args.metrics, args.metrics_interval).start() if args.metrics else None
+    server = serve_metrics(profiler, args.metrics_port) if args.metrics_port else None
+    telemetry = None
+    if args.telemetry:
+        from telemetry import TelemetryPublisher
+        telemetry = TelemetryPublisher(args.telemetry, buffer_dir=args.telemetry_buffer).start()
+
     root = tk.Tk()
-    app = FatigueMonitorApp(root, camera_index=0)
+    app = FatigueMonitorApp(root, camera_index=args.camera, profiler=profiler, startup_log=args.startup_log,
+                            exit_after_startup=args.exit_after_startup, telemetry=telemetry,
+                            processes=args.processes)
     root.mainloop()
+    if telemetry:
+        telemetry.stop()
+    if exporter:
+        exporter.stop()
+    if server:
+        server.shutdown()
@@ -0,0 +1,137 @@
+"""Per-stage latency instrumentation
+
+Every pipeline stage (capture, waiting for a frame, face detection,
+landmark prediction, drawing, display) reports its duration, measured with ``perf_counter``, to
+a StageProfiler. The profiler keeps a rolling window per stage and reports
+p50/p95/p99 on demand, so recording is a deque append and the percentile
+work happens only when somebody looks. A disabled profiler returns from
+``record`` immediately.
+
+Snapshots can be appended to a JSONL file periodically (MetricsExporter)
+or scraped from a Prometheus-style text endpoint (serve_metrics).
+"""
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Display order of the known stages; unknown stages are listed after these
+STAGES = ("capture", "wait", "detect", "landmarks", "scoring", "draw", "display", "latency")
+PERCENTILES = (50, 95, 99)
+
+
+class StageProfiler:
+    """Rolling per-stage latency percentiles"""
+
+    def __init__(self, window: int = 300, enabled: bool = True):
+        self.window = window
+        self.enabled = enabled
+        self.samples = {}
+
+    def record(self, stage, seconds):
+        """Add one duration (seconds) for stage"""
+        if not self.enabled:
+            return
+        samples = self.samples.get(stage)
+        if samples is None:
+            samples = self.samples.setdefault(stage, deque(maxlen=self.window))
+        samples.append(seconds)
+
+    def reset(self):
+        self.samples = {}
+
+    def stages(self):
+        """Stages with samples, known stages first"""
+        names = list(self.samples)
+        return sorted(names, key=lambda name: (STAGES.index(name) if name in STAGES else len(STAGES), name))
+
+    def snapshot(self):
+        """{stage: {'count', 'p50', 'p95', 'p99'}} in milliseconds"""
+        # Imported here so the GUI can create its profiler before NumPy loads
+        import numpy as np
+        report = {}
+        for stage in self.stages():
+            # deque.copy() is atomic, so recording threads never see a torn read
+            values = np.array(self.samples[stage].copy(), dtype=np.float64)
+            if not len(values):
+                continue
+            p = np.percentile(values, PERCENTILES) * 1000.0
+            report[stage] = {'count': len(values),
+                             **{f"p{q}": float(v) for q, v in zip(PERCENTILES, p)}}
+        return report
+
+    def format_table(self):
+        """Compact text table of the snapshot, one line per stage"""
+        lines = [f"{'stage':<10}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for stage, row in self.snapshot().items():
+            lines.append(f"{stage:<10}{row['p50']:7.1f}{row['p95']:7.1f}{row['p99']:7.1f}")
+        return "\n".join(lines)
+
+    def prometheus(self, prefix: str = "fatigue_stage_latency"):
+        """Snapshot in the Prometheus text exposition format (summary, seconds)"""
+        lines = [f"# TYPE {prefix}_seconds summary"]
+        for stage, row in self.snapshot().items():
+            for q in PERCENTILES:
+                lines.append(f'{prefix}_seconds{{stage="{stage}",quantile="{q / 100}"}} '
+                             f"{row[f'p{q}'] / 1000.0:.6f}")
+            lines.append(f'{prefix}_seconds_count{{stage="{stage}"}} {row["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Append a profiler snapshot to a JSONL file every interval seconds"""
+
+    def __init__(self, profiler, path, interval: float = 10.0):
+        self.profiler = profiler
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="metrics", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        self.thread.join(timeout)
+
+    def write(self):
+        record = {'time': time.time(), 'stages': self.profiler.snapshot()}
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print("Metrics export error:", e)
+
+
+# Shared do-nothing profiler for components created without one
+NULL_PROFILER = StageProfiler(enabled=False)
+
+
+def serve_metrics(profiler, port: int = 9100, host: str = "127.0.0.1"):
+    """Serve GET /metrics (Prometheus text) from a daemon thread; returns the server"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = profiler.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,295 @@
+"""Monitor several cameras or stream URLs from one process
+
+All streams share one copy of the face models (via FatigueEngine.clone).
+Every stream keeps its own capture, pipeline and EAR/alert state and runs
+inference on its pipeline's inference thread; a semaphore sized to the
+available cores bounds how many streams infer at once. Adding a camera
+costs a capture buffer and a little bookkeeping rather than another model
+copy.
+
+With ``processes``, detection instead runs on a pool of worker processes
+that spreads consecutive frames of every stream over the cores (see
+parallel.py), for streams one core cannot keep up with.
+
+    python multicam.py 0 1 rtsp://cab-3/stream --metrics metrics.jsonl --metrics-port 9100
+"""
+import argparse
+import os
+import threading
+import time
+
+from backends import DEFAULT_DETECTOR, DEFAULT_LANDMARKS, DETECTORS, LANDMARK_MODELS
+from capture import CameraCapture
+from clips import AlertClipRecorder
+from driver import DEFAULT_DRIVER_POLICY, DEFAULT_SEAT_REGION, DRIVER_POLICIES
+from engine import FatigueEngine
+from gating import DEFAULT_CHANGE_THRESHOLD, DEFAULT_MAX_SKIP
+from governor import QUALITY_LEVELS, QualityGovernor
+from metrics import MetricsExporter, StageProfiler, serve_metrics
+from parallel import DEPTH_PER_WORKER, ParallelInference, create_pool
+from pipeline import FramePipeline
+from recorder import SessionRecorder, session_name
+from telemetry import DEFAULT_BUFFER_DIR, DEFAULT_SUMMARY_INTERVAL, TelemetryPublisher, attach
+
+
+def parse_sources(text):
+    """Parse "0, 1, rtsp://..." into camera indices and URLs"""
+    sources = []
+    for item in text.split(","):
+        item = item.strip()
+        if item:
+            sources.append(int(item) if item.isdigit() else item)
+    if not sources:
+        raise ValueError("No camera sources given")
+    return sources
+
+
+class CameraStream:
+    """One camera or stream URL with its own engine state and pipeline"""
+
+    def __init__(self, source, engine, render=None, render_fps: float = 0.0, governor=None,
+                 capture_settings=None, capture_factory=CameraCapture):
+        self.source = source
+        self.name = f"Camera {source}" if isinstance(source, int) else str(source)
+        self.engine = engine
+        self.render = render
+        self.render_fps = render_fps
+        self.governor = governor
+        self.capture_settings = capture_settings or {}
+        # Called as capture_factory(source, profiler=..., **capture_settings); a CameraCapture by default
+        self.capture_factory = capture_factory
+        self.quality = QUALITY_LEVELS[0]
+        self.base_settings = None
+        self.slots = None
+        self.cap = None
+        self.pipeline = None
+        self.recorder = None
+        self.clips = None
+        self.parallel = None
+
+    @property
+    def latest_result(self):
+        return self.pipeline.latest_result if self.pipeline else None
+
+    @property
+    def fps(self):
+        return self.pipeline.fps if self.pipeline else 0.0
+
+    @property
+    def connected(self):
+        return self.cap is not None and self.cap.connected
+
+    @property
+    def running(self):
+        """Started and not yet at the end of its source"""
+        return self.pipeline is not None and not self.pipeline.finished
+
+    def start(self, slots, record_dir=None, clip_dir=None, process_pool=None, depth: int = 0):
+        """Open the source and start its pipeline; False if it cannot be opened
+
+        With record_dir, every frame result is persisted to a session
+        directory named after the stream inside it; with clip_dir, a video
+        clip around every alert is saved to such a directory. With
+        process_pool, up to depth frames at a time are detected on it.
+        slots is the semaphore shared by the streams that bounds concurrent
+        inference.
+        """
+        self.slots = slots
+        self.cap = self.capture_factory(self.source, profiler=self.engine.profiler, **self.capture_settings).start()
+        if self.cap is None:
+            return False
+        self.engine.reset()
+        self.quality = QUALITY_LEVELS[0]
+        self.base_settings = (self.engine.detect_interval, self.engine.process_width)
+        if record_dir:
+            self.recorder = SessionRecorder(os.path.join(record_dir, session_name(self.name)),
+                                            source=str(self.source))
+        if clip_dir:
+            self.clips = AlertClipRecorder(os.path.join(clip_dir, session_name(self.name)), source=str(self.source))
+        if process_pool:
+            self.parallel = ParallelInference(process_pool, self.engine, depth)
+        self.pipeline = FramePipeline(self.cap.read, self._process, self._render,
+                                      render_fps=self.render_fps, profiler=self.engine.profiler,
+                                      inference=self.parallel, source_ended=lambda: self.cap.ended)
+        self.pipeline.start()
+        return True
+
+    def stop(self):
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
+        if self.parallel:
+            self.parallel.close()
+            self.parallel = None
+        if self.cap:
+            self.cap.stop()
+            self.cap = None
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+        if self.clips:
+            self.clips.close()
+            self.clips = None
+        if self.quality != QUALITY_LEVELS[0]:
+            # Leave the engine at its configured quality
+            self._apply_quality(QUALITY_LEVELS[0])
+
+    def _process(self, packet):
+        if self.governor and self.governor.level != self.quality:
+            self._apply_quality(self.governor.level)
+        if packet.detections is not None:
+            # Detected on a worker process; only the state machine runs here
+            result = self.parallel.process(packet)
+        else:
+            # Serial mode, or the worker pool broke; the shared semaphore bounds how many frames are inferred at once
+            with self.slots:
+                result = self.engine.process(packet.frame, packet.timestamp)
+        if self.governor:
+            self.governor.observe(time.monotonic() - packet.timestamp)
+        if self.recorder:
+            self.recorder.record(result)
+        if self.clips:
+            self.clips.write(packet.frame, packet.timestamp, result)
+        return result
+
+    def _apply_quality(self, level):
+        """Switch this stream to a governor quality level (inference thread)"""
+        interval, width = self.base_settings
+        self.engine.configure(detect_interval=interval * level.interval_scale,
+                              process_width=level.process_width(width))
+        if self.pipeline:
+            self.pipeline.render_fps = self.render_fps * level.display_scale
+        self.quality = level
+
+    def _render(self, packet):
+        return self.render(self, packet) if self.render else None
+
+
+class MultiCameraMonitor:
+    """Run one CameraStream per source with shared models and an inference limit"""
+
+    def __init__(self, sources, engine=None, workers=None, render=None, render_fps: float = 0.0,
+                 record_dir=None, governor=None, capture_settings=None, clip_dir=None,
+                 processes: int = 0, depth: int = 0, capture_factory=CameraCapture):
+        # The template engine provides the shared models and the settings
+        self.engine = engine or FatigueEngine()
+        # Streams inferring at the same time
+        self.workers = workers or os.cpu_count() or 1
+        # Worker processes for frame-parallel detection (0 = detect on the inference threads)
+        self.processes = processes
+        self.depth = depth or DEPTH_PER_WORKER * processes
+        self.process_pool = None
+        # One governor for all streams: they compete for the same cores
+        self.governor = governor
+        self.streams = [CameraStream(source, self.engine.clone(), render, render_fps, governor, capture_settings,
+                                     capture_factory)
+                        for source in sources]
+        self.slots = None
+        self.record_dir = record_dir
+        self.session_dir = None
+        self.clip_dir = clip_dir
+
+    def add_listener(self, callback):
+        """Call callback(stream, event) for events from every stream"""
+        for stream in self.streams:
+            stream.engine.add_listener(lambda event, stream=stream: callback(stream, event))
+
+    def start(self):
+        """Start all streams; returns the sources that could not be opened"""
+        self.slots = threading.BoundedSemaphore(self.workers)
+        if self.processes and not self.process_pool:
+            self.process_pool = create_pool(self.engine, self.processes)
+        if self.governor:
+            self.governor.reset()
+        if self.record_dir:
+            self.session_dir = os.path.join(self.record_dir, time.strftime("%Y%m%d-%H%M%S"))
+        return [stream.source for stream in self.streams
+                if not stream.start(self.slots, self.session_dir, self.clip_dir, self.process_pool, self.depth)]
+
+    def stop(self):
+        for stream in self.streams:
+            stream.stop()
+        self.slots = None
+        if self.process_pool:
+            self.process_pool.shutdown(wait=True, cancel_futures=True)
+            self.process_pool = None
+
+    @property
+    def running_streams(self):
+        """Streams that were started and have not reached the end of their source"""
+        return [stream for stream in self.streams if stream.running]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sources', nargs='*', default=["0"])
+    parser.add_argument('--metrics', help='append per-stage latency percentiles to this JSONL file')
+    parser.add_argument('--metrics-interval', type=float, default=10.0)
+    parser.add_argument('--metrics-port', type=int, help='serve Prometheus text metrics on this port')
+    parser.add_argument('--record', metavar='DIR', help='persist every session under this directory')
+    parser.add_argument('--clips', metavar='DIR', help='save a video clip around every alert under this directory')
+    parser.add_argument('--detector', default=DEFAULT_DETECTOR, choices=tuple(DETECTORS))
+    parser.add_argument('--landmarks', default=DEFAULT_LANDMARKS, choices=tuple(LANDMARK_MODELS))
+    parser.add_argument('--driver-policy', default=DEFAULT_DRIVER_POLICY, choices=DRIVER_POLICIES,
+                        help='which face drives the alerts when several are visible')
+    parser.add_argument('--seat', type=float, nargs=4, default=DEFAULT_SEAT_REGION,
+                        metavar=('LEFT', 'TOP', 'RIGHT', 'BOTTOM'),
+                        help="driver's seat as fractions of the frame (seat policy)")
+    parser.add_argument('--passenger-interval', type=int, default=0,
+                        help='analyse passengers every N frames (0 = only on detection frames)')
+    parser.add_argument('--change-threshold', type=float, default=DEFAULT_CHANGE_THRESHOLD,
+                        help='reuse the last landmarks while the eye regions change less than this '
+                             '(mean grey levels, 0 = analyse every frame)')
+    parser.add_argument('--max-skip', type=int, default=DEFAULT_MAX_SKIP,
+                        help='frames in a row that may reuse the last landmarks')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='detect on N worker processes, frames of a stream in parallel (0 = off)')
+    parser.add_argument('--resolution', help='requested camera resolution, e.g. 1280x720')
+    parser.add_argument('--fps', type=float, default=0, help='requested camera frame rate')
+    parser.add_argument('--fourcc', default='', help='requested pixel format, e.g. MJPG')
+    parser.add_argument('--telemetry', metavar='URL',
+                        help='stream events and summaries to a collector (http://, udp://, tcp:// or unix://)')
+    parser.add_argument('--telemetry-buffer', default=DEFAULT_BUFFER_DIR,
+                        help='directory buffering telemetry while the collector is unreachable')
+    parser.add_argument('--summary-interval', type=float, default=DEFAULT_SUMMARY_INTERVAL,
+                        help='seconds between telemetry summaries of every stream')
+    parser.add_argument('--budget-ms', type=float, default=0,
+                        help='capture-to-result latency budget; degrade quality to meet it (0 = off)')
+    args = parser.parse_args()
+
+    profiler = StageProfiler(enabled=bool(args.metrics or args.metrics_port))
+    governor = QualityGovernor(args.budget_ms / 1000.0) if args.budget_ms else None
+    width, height = map(int, args.resolution.lower().split("x")) if args.resolution else (0, 0)
+    engine = FatigueEngine(detector_backend=args.detector, landmark_backend=args.landmarks,
+                           driver_policy=args.driver_policy, seat_region=args.seat,
+                           passenger_interval=args.passenger_interval, change_threshold=args.change_threshold,
+                           max_skip=args.max_skip, profiler=profiler)
+    monitor = MultiCameraMonitor(parse_sources(",".join(args.sources)), engine,
+                                 record_dir=args.record, clip_dir=args.clips, governor=governor,
+                                 processes=args.processes,
+                                 capture_settings={'width': width, 'height': height, 'fps': args.fps,
+                                                   'fourcc': args.fourcc})
+    monitor.add_listener(lambda stream, event: print(f"{stream.name}: {event.kind} {event.data}"))
+    telemetry = None
+    if args.telemetry:
+        telemetry = TelemetryPublisher(args.telemetry, buffer_dir=args.telemetry_buffer,
+                                       summary_interval=args.summary_interval).start()
+        attach(monitor, telemetry)
+    exporter = MetricsExporter(profiler, args.metrics, args.metrics_interval).start() if args.metrics else None
+    server = serve_metrics(profiler, args.metrics_port) if args.metrics_port else None
+    failed = monitor.start()
+    for source in failed:
+        print(f"Cannot access camera {source}")
+    try:
+        while monitor.running_streams:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.stop()
+        if telemetry:
+            telemetry.stop()
+        if exporter:
+            exporter.stop()
+        if server:
+            server.shutdown()
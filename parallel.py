@@ -0,0 +1,265 @@
+"""Frame-parallel inference for one stream on a pool of worker processes
+
+Detection and landmark prediction are the expensive, stateless part of a
+frame; the EAR/alert state machine is cheap but must see frames in order.
+ParallelInference therefore spreads consecutive frames of a stream over
+worker processes and runs the state machine on the stream's inference
+thread as results come back:
+
+    capture -> SharedFrameRing slot -> worker: detect + landmarks
+            -> reorder buffer (capture order) -> FatigueEngine.process_detections
+
+Frames travel through a ``multiprocessing.shared_memory`` ring: the capture
+side copies each frame into a free slot and only the block name, slot index
+and shape are pickled; workers read the slot in place. The ring has one slot
+per frame in flight (``depth``, default two per worker), so at most
+``depth`` frames wait for inference and the added latency is bounded.
+Workers always run a full detection (the every_frame policy: a worker cannot
+track a face it did not see on the previous frame), so results are the same
+as serial every_frame processing, frame for frame.
+
+If a worker dies (out of memory, a crash in dlib) the pool is broken for
+good: the stream then logs a warning and analyses its frames on its own
+inference thread, including those that were in flight, until it is
+restarted with a fresh pool.
+
+    python multicam.py 0 --processes 6
+"""
+import multiprocessing
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import dlib
+import numpy as np
+
+DEPTH_PER_WORKER = 2
+MAX_ATTACHED = 16  # rings a worker keeps mapped (several streams share a pool)
+
+
+class SharedFrameRing:
+    """One slot per in-flight frame of one shape, in a shared memory block"""
+
+    def __init__(self, shape, slots: int):
+        self.shape = tuple(shape)
+        self.slots = slots
+        size = int(np.prod(self.shape))
+        self.shm = shared_memory.SharedMemory(create=True, size=size * slots)
+        self.frames = np.ndarray((slots, *self.shape), dtype=np.uint8, buffer=self.shm.buf)
+        self.free = list(range(slots))
+        self.retired = False
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def put(self, frame):
+        """Copy a frame into a free slot and return the slot index"""
+        slot = self.free.pop()
+        np.copyto(self.frames[slot], frame)
+        return slot
+
+    def release(self, slot):
+        """Return a slot once its worker is done; a retired ring closes when all are back"""
+        self.free.append(slot)
+        if self.retired and len(self.free) == self.slots:
+            self.close()
+
+    def retire(self):
+        """Stop using this ring (the frame size changed); close it once it is drained"""
+        self.retired = True
+        if len(self.free) == self.slots:
+            self.close()
+
+    def close(self):
+        if self.frames is None:
+            return
+        # The block cannot be closed while a NumPy view of it exists
+        self.frames = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class _Timings:
+    """Profiler stand-in collecting one frame's stage times inside a worker"""
+
+    def __init__(self):
+        self.stages = []
+
+    def record(self, stage, seconds):
+        self.stages.append((stage, seconds))
+
+
+_engine = None
+_timings = _Timings()
+_attached = OrderedDict()  # shared memory name -> SharedMemory, in this worker
+
+
+def _init_worker(model_path, settings):
+    global _engine
+    import cv2
+    from engine import FatigueEngine
+    cv2.setNumThreads(1)
+    _engine = FatigueEngine(model_path, profiler=_timings, **settings)
+    _engine.load()
+
+
+def _ready(_):
+    return os.getpid()
+
+
+def create_pool(engine, workers: int):
+    """Process pool whose workers load the models of a template engine
+
+    Workers are spawned, not forked, because capture, telemetry and GUI
+    threads may already be running; all of them are started (and have
+    loaded their models) before this returns.
+    """
+    settings = {key: engine.settings()[key] for key in ('detector_backend', 'landmark_backend', 'process_width')}
+    pool = ProcessPoolExecutor(workers, multiprocessing.get_context("spawn"), initializer=_init_worker,
+                               initargs=(getattr(engine.predictor, 'path', None), settings))
+    list(pool.map(_ready, range(workers)))
+    return pool
+
+
+def _attach(name):
+    shm = _attached.get(name)
+    if shm is None:
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = shm
+        while len(_attached) > MAX_ATTACHED:
+            _attached.popitem(last=False)[1].close()
+    else:
+        _attached.move_to_end(name)
+    return shm
+
+
+def detect_frame(name, slot, frame_shape, process_width):
+    """Faces of one ring slot as [((left, top, right, bottom), landmarks)]; runs in a worker
+
+    Also returns the detector and per-face predictor seconds, which the
+    parent reports to its own profiler.
+    """
+    import cv2
+    shm = _attach(name)
+    size = int(np.prod(frame_shape))
+    frame = np.ndarray(frame_shape, dtype=np.uint8, buffer=shm.buf, offset=slot * size)
+    # Grayscale conversion reads the slot in place; the slot is not reused until this returns
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    tracker = _engine.tracker
+    tracker.process_width = process_width
+    _timings.stages = []
+    faces = [((rect.left(), rect.top(), rect.right(), rect.bottom()), shape)
+             for rect, shape in tracker.detect_faces(gray)]
+    return faces, _timings.stages
+
+
+class ParallelInference:
+    """Keep up to ``depth`` frames of one stream in flight on a process pool
+
+    ``submit`` copies a packet's frame into the shared ring and queues it;
+    ``collect`` returns packets strictly in submission order, with
+    ``packet.detections`` set, once their worker has finished. Only the
+    stream's inference thread may call them. Once the pool is broken,
+    packets come back with ``detections`` None and ``process`` runs the
+    whole engine on them.
+    """
+
+    def __init__(self, pool, engine, depth: int, profiler=None):
+        self.pool = pool
+        self.engine = engine
+        self.depth = depth
+        self.profiler = profiler or engine.profiler
+        self.ring = None
+        self.in_flight = deque()  # (packet, ring, slot, future), oldest first; future None: not sent
+        self.broken = False
+
+    @property
+    def full(self):
+        return len(self.in_flight) >= self.depth
+
+    @property
+    def pending(self):
+        return len(self.in_flight)
+
+    def submit(self, packet):
+        """Send a packet's frame to a worker (never blocks; check ``full`` first)"""
+        if self.broken:
+            self.in_flight.append((packet, None, None, None))
+            return
+        frame = packet.frame
+        if self.ring is None or self.ring.shape != frame.shape:
+            if self.ring:
+                self.ring.retire()
+            self.ring = SharedFrameRing(frame.shape, self.depth)
+        ring = self.ring
+        slot = ring.put(frame)
+        try:
+            future = self.pool.submit(detect_frame, ring.name, slot, frame.shape, self.engine.process_width)
+        except BrokenProcessPool as e:
+            ring.release(slot)
+            self._fail(e)
+            self.in_flight.append((packet, None, None, None))
+            return
+        except Exception:
+            ring.release(slot)
+            raise
+        self.in_flight.append((packet, ring, slot, future))
+
+    def collect(self, timeout: float = 0.0):
+        """The oldest packet once its faces are back, else None after timeout seconds
+
+        A frame whose worker failed is dropped and its error raised; if the
+        pool broke, the frame is returned without detections instead.
+        """
+        if not self.in_flight:
+            return None
+        packet, ring, slot, future = self.in_flight[0]
+        if future is None:
+            self.in_flight.popleft()
+            return packet
+        try:
+            faces, timings = future.result(timeout)
+        except FutureTimeout:
+            return None
+        except BrokenProcessPool as e:
+            self._fail(e)
+            return packet
+        finally:
+            if future.done():
+                self.in_flight.popleft()
+                ring.release(slot)
+        for stage, seconds in timings:
+            self.profiler.record(stage, seconds)
+        packet.detections = [(dlib.rectangle(*box), shape) for box, shape in faces]
+        return packet
+
+    def process(self, packet):
+        """Run the engine's state machine on a collected packet (the whole engine if not detected)"""
+        if packet.detections is None:
+            return self.engine.process(packet.frame, packet.timestamp)
+        height, width = packet.frame.shape[:2]
+        return self.engine.process_detections(packet.detections, (width, height), packet.timestamp)
+
+    def _fail(self, error):
+        """Stop using a broken pool; later frames are analysed on the calling thread"""
+        if self.broken:
+            return
+        self.broken = True
+        print("Worker process pool failed, detecting on the inference thread:", error)
+        if self.ring:
+            self.ring.retire()
+            self.ring = None
+
+    def close(self):
+        """Drop the frames still in flight and free the shared memory"""
+        for _, ring, slot, future in self.in_flight:
+            if future is not None:
+                future.cancel()
+                ring.release(slot)
+        self.in_flight.clear()
+        if self.ring:
+            self.ring.retire()
+            self.ring = None
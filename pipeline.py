@@ -0,0 +1,234 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from metrics import NULL_PROFILER
+
+
+class LatestQueue:
+    """Bounded queue that drops the oldest item instead of blocking the producer"""
+
+    def __init__(self, maxsize: int = 2):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        """Append an item, evicting the oldest one when full"""
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Pop the oldest item, waiting up to timeout seconds (None if still empty)"""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            return self._items.popleft() if self._items else None
+
+    def get_latest(self):
+        """Pop the newest item and discard anything older (None if empty)"""
+        with self._cond:
+            if not self._items:
+                return None
+            item = self._items.pop()
+            self.dropped += len(self._items)
+            self._items.clear()
+            return item
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+@dataclass
+class FramePacket:
+    """A captured frame travelling through the pipeline"""
+    index: int
+    timestamp: float
+    frame: object
+    result: object = None
+    image: object = None
+    detections: object = None  # faces found by a ParallelInference worker
+
+
+class FramePipeline:
+    """Capture, inference and render stages on separate threads
+
+    Stages are connected by small drop-oldest queues so a slow stage never
+    blocks the one before it. Consumers (e.g. the Tk main loop) only poll
+    ``latest_frame()`` and ``latest_result``. ``render_fps`` caps how often
+    the render stage runs (0 renders every processed frame); it skips to the
+    newest processed frame, so display cost never holds back inference.
+    The time ``read_frame`` blocks and render times are reported to
+    ``profiler`` as the "wait" and "draw" stages. Most of the wait is the
+    frame interval, so it is kept apart from the capture (decode) stage that
+    CameraCapture reports itself.
+
+    ``source_ended`` (optional) tells a failed read at the end of a video
+    file from a late frame; once it returns True the capture thread exits
+    and ``finished`` becomes True when every captured frame was processed.
+
+    With an ``inference`` stage (see parallel.ParallelInference) the
+    inference thread keeps several frames in flight on worker processes and
+    calls ``process`` on each, with ``packet.detections`` filled in, strictly
+    in capture order.
+    """
+
+    def __init__(self, read_frame, process, render, queue_size: int = 2, render_fps: float = 0.0,
+                 profiler=None, inference=None, source_ended=None):
+        self.read_frame = read_frame
+        self.process = process
+        self.render = render
+        self.captured = LatestQueue(queue_size)
+        self.processed = LatestQueue(queue_size)
+        self.rendered = LatestQueue(1)
+        self.render_fps = render_fps
+        self.profiler = profiler or NULL_PROFILER
+        self.inference = inference
+        self.source_ended = source_ended
+        self.capture_ended = False
+        self.finished = False
+        self.latest_result = None
+        self.fps = 0.0
+        self._frames = 0
+        self._last_fps_time = 0.0
+        self.running = False
+        self.threads = []
+
+    def start(self):
+        """Start all stage threads"""
+        self.running = True
+        self.capture_ended = False
+        self.finished = False
+        self._frames = 0
+        self._last_fps_time = time.monotonic()
+        inference_loop = self._parallel_loop if self.inference else self._inference_loop
+        self.threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=inference_loop, name="inference", daemon=True),
+            threading.Thread(target=self._render_loop, name="render", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """Stop all stages and wait for their threads to exit"""
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+        for queue in (self.captured, self.processed, self.rendered):
+            queue.clear()
+
+    def latest_frame(self):
+        """Return the newest rendered packet, or None if nothing new is ready"""
+        return self.rendered.get_latest()
+
+    def _capture_loop(self):
+        index = 0
+        while self.running:
+            start = time.perf_counter()
+            try:
+                # (ret, frame) like cv2.VideoCapture.read, or (ret, frame, capture timestamp)
+                item = self.read_frame()
+                ret, frame = item[:2]
+            except Exception as e:
+                print("Capture error:", e)
+                ret = False
+            if not ret:
+                if self.source_ended and self.source_ended():
+                    self.capture_ended = True
+                    return
+                time.sleep(0.01)
+                continue
+            self.profiler.record("wait", time.perf_counter() - start)
+            timestamp = item[2] if len(item) > 2 else time.monotonic()
+            self.captured.put(FramePacket(index, timestamp, frame))
+            index += 1
+
+    def _inference_loop(self):
+        while self.running:
+            packet = self.captured.get(timeout=0.1)
+            if packet is not None:
+                self._finish(packet)
+            elif self.capture_ended and not self.captured:
+                # capture_ended is set after the last put, so nothing more can arrive
+                self.finished = True
+                return
+
+    def _parallel_loop(self):
+        inference = self.inference
+        while self.running:
+            if self.capture_ended and not self.captured and not inference.pending:
+                self.finished = True
+                return
+            if inference.full:
+                wait = 0.1
+            else:
+                # Only a short wait while frames are in flight, so finished ones are not held up
+                packet = self.captured.get(timeout=0.005 if inference.pending else 0.1)
+                if packet is not None:
+                    try:
+                        inference.submit(packet)
+                    except Exception as e:
+                        print("Inference error:", e)
+                wait = 0.0
+            # The reorder buffer: hand on every finished frame, oldest first
+            while inference.pending:
+                try:
+                    packet = inference.collect(wait)
+                except Exception as e:
+                    print("Inference error:", e)
+                    continue
+                if packet is None:
+                    break
+                self._finish(packet)
+                wait = 0.0
+
+    def _finish(self, packet):
+        try:
+            packet.result = self.process(packet)
+        except Exception as e:
+            print("Inference error:", e)
+            return
+        self.latest_result = packet.result
+        self.processed.put(packet)
+
+        # Processing rate
+        self._frames += 1
+        now = time.monotonic()
+        if now - self._last_fps_time >= 1.0:
+            self.fps = self._frames / (now - self._last_fps_time)
+            self._frames = 0
+            self._last_fps_time = now
+
+    def _render_loop(self):
+        next_render = 0.0
+        while self.running:
+            if self.render_fps:
+                delay = next_render - time.monotonic()
+                if delay > 0:
+                    time.sleep(min(delay, 0.1))
+                    continue
+            packet = self.processed.get(timeout=0.1)
+            if packet is None:
+                continue
+            if self.render_fps:
+                # Only the newest frame is worth drawing after a wait
+                packet = self.processed.get_latest() or packet
+                next_render = time.monotonic() + 1.0 / self.render_fps
+            start = time.perf_counter()
+            try:
+                packet.image = self.render(packet)
+            except Exception as e:
+                print("Render error:", e)
+                continue
+            self.profiler.record("draw", time.perf_counter() - start)
+            self.rendered.put(packet)
@@ -0,0 +1,286 @@
+"""Session persistence: per-frame time series and events in columnar files
+
+A session is a directory holding one raw little-endian array file per
+column (``<column>.bin``), written append-only in fixed-size chunks, plus a
+``meta.json`` describing the schema. Every column can be opened with
+``np.memmap``, so multi-hour sessions are scanned without loading them.
+
+    frames:  frame, time, ear, mar, faces, counter, alarm, perclos, fatigue
+    events:  event_frame, event_time, event_kind, event_value
+
+The recorder fills preallocated chunk buffers on the inference thread and
+hands full chunks to a background writer, so the video loop never waits
+for the disk.
+
+    reader = SessionReader("sessions/20261017-080000/camera-0")
+    print(reader.summary())
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+FRAME_COLUMNS = {
+    'frame': '<i8',
+    'time': '<f8',
+    'ear': '<f4',   # NaN when no face
+    'mar': '<f4',
+    'faces': '<u1',
+    'counter': '<u2',
+    'alarm': '<u1',
+    'perclos': '<f4',
+    'fatigue': '<f4',
+}
+EVENT_COLUMNS = {
+    'event_frame': '<i8',
+    'event_time': '<f8',
+    'event_kind': '<u1',
+    'event_value': '<f4',  # EAR for alerts, closed frames for blinks, score for fatigue, else NaN
+}
+TABLES = {'frames': FRAME_COLUMNS, 'events': EVENT_COLUMNS}
+# New kinds are appended so codes stored by older versions keep their meaning
+EVENT_KINDS = ("blink", "alert", "alert_cleared", "face_found", "face_lost", "fatigue", "fatigue_cleared",
+               "driver_changed")
+_EVENT_CODES = {kind: code for code, kind in enumerate(EVENT_KINDS)}
+_EVENT_VALUES = {'alert': 'ear', 'blink': 'frames', 'fatigue': 'score', 'fatigue_cleared': 'score',
+                 'driver_changed': 'face'}
+
+
+def session_name(name):
+    """Filesystem-safe directory name for a stream name"""
+    return "".join(c if c.isalnum() or c in "-_." else "-" for c in name.lower()).strip("-") or "stream"
+
+
+class _Chunk:
+    """Preallocated column buffers for up to ``rows`` rows"""
+
+    def __init__(self, columns, rows):
+        self.arrays = {name: np.empty(rows, dtype=dtype) for name, dtype in columns.items()}
+        self.size = 0
+
+    def full(self):
+        return self.size == len(next(iter(self.arrays.values())))
+
+
+class SessionRecorder:
+    """Append FrameResults of one stream to a session directory"""
+
+    def __init__(self, path, chunk_rows: int = 4096, max_pending: int = 64, source=None):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        os.makedirs(path, exist_ok=True)
+        self.files = {name: open(os.path.join(path, f"{name}.bin"), "ab")
+                      for name in {**FRAME_COLUMNS, **EVENT_COLUMNS}}
+        self.meta = {
+            'version': 1,
+            'source': source,
+            'columns': {**FRAME_COLUMNS, **EVENT_COLUMNS},
+            'event_kinds': list(EVENT_KINDS),
+            'wall_offset': time.time() - time.monotonic(),
+            'started': time.time(),
+        }
+        self._write_meta()
+
+        self.frames = _Chunk(FRAME_COLUMNS, chunk_rows)
+        self.events = _Chunk(EVENT_COLUMNS, max(chunk_rows // 16, 64))
+        self.free = {table: [] for table in TABLES}
+        self.pending = queue.Queue(max_pending)
+        self.rows = 0
+        self.dropped_rows = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self.thread.start()
+
+    def record(self, result):
+        """Buffer one FrameResult (inference thread; never touches the disk)"""
+        chunk = self.frames
+        i = chunk.size
+        a = chunk.arrays
+        a['frame'][i] = result.index
+        a['time'][i] = result.timestamp
+        a['ear'][i] = result.ear if result.ear is not None else np.nan
+        a['mar'][i] = result.mar if result.mar is not None else np.nan
+        a['faces'][i] = min(len(result.faces), 255)
+        a['counter'][i] = min(result.counter, 65535)
+        a['alarm'][i] = result.alarm_on
+        a['perclos'][i] = result.perclos
+        a['fatigue'][i] = result.fatigue
+        chunk.size += 1
+        self.rows += 1
+        if chunk.full():
+            self.frames = self._submit(chunk, 'frames')
+
+        for event in result.events:
+            self._record_event(event)
+
+    def _record_event(self, event):
+        chunk = self.events
+        i = chunk.size
+        a = chunk.arrays
+        a['event_frame'][i] = event.frame_index
+        a['event_time'][i] = event.timestamp
+        a['event_kind'][i] = _EVENT_CODES.get(event.kind, 255)
+        key = _EVENT_VALUES.get(event.kind)
+        a['event_value'][i] = event.data.get(key, np.nan) if key else np.nan
+        chunk.size += 1
+        if chunk.full():
+            self.events = self._submit(chunk, 'events')
+
+    def _submit(self, chunk, table):
+        """Queue a chunk for writing and return an empty one to fill next"""
+        try:
+            self.pending.put_nowait((chunk, table))
+        except queue.Full:
+            # The disk cannot keep up; losing rows beats stalling detection
+            self.dropped_rows += chunk.size
+            chunk.size = 0
+            return chunk
+        free = self.free[table]
+        if free:
+            return free.pop()
+        return _Chunk(TABLES[table], len(next(iter(chunk.arrays.values()))))
+
+    def close(self, timeout: float = 5.0):
+        """Flush buffered rows, stop the writer and finalise meta.json"""
+        if self.closed:
+            return
+        self.closed = True
+        for chunk, table in ((self.frames, 'frames'), (self.events, 'events')):
+            if chunk.size:
+                self.pending.put((chunk, table))
+        self.pending.put(None)
+        self.thread.join(timeout)
+        for f in self.files.values():
+            f.close()
+        self.meta.update(rows=self.rows, dropped_rows=self.dropped_rows, stopped=time.time())
+        self._write_meta()
+
+    def _write_meta(self):
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def _run(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            chunk, table = item
+            try:
+                for name in TABLES[table]:
+                    chunk.arrays[name][:chunk.size].tofile(self.files[name])
+                    self.files[name].flush()
+            except OSError as e:
+                print("Recorder error:", e)
+            chunk.size = 0
+            self.free[table].append(chunk)
+
+
+class SessionReader:
+    """Memory-mapped access to a recorded session"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.columns = {name: self._map(name, dtype) for name, dtype in self.meta['columns'].items()}
+        # A crash can leave columns of one table at different lengths
+        for names in TABLES.values():
+            names = [name for name in names if name in self.columns]
+            rows = min(len(self.columns[name]) for name in names)
+            for name in names:
+                self.columns[name] = self.columns[name][:rows]
+
+    def _map(self, name, dtype):
+        path = os.path.join(self.path, f"{name}.bin")
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    def __len__(self):
+        return len(self.columns['frame'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def wall_time(self):
+        """Frame timestamps as Unix time"""
+        return self.columns['time'] + self.meta['wall_offset']
+
+    def scan(self, columns=tuple(FRAME_COLUMNS), chunk_rows: int = 1 << 20):
+        """Yield {column: array} slices of at most chunk_rows frames"""
+        for start in range(0, len(self), chunk_rows):
+            yield {name: np.asarray(self.columns[name][start:start + chunk_rows]) for name in columns}
+
+    def events(self, kind=None):
+        """Event columns, optionally only events of one kind"""
+        table = {name: np.asarray(self.columns[name]) for name in EVENT_COLUMNS}
+        if kind is not None:
+            mask = table['event_kind'] == EVENT_KINDS.index(kind)
+            table = {name: values[mask] for name, values in table.items()}
+        return table
+
+    def summary(self, ear_threshold: float = None):
+        """Session totals computed chunk by chunk"""
+        frames = faces = alarm = closed = 0
+        ear_sum = 0.0
+        max_fatigue = 0.0
+        fatigue = 'fatigue' in self.columns
+        for chunk in self.scan(('ear', 'faces', 'alarm') + (('fatigue',) if fatigue else ())):
+            present = chunk['faces'] > 0
+            frames += len(present)
+            faces += int(present.sum())
+            alarm += int(chunk['alarm'].sum())
+            ear = chunk['ear'][present].astype(np.float64)
+            ear_sum += float(ear.sum())
+            if ear_threshold is not None:
+                closed += int((ear < ear_threshold).sum())
+            if fatigue and len(present):
+                max_fatigue = max(max_fatigue, float(chunk['fatigue'].max()))
+        kinds = np.bincount(self.columns['event_kind'], minlength=len(EVENT_KINDS))
+        times = self.columns['time']
+        report = {
+            'frames': frames,
+            'duration': float(times[-1] - times[0]) if frames else 0.0,
+            'face_fraction': faces / frames if frames else 0.0,
+            'alarm_frames': alarm,
+            'mean_ear': ear_sum / faces if faces else None,
+            'max_fatigue': max_fatigue if fatigue else None,
+            'events': {kind: int(kinds[i]) for i, kind in enumerate(EVENT_KINDS)},
+        }
+        if ear_threshold is not None:
+            report['closed_fraction'] = closed / faces if faces else 0.0
+        return report
+
+    def resample(self, seconds: float = 60.0):
+        """Per-bucket (start time, frames, mean EAR, alarm frames) over fixed time buckets"""
+        times = self.columns['time']
+        if not len(times):
+            return np.empty((0, 4))
+        origin = float(times[0])
+        buckets = int((float(times[-1]) - origin) // seconds) + 1
+        count = np.zeros(buckets)
+        ear_sum = np.zeros(buckets)
+        ear_count = np.zeros(buckets)
+        alarm = np.zeros(buckets)
+        for chunk in self.scan(('time', 'ear', 'alarm')):
+            index = ((chunk['time'] - origin) // seconds).astype(np.int64)
+            valid = ~np.isnan(chunk['ear'])
+            count += np.bincount(index, minlength=buckets)
+            ear_sum += np.bincount(index[valid], chunk['ear'][valid], minlength=buckets)
+            ear_count += np.bincount(index[valid], minlength=buckets)
+            alarm += np.bincount(index, chunk['alarm'], minlength=buckets)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_ear = ear_sum / ear_count
+        starts = origin + seconds * np.arange(buckets)
+        return np.stack([starts, count, mean_ear, alarm], axis=1)
+
+
+if __name__ == "__main__":
+    import sys
+    for path in sys.argv[1:]:
+        print(path, SessionReader(path).summary())
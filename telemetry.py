@@ -0,0 +1,507 @@
+"""Streaming telemetry for fleet dashboards
+
+A TelemetryPublisher sends engine events (alerts, blinks, fatigue, face and
+driver changes) and a periodic summary per stream (EAR, PERCLOS, FPS, alert
+count, fatigue score) to a central collector. It runs its own asyncio loop
+on a daemon thread; ``publish`` only appends to a bounded deque, so the
+inference thread never waits for the network or the disk. Records are sent
+in batches of newline-delimited JSON over a pluggable transport:
+
+    http://host:8080/ingest    one POST per batch (https:// as well)
+    udp://host:9999            datagrams of whole records, fire and forget
+    tcp://host:9999            one persistent stream connection
+    unix:///run/fatigue.sock   a local stream socket
+
+While the collector is unreachable, batches are spooled to a bounded
+on-disk buffer (oldest dropped first) and replayed in order, with
+exponential back-off, once sending succeeds again. Only HTTP confirms
+delivery; stream sockets can lose what was written just before a drop.
+
+LocalCollector is a stand-in server for every transport, for trying a
+setup or testing against:
+
+    python telemetry.py serve udp://127.0.0.1:9999
+    python multicam.py 0 --telemetry udp://127.0.0.1:9999
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import socketserver
+import ssl
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+DEFAULT_BATCH_SIZE = 100  # records per batch
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds a record may wait for its batch to fill
+DEFAULT_SUMMARY_INTERVAL = 10.0
+DEFAULT_BUFFER_DIR = "telemetry_buffer"
+DEFAULT_BUFFER_BYTES = 50 * 1024 * 1024
+MAX_PENDING = 10000  # records held in memory before the oldest are dropped
+MAX_DATAGRAM = 8192
+RETRY_MIN = 1.0
+RETRY_MAX = 60.0
+
+
+def encode(records):
+    """Newline-delimited JSON of a list of records"""
+    return b"".join(json.dumps(record, separators=(",", ":"), default=float).encode() + b"\n"
+                    for record in records)
+
+
+def split_datagrams(payload, size: int = MAX_DATAGRAM):
+    """Group the lines of an NDJSON payload into chunks of at most size bytes
+
+    A record longer than size is sent on its own.
+    """
+    chunks, chunk = [], b""
+    for line in payload.splitlines(keepends=True):
+        if chunk and len(chunk) + len(line) > size:
+            chunks.append(chunk)
+            chunk = b""
+        chunk += line
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+class HttpTransport:
+    """POST every batch as application/x-ndjson; a non-2xx status is a failure"""
+
+    def __init__(self, url, timeout: float = 5.0):
+        parts = urlsplit(url)
+        secure = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if secure else 80)
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.ssl = ssl.create_default_context() if secure else None
+        self.timeout = timeout
+
+    async def send(self, payload):
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout)
+        try:
+            head = (f"POST {self.path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                    f"Content-Type: application/x-ndjson\r\nContent-Length: {len(payload)}\r\n"
+                    f"Connection: close\r\n\r\n")
+            writer.write(head.encode() + payload)
+            await asyncio.wait_for(writer.drain(), self.timeout)
+            status = await asyncio.wait_for(reader.readline(), self.timeout)
+        finally:
+            writer.close()
+        fields = status.split()
+        if len(fields) < 2 or not fields[1].startswith(b"2"):
+            raise OSError(f"collector answered {status.decode(errors='replace').strip() or 'nothing'}")
+
+    async def close(self):
+        pass
+
+
+class UdpTransport:
+    """Send every batch as datagrams of whole records"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.address = (parts.hostname, parts.port)
+        self.transport = None
+
+    async def send(self, payload):
+        if self.transport is None:
+            loop = asyncio.get_running_loop()
+            self.transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol,
+                                                                    remote_addr=self.address)
+        for chunk in split_datagrams(payload):
+            self.transport.sendto(chunk)
+
+    async def close(self):
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+
+
+class StreamTransport:
+    """Write batches to one persistent TCP or Unix socket connection, reconnecting on failure"""
+
+    def __init__(self, url, timeout: float = 5.0):
+        parts = urlsplit(url)
+        self.unix = parts.scheme == "unix"
+        self.address = parts.path if self.unix else (parts.hostname, parts.port)
+        self.timeout = timeout
+        self.writer = None
+
+    async def send(self, payload):
+        try:
+            if self.writer is None:
+                if self.unix:
+                    connect = asyncio.open_unix_connection(self.address)
+                else:
+                    connect = asyncio.open_connection(*self.address)
+                _, self.writer = await asyncio.wait_for(connect, self.timeout)
+            self.writer.write(payload)
+            await asyncio.wait_for(self.writer.drain(), self.timeout)
+        except BaseException:
+            await self.close()
+            raise
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+
+
+TRANSPORTS = {
+    "http": HttpTransport,
+    "https": HttpTransport,
+    "udp": UdpTransport,
+    "tcp": StreamTransport,
+    "unix": StreamTransport,
+}
+
+
+def create_transport(url):
+    """Transport for a collector URL (see the module docstring for the schemes)"""
+    scheme = urlsplit(url).scheme
+    if scheme not in TRANSPORTS:
+        raise ValueError(f"Unknown telemetry transport: {url}")
+    return TRANSPORTS[scheme](url)
+
+
+class DiskBuffer:
+    """Bounded spool of unsent batches, one file per batch, replayed oldest first
+
+    Batches left over from an earlier run are picked up again.
+    """
+
+    def __init__(self, path, max_bytes: int = DEFAULT_BUFFER_BYTES):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.files = deque(sorted(name for name in os.listdir(path) if name.endswith(".ndjson")))
+        self.size = sum(os.path.getsize(os.path.join(path, name)) for name in self.files)
+        self.next = int(self.files[-1].split(".")[0]) + 1 if self.files else 0
+        self.dropped = 0  # records
+
+    def __len__(self):
+        return len(self.files)
+
+    def push(self, payload):
+        """Spool one batch, dropping the oldest ones beyond max_bytes"""
+        name = f"{self.next:012d}.ndjson"
+        self.next += 1
+        tmp = os.path.join(self.path, name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, os.path.join(self.path, name))
+        self.files.append(name)
+        self.size += len(payload)
+        while self.size > self.max_bytes and self.files:
+            self.dropped += self.peek().count(b"\n")
+            self.pop()
+
+    def peek(self):
+        """The oldest spooled batch"""
+        with open(os.path.join(self.path, self.files[0]), "rb") as f:
+            return f.read()
+
+    def pop(self):
+        """Remove the oldest spooled batch"""
+        path = os.path.join(self.path, self.files.popleft())
+        self.size -= os.path.getsize(path)
+        os.remove(path)
+
+
+class TelemetryPublisher:
+    """Batch records and send them from a background asyncio loop
+
+    ``transport`` is a collector URL or a transport object with async
+    ``send(payload)`` and ``close()``. Without ``buffer_dir`` batches that
+    cannot be sent are dropped.
+    """
+
+    def __init__(self, transport, device: str = None, buffer_dir: str = None,
+                 buffer_bytes: int = DEFAULT_BUFFER_BYTES, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 summary_interval: float = DEFAULT_SUMMARY_INTERVAL, max_pending: int = MAX_PENDING):
+        self.transport = create_transport(transport) if isinstance(transport, str) else transport
+        self.device = device or socket.gethostname()
+        self.buffer = DiskBuffer(buffer_dir, buffer_bytes) if buffer_dir else None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.summary_interval = summary_interval
+        self.pending = deque(maxlen=max_pending)
+        self.summaries = {}
+        self.sent = 0
+        self.dropped = 0  # records lost to a full queue, or unsendable without a buffer
+        self.failures = 0
+        self.online = True
+        self.retry_at = 0.0
+        self.backoff = RETRY_MIN
+        self.wall_offset = time.time() - time.monotonic()
+        self._loop = None
+        self._wake = None
+        self._stopping = False
+        self._ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        """Send (or spool) what is queued and stop the loop"""
+        self._stopping = True
+        self._notify()
+        if self.thread.is_alive():
+            self.thread.join(timeout)
+
+    def publish(self, record):
+        """Queue one record (a JSON-serialisable dict); never blocks"""
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        self.pending.append(record)
+        if len(self.pending) == self.batch_size:
+            self._notify()
+
+    def publish_event(self, source, event):
+        """Queue an engine Event from the stream called source"""
+        self.publish({'type': 'event', 'device': self.device, 'source': source, 'kind': event.kind,
+                      'frame': event.frame_index, 'time': self.wall_offset + event.timestamp, **event.data})
+
+    def add_summary(self, source, callback):
+        """Publish callback() (a dict, or None to skip) every summary_interval seconds
+
+        The callback runs on the telemetry thread and must only read.
+        """
+        self.summaries[source] = callback
+
+    def remove_summary(self, source):
+        self.summaries.pop(source, None)
+
+    def stats(self):
+        return {
+            'sent': self.sent,
+            'pending': len(self.pending),
+            'dropped': self.dropped + (self.buffer.dropped if self.buffer else 0),
+            'buffered_batches': len(self.buffer) if self.buffer else 0,
+            'buffered_bytes': self.buffer.size if self.buffer else 0,
+            'failures': self.failures,
+            'online': self.online,
+        }
+
+    def _notify(self):
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                # The loop closed in between
+                pass
+
+    def _run(self):
+        asyncio.run(self._main())
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._ready.set()
+        next_summary = time.monotonic() + self.summary_interval
+        try:
+            while not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                if time.monotonic() >= next_summary:
+                    next_summary += self.summary_interval
+                    self._collect_summaries()
+                await self._flush()
+            # One last attempt; whatever fails is spooled for the next run
+            self.retry_at = 0.0
+            await self._flush()
+        finally:
+            await self.transport.close()
+
+    def _collect_summaries(self):
+        now = time.time()
+        for source, callback in list(self.summaries.items()):
+            try:
+                summary = callback()
+            except Exception as e:
+                print("Telemetry summary error:", e)
+                continue
+            if summary is not None:
+                self.publish({'type': 'summary', 'device': self.device, 'source': source, 'time': now,
+                              **summary})
+
+    async def _flush(self):
+        while self.pending:
+            batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+            payload = encode(batch)
+            # Keep the order: nothing new goes out before the spooled batches
+            if (self.buffer and len(self.buffer)) or not await self._send(payload):
+                self._spool(payload, len(batch))
+            else:
+                self.sent += len(batch)
+        while self.buffer and len(self.buffer):
+            payload = self.buffer.peek()
+            if not await self._send(payload):
+                break
+            self.buffer.pop()
+            self.sent += payload.count(b"\n")
+
+    async def _send(self, payload):
+        """Send one payload unless backing off; False on failure"""
+        if time.monotonic() < self.retry_at:
+            return False
+        try:
+            await self.transport.send(payload)
+        except (OSError, asyncio.TimeoutError) as e:
+            self.failures += 1
+            self.retry_at = time.monotonic() + self.backoff
+            self.backoff = min(self.backoff * 2, RETRY_MAX)
+            if self.online:
+                print("Telemetry collector unreachable:", e)
+            self.online = False
+            return False
+        self.backoff = RETRY_MIN
+        self.online = True
+        return True
+
+    def _spool(self, payload, count):
+        if self.buffer is not None:
+            self.buffer.push(payload)
+        else:
+            self.dropped += count
+
+
+def stream_summary(stream):
+    """Summary fields of a multicam.CameraStream's latest result (None before the first)"""
+    result = stream.latest_result
+    if result is None:
+        return None
+    return {'ear': result.ear, 'perclos': result.perclos, 'fps': stream.fps, 'alerts': result.alerts,
+            'blinks': result.blinks, 'fatigue': result.fatigue, 'drowsy': result.drowsy}
+
+
+def attach(monitor, publisher):
+    """Publish the events and periodic summaries of every stream of a MultiCameraMonitor"""
+    monitor.add_listener(lambda stream, event: publisher.publish_event(stream.name, event))
+    for stream in monitor.streams:
+        publisher.add_summary(stream.name, lambda stream=stream: stream_summary(stream))
+
+
+def detach(monitor, publisher):
+    """Stop the periodic summaries of a monitor's streams"""
+    for stream in monitor.streams:
+        publisher.remove_summary(stream.name)
+
+
+class LocalCollector:
+    """Stand-in collector for any transport URL; keeps every record it receives
+
+    Port 0 picks a free port; ``url`` has the actual one. Set ``fail`` to
+    make the HTTP collector answer 503, e.g. to exercise the disk buffer.
+    """
+
+    def __init__(self, url, on_record=None):
+        self.scheme = urlsplit(url).scheme
+        self.records = []
+        self.on_record = on_record
+        self.fail = False
+        self._lock = threading.Condition()
+        self.server = self._create_server(urlsplit(url))
+
+    @property
+    def url(self):
+        if self.scheme == "unix":
+            return f"unix://{self.server.server_address}"
+        host, port = self.server.server_address[:2]
+        return f"{self.scheme}://{host}:{port}/"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="collector", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.scheme == "unix" and os.path.exists(self.server.server_address):
+            os.remove(self.server.server_address)
+
+    def wait(self, count, timeout: float = 5.0):
+        """Wait until count records have arrived; returns whether they did"""
+        with self._lock:
+            return self._lock.wait_for(lambda: len(self.records) >= count, timeout)
+
+    def _received(self, payload):
+        records = [json.loads(line) for line in payload.splitlines() if line.strip()]
+        with self._lock:
+            self.records.extend(records)
+            self._lock.notify_all()
+        if self.on_record:
+            for record in records:
+                self.on_record(record)
+
+    def _create_server(self, parts):
+        collector = self
+
+        class HttpHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if collector.fail:
+                    self.send_error(503)
+                    return
+                collector._received(body)
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        class DatagramHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                collector._received(self.request[0])
+
+        class StreamHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    collector._received(line)
+
+        if parts.scheme in ("http", "https"):
+            return ThreadingHTTPServer((parts.hostname, parts.port or 0), HttpHandler)
+        if parts.scheme == "udp":
+            return socketserver.UDPServer((parts.hostname, parts.port or 0), DatagramHandler)
+        if parts.scheme == "tcp":
+            server = socketserver.ThreadingTCPServer((parts.hostname, parts.port or 0), StreamHandler)
+            server.daemon_threads = True
+            return server
+        if parts.scheme == "unix":
+            server = socketserver.ThreadingUnixStreamServer(parts.path, StreamHandler)
+            server.daemon_threads = True
+            return server
+        raise ValueError(f"Unknown telemetry transport: {parts.geturl()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='run a stand-in collector that prints what it receives')
+    serve.add_argument('url', help='e.g. http://127.0.0.1:8080/, udp://127.0.0.1:9999, unix:///tmp/fatigue.sock')
+    args = parser.parse_args()
+
+    collector = LocalCollector(args.url, on_record=lambda record: print(json.dumps(record)))
+    print("Listening on", collector.url)
+    collector.start()
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        collector.stop()